@@ -28,6 +28,43 @@ User = get_user_model()
 
 admin.site.unregister(Group)
 
+def _form_com_erros_upload(form_class, request):
+
+    class FormComErrosUpload(form_class):
+
+        def clean(self):
+
+            dados = super().clean()
+
+            erros = getattr(request, 'erros_upload', {})
+
+            for nome in self.fields:
+
+                if self.add_prefix(nome) in erros:
+
+                    self.add_error(nome, erros[self.add_prefix(nome)])
+
+            return dados
+
+    return FormComErrosUpload
+
+class ErrosUploadAdminMixin:
+
+    # O UploadValidadoHandler descarta o arquivo recusado antes do formulário; aqui o motivo vira erro do campo,
+    # em vez de o admin salvar sem o arquivo (ou só dizer que o campo é obrigatório).
+
+    def get_form(self, request, obj=None, **kwargs):
+
+        return _form_com_erros_upload(super().get_form(request, obj, **kwargs), request)
+
+    def get_formset(self, request, obj=None, **kwargs):
+
+        formset = super().get_formset(request, obj, **kwargs)
+
+        formset.form = _form_com_erros_upload(formset.form, request)
+
+        return formset
+
 class TenantAdminMixin:
 
     pass
@@ -220,7 +257,7 @@ class UserAdmin(BaseUserAdmin, ModelAdmin):
 
     def get_queryset(self, request):
 
-        qs = super().get_queryset(request)
+        qs = super().get_queryset(request).prefetch_related('condominios')
 
         if request.user.is_superuser:
 
@@ -240,7 +277,7 @@ class GroupAdmin(BaseGroupAdmin, ModelAdmin):
 
     pass
 
-class DocumentoInline(TabularInline):
+class DocumentoInline(ErrosUploadAdminMixin, TabularInline):
 
     model = DocumentoCondominio
 
@@ -258,7 +295,7 @@ class DocumentoInline(TabularInline):
 
 @admin.register(Condominio)
 
-class CondominioAdmin(ModelAdmin):
+class CondominioAdmin(ErrosUploadAdminMixin, ModelAdmin):
 
     list_display = ('nome', 'endereco', 'cnpj', 'telefone', 'get_status_ativo', 'data_criacao')
 
@@ -430,7 +467,7 @@ class EncomendaAdmin(TenantAdminMixin, ModelAdmin):
 
 @admin.register(Solicitacao)
 
-class SolicitacaoAdmin(TenantAdminMixin, ModelAdmin):
+class SolicitacaoAdmin(ErrosUploadAdminMixin, TenantAdminMixin, ModelAdmin):
 
     list_display = ('id', 'tipo', 'morador', 'condominio', 'status', 'data_criacao')
 
@@ -442,7 +479,7 @@ class SolicitacaoAdmin(TenantAdminMixin, ModelAdmin):
 
 @admin.register(Cobranca)
 
-class CobrancaAdmin(TenantAdminMixin, ModelAdmin):
+class CobrancaAdmin(ErrosUploadAdminMixin, TenantAdminMixin, ModelAdmin):
 
     list_display = ('descricao', 'condominio', 'morador', 'valor', 'data_vencimento', 'get_status_html')
 
@@ -496,7 +533,7 @@ class MensagemAdmin(TenantAdminMixin, ModelAdmin):
 
 @admin.register(Ocorrencia)
 
-class OcorrenciaAdmin(TenantAdminMixin, ModelAdmin):
+class OcorrenciaAdmin(ErrosUploadAdminMixin, TenantAdminMixin, ModelAdmin):
 
     list_display = ('id', 'condominio', 'autor', 'status', 'data_registro')
 
@@ -508,7 +545,7 @@ class OcorrenciaAdmin(TenantAdminMixin, ModelAdmin):
 
 @admin.register(DocumentoCondominio)
 
-class DocumentoCondominioAdmin(TenantAdminMixin, ModelAdmin):
+class DocumentoCondominioAdmin(ErrosUploadAdminMixin, TenantAdminMixin, ModelAdmin):
 
     list_display = ('titulo', 'condominio', 'categoria', 'data_upload')
 
@@ -26,3 +26,7 @@ class PortariaConfig(AppConfig):
 
         username_field.help_text = 'Obrigatório. 150 caracteres ou menos. Letras, números, espaços e @/./+/-/_.'
 
+
+        from .imagens import conectar_sinais
+
+        conectar_sinais()
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+PASTA_BLOBS = 'blobs'
+PASTA_TEMPORARIA = f'{PASTA_BLOBS}/tmp'
+
+
+def caminho_blob(sha256):
+    return f'{PASTA_BLOBS}/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+class ArmazenamentoDeduplicado(FileSystemStorage):
+    # Cada conteúdo (SHA-256) é gravado uma vez em blobs/; o nome do FileField (cobrancas/..., documentos/...) é um hard link
+    # para o blob. Assim o caminho continua valendo para a checagem de permissão, o X-Accel e o backup (rsync -H / tar).
+
+    def _receber(self, content):
+        # Grava num temporário dentro do MEDIA_ROOT (mesmo disco: mover para blobs/ é um rename) calculando o hash no caminho.
+        pasta = self.path(PASTA_TEMPORARIA)
+        os.makedirs(pasta, exist_ok=True)
+        resumo = hashlib.sha256()
+        tamanho = 0
+        descritor, temporario = tempfile.mkstemp(dir=pasta)
+        try:
+            with os.fdopen(descritor, 'wb') as saida:
+                for bloco in content.chunks():
+                    resumo.update(bloco)
+                    saida.write(bloco)
+                    tamanho += len(bloco)
+        except BaseException:
+            os.remove(temporario)
+            raise
+        return resumo.hexdigest(), tamanho, temporario
+
+    def _guardar_blob(self, sha256, tamanho, temporario):
+        from .models import ConteudoArquivo
+        conteudo, _ = ConteudoArquivo.objects.select_for_update().get_or_create(sha256=sha256, defaults={'tamanho': tamanho})
+        blob = self.path(caminho_blob(sha256))
+        if os.path.exists(blob):
+            os.remove(temporario)
+        else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            os.replace(temporario, blob)
+            if self.file_permissions_mode is not None:
+                os.chmod(blob, self.file_permissions_mode)
+        return conteudo, blob
+
+    def _vincular(self, blob, destino):
+        try:
+            os.link(blob, destino)
+        except FileExistsError:
+            raise
+        except OSError:
+            # Sistema de arquivos sem hard link: cópia comum (funciona, só não economiza espaço).
+            shutil.copyfile(blob, destino)
+
+    def _referenciar(self, nome, conteudo):
+        from .models import ConteudoArquivo, ReferenciaArquivo
+        # Referência antiga com o mesmo nome (arquivo apagado fora do storage) é liberada antes.
+        self._soltar(nome)
+        ReferenciaArquivo.objects.create(nome=nome, conteudo=conteudo)
+        ConteudoArquivo.objects.filter(pk=conteudo.pk).update(referencias=F('referencias') + 1)
+
+    def _soltar(self, nome):
+        from .models import ConteudoArquivo, ReferenciaArquivo
+        referencia = ReferenciaArquivo.objects.filter(nome=nome).first()
+        if not referencia:
+            return
+        referencia.delete()
+        ConteudoArquivo.objects.filter(pk=referencia.conteudo_id, referencias__gt=0).update(referencias=F('referencias') - 1)
+        orfao = ConteudoArquivo.objects.filter(pk=referencia.conteudo_id, referencias=0).values_list('sha256', flat=True).first()
+        if orfao:
+            ConteudoArquivo.objects.filter(pk=referencia.conteudo_id).delete()
+            blob = self.path(caminho_blob(orfao))
+            # Só apaga o blob depois do commit: um rollback não pode deixar referência apontando para blob removido.
+            transaction.on_commit(lambda: os.path.exists(blob) and os.remove(blob))
+
+    def _save(self, name, content):
+        sha256, tamanho, temporario = self._receber(content)
+        try:
+            with transaction.atomic():
+                conteudo, blob = self._guardar_blob(sha256, tamanho, temporario)
+                while True:
+                    destino = self.path(name)
+                    os.makedirs(os.path.dirname(destino), exist_ok=True)
+                    try:
+                        self._vincular(blob, destino)
+                        break
+                    except FileExistsError:
+                        # Outro upload gravou o mesmo nome entre o get_available_name e aqui.
+                        name = self.get_available_name(name)
+                name = str(name).replace('\\', '/')
+                self._referenciar(name, conteudo)
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        return name
+
+    def delete(self, name):
+        super().delete(name)
+        with transaction.atomic():
+            self._soltar(name)
+
+    def adotar(self, name):
+        # Arquivo gravado antes da deduplicação: troca a cópia pelo link para o blob. Devolve os bytes liberados.
+        from .models import ReferenciaArquivo
+        if ReferenciaArquivo.objects.filter(nome=name).exists():
+            return 0
+        with self.open(name, 'rb') as arquivo:
+            sha256, tamanho, temporario = self._receber(arquivo)
+        destino = self.path(name)
+        provisorio = destino + '.dedup'
+        try:
+            with transaction.atomic():
+                conteudo, blob = self._guardar_blob(sha256, tamanho, temporario)
+                ja_existia = conteudo.referencias > 0
+                if os.path.exists(provisorio):
+                    os.remove(provisorio)
+                self._vincular(blob, provisorio)
+                os.replace(provisorio, destino)
+                self._referenciar(name, conteudo)
+        finally:
+            for resto in (temporario, provisorio):
+                if os.path.exists(resto):
+                    os.remove(resto)
+        return tamanho if ja_existia else 0
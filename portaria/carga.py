@@ -0,0 +1,314 @@
+import datetime
+import functools
+import math
+import random
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .diretorio import marcar_diretorio_alterado
+from .financeiro import reconstruir_resumos
+from .models import (
+    AreaComum, Aviso, Cobranca, Condominio, Encomenda, Mensagem, Morador, Notificacao, OrdemServico, Porteiro, Reserva, Sindico,
+    Solicitacao, Visitante,
+)
+from .reservas import reconstruir_disponibilidade
+
+LOTE = 1000
+SENHA_CARGA = 'carga-condominio'
+PREFIXO_CARGA = 'Residencial Carga'
+NOMES = ('Ana', 'Bruno', 'Carla', 'Diego', 'Elaine', 'Fábio', 'Gabriela', 'Heitor', 'Isabela', 'João', 'Larissa', 'Marcos')
+SOBRENOMES = ('Silva', 'Souza', 'Oliveira', 'Santos', 'Pereira', 'Lima', 'Costa', 'Almeida', 'Rocha', 'Ribeiro')
+# Peso de chegada de visitantes por hora do dia: picos de manhã e no começo da noite, quase nada de madrugada.
+PESO_HORAS = (1, 0, 0, 0, 0, 1, 3, 6, 9, 10, 10, 9, 8, 7, 7, 8, 9, 11, 12, 12, 10, 7, 4, 2)
+AREAS = (
+    # nome, capacidade, abertura, fechamento, duração do horário (0 = dia inteiro), chance de reserva (fim de semana, dia útil)
+    ('Salão de Festas', 80, datetime.time(10), datetime.time(23), 0, (0.6, 0.1)),
+    ('Churrasqueira', 30, datetime.time(10), datetime.time(22), 0, (0.7, 0.15)),
+    ('Quadra', 12, datetime.time(7), datetime.time(22), 60, (0.35, 0.2)),
+)
+
+# Mistura de requisições do teste de carga: papel -> [(endpoint, rota, parâmetros GET, peso)].
+ROTEIROS = {
+    'porteiro': (
+        ('portaria_home', 'home', {}, 50),
+        ('portaria_busca', 'home', {'busca': 'Silva'}, 15),
+        ('portaria_mensagens', 'mensagens_portaria', {}, 10),
+        ('portaria_moradores_offline', 'api_moradores_offline', {}, 15),
+        ('portaria_reservas', 'api_reservas_portaria', {}, 10),
+    ),
+    'sindico': (
+        ('sindico_painel', 'sindico_painel', {}, 35),
+        ('sindico_financeiro', 'sindico_financeiro', {}, 30),
+        ('sindico_mensagens', 'sindico_mensagens', {}, 20),
+        ('sindico_moradores', 'sindico_moradores', {}, 15),
+    ),
+    'morador': (
+        ('morador_home', 'morador_home', {}, 40),
+        ('morador_cobrancas', 'morador_cobrancas', {}, 25),
+        ('morador_encomendas', 'morador_encomendas', {}, 15),
+        ('morador_mensagens', 'morador_mensagens', {}, 10),
+        ('morador_reservas', 'morador_reservas', {}, 10),
+    ),
+}
+MISTURA_PAPEIS = {'porteiro': 50, 'morador': 35, 'sindico': 15}
+
+
+@functools.lru_cache(maxsize=4)
+def _senha_com_hash(senha):
+    # Uma senha já com hash para todos os usuários gerados no processo: o PBKDF2 (~0,5 s) por condomínio dominaria a geração.
+    return make_password(senha)
+
+
+def _nome(sorteio):
+    return f'{sorteio.choice(NOMES)} {sorteio.choice(SOBRENOMES)} {sorteio.choice(SOBRENOMES)}'
+
+
+def _quantos(sorteio, media):
+    # Variação diária em torno da média (nunca negativa).
+    return max(0, round(sorteio.gauss(media, media * 0.3))) if media else 0
+
+
+def _instante(sorteio, dia):
+    hora = sorteio.choices(range(24), weights=PESO_HORAS)[0]
+    return timezone.make_aware(datetime.datetime.combine(dia, datetime.time(hora, sorteio.randrange(60), sorteio.randrange(60))))
+
+
+def _competencia(hoje, meses_atras):
+    ano, mes = divmod(hoje.year * 12 + hoje.month - 1 - meses_atras, 12)
+    return datetime.date(ano, mes + 1, 1)
+
+
+@contextmanager
+def _datas_historicas(*campos):
+    # auto_now_add sobrescreve a data no bulk_create; só durante a geração ele fica desligado para o histórico ter datas no passado.
+    originais = [(campo, campo.auto_now_add) for campo in campos]
+    for campo, _ in originais:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, valor in originais:
+            campo.auto_now_add = valor
+
+
+def _campos_historicos():
+    return [
+        modelo._meta.get_field(campo) for modelo, campo in (
+            (Visitante, 'horario_chegada'), (Encomenda, 'data_chegada'), (Mensagem, 'data_envio'),
+            (Solicitacao, 'data_criacao'), (Aviso, 'data_publicacao'), (Reserva, 'data_criacao'),
+        )
+    ]
+
+
+def _usuarios(condominio, prefixo, especificacoes, senha):
+    User = get_user_model()
+    usuarios = User.objects.bulk_create(
+        [User(username=f'{prefixo}_{nome}', first_name=nome, tipo_usuario=tipo, password=senha) for nome, tipo in especificacoes],
+        batch_size=LOTE,
+    )
+    campo = User.condominios.field
+    Vinculo = campo.remote_field.through
+    Vinculo.objects.bulk_create(
+        [Vinculo(**{f'{campo.m2m_field_name()}_id': u.pk, f'{campo.m2m_reverse_field_name()}_id': condominio.pk}) for u in usuarios],
+        batch_size=LOTE,
+    )
+    return usuarios
+
+
+def _unidades(sorteio, quantidade):
+    # Prédios de 4 a 16 andares com 2 a 8 apartamentos por andar; blocos A, B, C... (numerados depois do Z).
+    andares = sorteio.choice((4, 8, 12, 16))
+    por_andar = sorteio.choice((2, 4, 6, 8))
+    por_bloco = andares * por_andar
+    unidades = []
+    for i in range(quantidade):
+        bloco, posicao = divmod(i, por_bloco)
+        andar, apto = divmod(posicao, por_andar)
+        unidades.append((chr(ord('A') + bloco) if bloco < 26 else str(bloco + 1), f'{andar + 1}{apto + 1:02d}'))
+    return unidades
+
+
+def _reservas(sorteio, areas, ids_moradores, inicio, fim):
+    reservas = []
+    dia = inicio
+    while dia <= fim:
+        fim_de_semana = dia.weekday() >= 5
+        for area, chances in areas:
+            chance = chances[0] if fim_de_semana else chances[1]
+            if area.duracao_horario:
+                horarios = [h for h in range(area.horario_abertura.hour, area.horario_fechamento.hour)]
+                for hora in sorteio.sample(horarios, k=sum(sorteio.random() < chance for _ in horarios)):
+                    reservas.append(Reserva(
+                        area_id=area.pk, morador_id=sorteio.choice(ids_moradores), data=dia, status='APROVADA',
+                        horario_inicio=datetime.time(hora), horario_fim=datetime.time(hora + 1),
+                    ))
+            elif sorteio.random() < chance:
+                reservas.append(Reserva(
+                    area_id=area.pk, morador_id=sorteio.choice(ids_moradores), data=dia, horario_inicio=area.horario_abertura,
+                    horario_fim=area.horario_fechamento, status='APROVADA' if dia < fim - datetime.timedelta(days=7) else 'PENDENTE',
+                ))
+        dia += datetime.timedelta(days=1)
+    for reserva in reservas:
+        reserva.data_criacao = _instante(sorteio, min(reserva.data, timezone.localdate()) - datetime.timedelta(days=sorteio.randrange(1, 30)))
+    return reservas
+
+
+@transaction.atomic
+def popular_condominio(nome, unidades=200, visitantes_por_dia=25, dias=90, meses=6, proporcao_contas=0.6, semente=0, senha=SENHA_CARGA):
+    # Um condomínio "de verdade": equipe com login, blocos/unidades, contas de morador e o histórico de portaria, financeiro,
+    # reservas e mensagens dos últimos `dias`. Tudo por bulk_create; devolve os usuários e as linhas gravadas por modelo.
+    sorteio = random.Random(f'{semente}:{nome}')
+    hoje = timezone.localdate()
+    periodo = [hoje - datetime.timedelta(days=d) for d in range(dias)]
+    senha = _senha_com_hash(senha)
+    linhas = {}
+    condominio = Condominio.objects.create(nome=nome)
+    prefixo = f'c{condominio.pk}'
+    sindico, porteiro, zelador = _usuarios(condominio, prefixo, (('sindico', 'sindico'), ('porteiro', 'porteiro'), ('zelador', 'zelador')), senha)
+    Sindico.objects.create(usuario=sindico, nome=_nome(sorteio), condominio=condominio)
+    Porteiro.objects.create(usuario=porteiro, nome=_nome(sorteio), condominio=condominio)
+    contas = _usuarios(condominio, prefixo, [(f'morador{i}', 'morador') for i in range(math.ceil(unidades * proporcao_contas))], senha)
+    linhas['usuarios'] = len(contas) + 3
+
+    moradores = Morador.objects.bulk_create(
+        [
+            Morador(
+                condominio=condominio, usuario=contas[i] if i < len(contas) else None, nome=_nome(sorteio), bloco=bloco, apartamento=apto,
+                cpf=f'{sorteio.randrange(10 ** 11):011d}', email=f'{prefixo}.morador{i}@exemplo.com', telefone=f'1199{i:07d}',
+            )
+            for i, (bloco, apto) in enumerate(_unidades(sorteio, unidades))
+        ],
+        batch_size=LOTE,
+    )
+    marcar_diretorio_alterado(condominio.pk)
+    linhas['moradores'] = len(moradores)
+    # Nas tabelas grandes as FKs vão por id: atribuir a instância passa pelo descriptor a cada linha e pesa no bulk_create.
+    ids_moradores = [m.pk for m in moradores]
+
+    with _datas_historicas(*_campos_historicos()):
+        visitantes = []
+        for dia in periodo:
+            # Fim de semana recebe ~40% mais visitas.
+            for _ in range(_quantos(sorteio, visitantes_por_dia * (1.4 if dia.weekday() >= 5 else 1))):
+                chegada = _instante(sorteio, dia)
+                visitantes.append(Visitante(
+                    condominio_id=condominio.pk, nome_completo=_nome(sorteio), cpf=f'{sorteio.randrange(10 ** 11):011d}',
+                    morador_responsavel_id=sorteio.choice(ids_moradores), placa_veiculo=f'{sorteio.choice("ABCDEFGH")}BC{sorteio.randrange(10)}D{sorteio.randrange(100):02d}' if sorteio.random() < 0.3 else '',
+                    quem_autorizou='Morador', registrado_por_id=porteiro.pk, horario_chegada=chegada,
+                    horario_saida=None if dia == hoje and sorteio.random() < 0.5 else chegada + datetime.timedelta(minutes=sorteio.randrange(15, 240)),
+                ))
+        linhas['visitantes'] = len(Visitante.objects.bulk_create(visitantes, batch_size=LOTE))
+        del visitantes
+
+        # Em média 3 encomendas por unidade por mês; as dos últimos 2 dias ainda aguardam retirada.
+        encomendas = []
+        for dia in periodo:
+            for _ in range(_quantos(sorteio, unidades * 0.1)):
+                entregue = dia < hoje - datetime.timedelta(days=2) or sorteio.random() < 0.3
+                chegada = _instante(sorteio, dia)
+                encomendas.append(Encomenda(
+                    condominio_id=condominio.pk, morador_id=sorteio.choice(ids_moradores), volume=sorteio.choice(('Caixa', 'Envelope', 'Sacola')),
+                    data_chegada=chegada, entregue=entregue, notificado=True, porteiro_cadastro_id=porteiro.pk,
+                    data_entrega=chegada + datetime.timedelta(hours=sorteio.randrange(1, 48)) if entregue else None,
+                    porteiro_entrega_id=porteiro.pk if entregue else None,
+                ))
+        linhas['encomendas'] = len(Encomenda.objects.bulk_create(encomendas, batch_size=LOTE))
+        del encomendas
+
+        cobrancas = []
+        for meses_atras in range(meses):
+            competencia = _competencia(hoje, meses_atras)
+            vencimento = competencia.replace(day=10)
+            for morador_id in ids_moradores:
+                if vencimento > hoje:
+                    status = 'PENDENTE'
+                else:
+                    # Quanto mais antiga a competência, mais gente já pagou.
+                    status = sorteio.choices(('PAGO', 'ATRASADO', 'EM_ANALISE'), weights=(70 + min(meses_atras, 3) * 8, 25 - min(meses_atras, 3) * 7, 5))[0]
+                cobrancas.append(Cobranca(
+                    condominio_id=condominio.pk, morador_id=morador_id, valor=Decimal('450.00') + sorteio.randrange(0, 20000) / Decimal(100),
+                    data_vencimento=vencimento, competencia=competencia, status=status,
+                    data_pagamento=vencimento - datetime.timedelta(days=sorteio.randrange(-5, 9)) if status == 'PAGO' else None,
+                ))
+        linhas['cobrancas'] = len(Cobranca.objects.bulk_create(cobrancas, batch_size=LOTE))
+        del cobrancas
+
+        areas = AreaComum.objects.bulk_create([
+            AreaComum(condominio=condominio, nome=area, capacidade=capacidade, horario_abertura=abertura, horario_fechamento=fechamento, duracao_horario=duracao)
+            for area, capacidade, abertura, fechamento, duracao, _ in AREAS
+        ])
+        reservas = _reservas(sorteio, list(zip(areas, [chances for *_, chances in AREAS])), ids_moradores, periodo[-1], hoje + datetime.timedelta(days=60))
+        linhas['reservas'] = len(Reserva.objects.bulk_create(reservas, batch_size=LOTE))
+
+        Aviso.objects.bulk_create([
+            Aviso(condominio=condominio, titulo=f'Comunicado {i + 1}', conteudo='Manutenção programada nas áreas comuns.', criado_por=sindico, data_publicacao=_instante(sorteio, dia))
+            for i, dia in enumerate(periodo[::7])
+        ])
+        solicitacoes = Solicitacao.objects.bulk_create(
+            [
+                Solicitacao(
+                    condominio=condominio, tipo=sorteio.choice(('RECLAMACAO', 'MANUTENCAO', 'MUDANCA')), descricao='Vazamento na garagem.',
+                    morador=sorteio.choice(moradores), criado_por=sorteio.choice(contas) if contas else sindico,
+                    status='PENDENTE' if dia > hoje - datetime.timedelta(days=7) else sorteio.choice(('EM_ANDAMENTO', 'CONCLUIDO', 'CONCLUIDO')),
+                    data_criacao=_instante(sorteio, dia),
+                )
+                for dia in periodo for _ in range(_quantos(sorteio, unidades * 0.01))
+            ],
+            batch_size=LOTE,
+        )
+        linhas['solicitacoes'] = len(solicitacoes)
+        OrdemServico.objects.bulk_create(
+            [
+                OrdemServico(
+                    condominio=condominio, zelador=zelador, solicitacao_origem=solicitacao, titulo=f'OS {solicitacao.pk}', descricao=solicitacao.descricao,
+                    status={'PENDENTE': 'Pendente', 'EM_ANDAMENTO': 'Em Andamento'}.get(solicitacao.status, 'Concluída'),
+                )
+                for solicitacao in solicitacoes if solicitacao.tipo == 'MANUTENCAO'
+            ],
+            batch_size=LOTE,
+        )
+
+        mensagens = []
+        for conta in contas:
+            for _ in range(sorteio.choice((0, 0, 1, 2, 4))):
+                enviada = _instante(sorteio, sorteio.choice(periodo))
+                mensagens.append(Mensagem(condominio=condominio, remetente=conta, destinatario=sindico, conteudo='Dúvida sobre o boleto.', data_envio=enviada, lida=sorteio.random() < 0.7))
+                if sorteio.random() < 0.6:
+                    mensagens.append(Mensagem(
+                        condominio=condominio, remetente=sindico, destinatario=conta, conteudo='Resposta da administração.',
+                        data_envio=enviada + datetime.timedelta(hours=sorteio.randrange(1, 30)), lida=sorteio.random() < 0.8,
+                    ))
+        linhas['mensagens'] = len(Mensagem.objects.bulk_create(mensagens, batch_size=LOTE))
+
+    Notificacao.objects.bulk_create(
+        [Notificacao(usuario=sindico, condominio=condominio, tipo='aviso', mensagem=f'Notificação {i}', lida=i >= 5) for i in range(30)]
+    )
+    # bulk_create não dispara os sinais: disponibilidade e resumo financeiro são montados de uma vez no fim.
+    reconstruir_disponibilidade([area.pk for area in areas])
+    linhas['resumos_financeiros'] = reconstruir_resumos([condominio.pk])
+    return {'condominio': condominio, 'sindico': sindico, 'porteiro': porteiro, 'zelador': zelador, 'moradores': contas, 'linhas': linhas}
+
+
+def percentil(ordenados, p):
+    # Nearest-rank: o valor abaixo do qual ficam p% das amostras (sem interpolação, igual a ferramentas de carga comuns).
+    if not ordenados:
+        return 0.0
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def resumir_latencias(amostras, erros):
+    # amostras: endpoint -> durações em segundos; erros: endpoint -> quantidade de respostas diferentes de 200.
+    resumo = []
+    for endpoint in sorted(set(amostras) | set(erros)):
+        duracoes = sorted(amostras.get(endpoint, []))
+        resumo.append({
+            'endpoint': endpoint, 'requisicoes': len(duracoes), 'erros': erros.get(endpoint, 0),
+            'p50': percentil(duracoes, 50), 'p95': percentil(duracoes, 95), 'p99': percentil(duracoes, 99),
+            'max': duracoes[-1] if duracoes else 0.0,
+        })
+    return resumo
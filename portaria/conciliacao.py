@@ -0,0 +1,249 @@
+import datetime
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .financeiro import recalcular_resumos, invalidar_contagem_em_analise
+from .models import Cobranca, Notificacao
+
+STATUS_EM_ABERTO = ('PENDENTE', 'ATRASADO', 'EM_ANALISE')
+OCORRENCIAS_LIQUIDACAO = ('06', '17')
+CENTAVOS = Decimal('100')
+
+
+class ArquivoRetornoInvalido(ValueError):
+    pass
+
+
+def _lancamento(linha, valor, data_pagamento=None, vencimento=None, referencias=(), descricao=''):
+    return {
+        'linha': linha,
+        'valor': valor,
+        'data_pagamento': data_pagamento,
+        'vencimento': vencimento,
+        'referencias': [r for r in referencias if r],
+        'descricao': descricao.strip(),
+    }
+
+
+def _numero(texto):
+    digitos = ''.join(c for c in texto if c.isdigit()).lstrip('0')
+    return digitos or None
+
+
+def _valor_cnab(texto):
+    try:
+        return Decimal(int(texto.strip() or '0')) / CENTAVOS
+    except ValueError:
+        return None
+
+
+def _data_cnab(texto):
+    texto = texto.strip()
+    if not texto or not texto.isdigit() or int(texto) == 0:
+        return None
+    try:
+        if len(texto) == 6:
+            return datetime.datetime.strptime(texto, '%d%m%y').date()
+        return datetime.datetime.strptime(texto, '%d%m%Y').date()
+    except ValueError:
+        return None
+
+
+def _tag_ofx(bloco, tag):
+    achado = re.search(rf'<{tag}>([^<\r\n]*)', bloco, re.IGNORECASE)
+    return achado.group(1).strip() if achado else ''
+
+
+def ler_ofx(texto):
+    lancamentos = []
+    for numero, bloco in enumerate(re.findall(r'<STMTTRN>(.*?)</STMTTRN>', texto, re.IGNORECASE | re.DOTALL), start=1):
+        try:
+            valor = Decimal(_tag_ofx(bloco, 'TRNAMT').replace(',', '.'))
+        except InvalidOperation:
+            continue
+        if valor <= 0:
+            continue
+        data = _tag_ofx(bloco, 'DTPOSTED')[:8]
+        try:
+            data_pagamento = datetime.datetime.strptime(data, '%Y%m%d').date() if data else None
+        except ValueError:
+            data_pagamento = None
+        descricao = ' '.join(filter(None, (_tag_ofx(bloco, 'NAME'), _tag_ofx(bloco, 'MEMO'))))
+        referencias = (_numero(_tag_ofx(bloco, 'REFNUM')), _numero(_tag_ofx(bloco, 'CHECKNUM')))
+        lancamentos.append(_lancamento(numero, valor, data_pagamento, None, referencias, descricao))
+    return lancamentos
+
+
+def ler_cnab240(linhas):
+    # Layout FEBRABAN: segmento T traz título/nosso número, o U seguinte traz valor e data do pagamento.
+    lancamentos = []
+    atual = None
+    for numero, linha in enumerate(linhas, start=1):
+        if len(linha) < 240 or linha[7] != '3':
+            continue
+        segmento = linha[13]
+        if segmento == 'T':
+            atual = None
+            if linha[15:17] not in OCORRENCIAS_LIQUIDACAO:
+                continue
+            atual = _lancamento(
+                numero,
+                _valor_cnab(linha[81:96]),
+                vencimento=_data_cnab(linha[73:81]),
+                referencias=(_numero(linha[37:57]), _numero(linha[58:73])),
+                descricao=linha[148:188],
+            )
+        elif segmento == 'U' and atual:
+            atual['data_pagamento'] = _data_cnab(linha[137:145])
+            atual['valor_pago'] = _valor_cnab(linha[77:92])
+            lancamentos.append(atual)
+            atual = None
+    return lancamentos
+
+
+def ler_cnab400(linhas):
+    # Posições do retorno CNAB 400 no padrão Bradesco, o mais comum entre os bancos.
+    lancamentos = []
+    for numero, linha in enumerate(linhas, start=1):
+        if len(linha) < 400 or linha[0] != '1' or linha[108:110] not in OCORRENCIAS_LIQUIDACAO:
+            continue
+        lancamento = _lancamento(
+            numero,
+            _valor_cnab(linha[152:165]),
+            data_pagamento=_data_cnab(linha[110:116]),
+            vencimento=_data_cnab(linha[146:152]),
+            referencias=(_numero(linha[70:81]), _numero(linha[116:126])),
+        )
+        lancamento['valor_pago'] = _valor_cnab(linha[253:266])
+        lancamentos.append(lancamento)
+    return lancamentos
+
+
+def ler_arquivo_retorno(conteudo):
+    if isinstance(conteudo, bytes):
+        try:
+            texto = conteudo.decode('utf-8')
+        except UnicodeDecodeError:
+            texto = conteudo.decode('latin-1')
+    else:
+        texto = conteudo
+    if '<OFX>' in texto.upper():
+        return 'OFX', ler_ofx(texto)
+    linhas = [linha.rstrip('\r\n') for linha in texto.splitlines() if linha.strip()]
+    tamanhos = {len(linha) for linha in linhas}
+    if tamanhos and tamanhos <= {240}:
+        return 'CNAB 240', ler_cnab240(linhas)
+    if tamanhos and tamanhos <= {400}:
+        return 'CNAB 400', ler_cnab400(linhas)
+    raise ArquivoRetornoInvalido("Arquivo não reconhecido. Envie um extrato OFX ou um retorno CNAB 240/400.")
+
+
+def _normalizar(texto):
+    return str(texto or '').strip().upper()
+
+
+def _palavras(texto):
+    return set(re.findall(r'[A-Z0-9]+', _normalizar(texto)))
+
+
+def _montar_indice(condominio):
+    abertas = list(
+        Cobranca.objects.filter(condominio=condominio, status__in=STATUS_EM_ABERTO)
+        .select_related('morador__usuario')
+        .order_by('data_vencimento', 'id')
+    )
+    indice = {'por_id': {}, 'por_valor_vencimento': {}, 'por_valor_apto': {}}
+    for cobranca in abertas:
+        indice['por_id'][cobranca.id] = cobranca
+        indice['por_valor_vencimento'].setdefault((cobranca.valor, cobranca.data_vencimento), []).append(cobranca)
+        indice['por_valor_apto'].setdefault((cobranca.valor, _normalizar(cobranca.morador.apartamento)), []).append(cobranca)
+    return indice
+
+
+def _encontrar(lancamento, indice, usadas):
+    valor = lancamento['valor']
+    vencimento = lancamento['vencimento']
+    # 1) nosso número / seu número = id da cobrança, conferindo valor (e vencimento, quando vier no arquivo)
+    for referencia in lancamento['referencias']:
+        cobranca = indice['por_id'].get(int(referencia)) if referencia.isdigit() else None
+        if cobranca and cobranca.id not in usadas and cobranca.valor == valor and (not vencimento or cobranca.data_vencimento == vencimento):
+            return cobranca, 'nosso número'
+    # 2) valor + vencimento, só quando há uma única cobrança em aberto possível
+    if vencimento:
+        candidatas = [c for c in indice['por_valor_vencimento'].get((valor, vencimento), []) if c.id not in usadas]
+        if len(candidatas) == 1:
+            return candidatas[0], 'valor e vencimento'
+    # 3) valor + unidade citada no histórico do extrato (a cobrança mais antiga da unidade)
+    if lancamento['descricao']:
+        palavras = _palavras(lancamento['descricao'])
+        candidatas = [
+            c for palavra in palavras for c in indice['por_valor_apto'].get((valor, palavra), [])
+            if c.id not in usadas and (not c.morador.bloco or _normalizar(c.morador.bloco) in palavras)
+        ]
+        if candidatas:
+            return min(candidatas, key=lambda c: (c.data_vencimento, c.id)), 'unidade'
+    return None, None
+
+
+def conciliar(condominio, lancamentos):
+    indice = _montar_indice(condominio)
+    usadas = set()
+    resultado = {'conciliados': [], 'nao_conciliados': []}
+    for lancamento in lancamentos:
+        if lancamento['valor'] is None:
+            resultado['nao_conciliados'].append(lancamento)
+            continue
+        cobranca, criterio = _encontrar(lancamento, indice, usadas)
+        if cobranca is None:
+            resultado['nao_conciliados'].append(lancamento)
+            continue
+        usadas.add(cobranca.id)
+        resultado['conciliados'].append({'lancamento': lancamento, 'cobranca': cobranca, 'criterio': criterio})
+    resultado['total_conciliado'] = sum((item['cobranca'].valor for item in resultado['conciliados']), Decimal('0'))
+    return resultado
+
+
+def baixar_conciliados(condominio, conciliados, hoje=None):
+    hoje = hoje or datetime.date.today()
+    cobrancas = []
+    estavam_em_analise = False
+    for item in conciliados:
+        cobranca = item['cobranca']
+        estavam_em_analise = estavam_em_analise or cobranca.status == 'EM_ANALISE'
+        cobranca.status = 'PAGO'
+        cobranca.data_pagamento = item['lancamento']['data_pagamento'] or hoje
+        cobrancas.append(cobranca)
+    if not cobrancas:
+        return []
+    with transaction.atomic():
+        # Revalida dentro da transação: só baixa o que ainda está em aberto.
+        ainda_abertas = set(
+            Cobranca.objects.select_for_update()
+            .filter(id__in=[c.id for c in cobrancas], status__in=STATUS_EM_ABERTO)
+            .values_list('id', flat=True)
+        )
+        cobrancas = [c for c in cobrancas if c.id in ainda_abertas]
+        Cobranca.objects.bulk_update(cobrancas, ['status', 'data_pagamento'], batch_size=500)
+        Notificacao.objects.bulk_create([
+            Notificacao(
+                usuario=c.morador.usuario,
+                condominio=condominio,
+                tipo='geral',
+                mensagem=f'Pagamento da cobrança "{c.descricao}" confirmado pelo banco. ✅'[:200],
+                link='/morador/cobrancas/'
+            )
+            for c in cobrancas if c.morador.usuario_id
+        ], batch_size=500)
+        recalcular_resumos({(c.condominio_id, c.data_vencimento) for c in cobrancas})
+    if estavam_em_analise:
+        invalidar_contagem_em_analise(condominio.id)
+    return cobrancas
+
+
+def envios_push(cobrancas):
+    return [
+        (c.morador.usuario, 'Pagamento confirmado', f'Recebemos o pagamento de "{c.descricao}" (R$ {c.valor}).', '/morador/cobrancas/')
+        for c in cobrancas if c.morador.usuario_id
+    ]
@@ -2,10 +2,18 @@ from django.conf import settings
 
 from .models import Notificacao
 
+from .contexto import contexto_do_usuario
+
 def condominio_info(request):
 
     pass
 
+    contexto = contexto_do_usuario(request.user)
+
+    if contexto is not None:
+
+        return {'condominio_atual': contexto.condominio}
+
     if request.user.is_authenticated:
 
         condominio_id = request.session.get('condominio_ativo_id')
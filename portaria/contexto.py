@@ -0,0 +1,86 @@
+from django.contrib.auth.middleware import get_user
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils.functional import SimpleLazyObject, cached_property
+
+# Papel (tipo_usuario) -> related_name do perfil no usuário.
+PERFIS = {'morador': 'morador', 'sindico': 'sindico', 'porteiro': 'porteiro_perfil'}
+
+
+class ContextoCondominio:
+    # Condomínio ativo, papel e perfil do usuário da requisição: cada um resolvido sob demanda e no máximo uma vez.
+
+    def __init__(self, request):
+        self.request = request
+
+    @cached_property
+    def usuario(self):
+        # get_user direto (e não request.user) porque o request.user embrulhado abaixo aponta para este contexto.
+        return get_user(self.request)
+
+    @cached_property
+    def papel(self):
+        return getattr(self.usuario, 'tipo_usuario', None) if self.usuario.is_authenticated else None
+
+    def _relacionado(self, nome):
+        try:
+            return getattr(self.usuario, nome)
+        except ObjectDoesNotExist:
+            return None
+
+    @cached_property
+    def perfil(self):
+        acesso = PERFIS.get(self.papel)
+        return self._relacionado(acesso) if acesso else None
+
+    @cached_property
+    def morador(self):
+        if not self.usuario.is_authenticated:
+            return None
+        return self.perfil if self.papel == 'morador' else self._relacionado('morador')
+
+    @cached_property
+    def condominio(self):
+        usuario = self.usuario
+        if not usuario.is_authenticated:
+            return None
+        condominio_id = self.request.session.get('condominio_ativo_id')
+        if condominio_id:
+            selecionado = usuario.condominios.filter(id=condominio_id).first()
+            if selecionado:
+                return selecionado
+        # Morador fica no condomínio da própria unidade; equipe cai no primeiro vínculo e, sem vínculo, no do perfil.
+        if self.papel == 'morador' and self.perfil:
+            return self.perfil.condominio
+        return usuario.condominios.first() or getattr(self.perfil, 'condominio', None)
+
+    @cached_property
+    def eh_porteiro(self):
+        usuario = self.usuario
+        if usuario.is_superuser:
+            return True
+        return self.papel == 'porteiro' or usuario.is_staff or usuario.groups.filter(name='Portaria').exists()
+
+
+def contexto_do_usuario(usuario):
+    # Só o usuário da requisição corrente carrega o contexto; qualquer outro cai na consulta direta.
+    return getattr(usuario, '_contexto_condominio', None)
+
+
+def _vincular(request, contexto):
+    usuario = get_user(request)
+    usuario._contexto_condominio = contexto
+    return usuario
+
+
+class ContextoCondominioMiddleware:
+    # Fica logo após o AuthenticationMiddleware. Nada é consultado aqui: o contexto só resolve o que a view
+    # (ou o template, o admin, o __str__ do usuário) realmente pedir, e reaproveita no resto da requisição.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        contexto = ContextoCondominio(request)
+        request.contexto_condominio = contexto
+        request.user = SimpleLazyObject(lambda: _vincular(request, contexto))
+        return self.get_response(request)
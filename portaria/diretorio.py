@@ -0,0 +1,69 @@
+import datetime
+import hashlib
+
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+
+from .models import Condominio, Morador, MoradorRemovido
+
+CAMPOS_DIRETORIO = ('id', 'nome', 'bloco', 'apartamento', 'telefone')
+# O cursor volta um pouco no tempo: cobre transações que gravaram atualizado_em antes e só commitaram depois da leitura.
+MARGEM_CURSOR = datetime.timedelta(minutes=2)
+RETENCAO_REMOVIDOS = datetime.timedelta(days=30)
+
+
+def _do_condominio(queryset, condominio_id):
+    return queryset.filter(condominio_id=condominio_id) if condominio_id else queryset
+
+
+def marcar_diretorio_alterado(condominio_id):
+    # Contador incrementado na mesma transação da alteração: o ETag muda junto com o commit.
+    Condominio.objects.filter(pk=condominio_id).update(versao_moradores=F('versao_moradores') + 1)
+
+
+def registrar_remocao(condominio_id, morador_id):
+    MoradorRemovido.objects.create(condominio_id=condominio_id, morador_id=morador_id)
+    MoradorRemovido.objects.filter(condominio_id=condominio_id, removido_em__lt=timezone.now() - RETENCAO_REMOVIDOS).delete()
+    marcar_diretorio_alterado(condominio_id)
+
+
+def versao_diretorio(condominio_id):
+    # Sem condomínio (admin/porteiro global) o diretório é de todos: soma os contadores.
+    condominios = Condominio.objects.filter(pk=condominio_id) if condominio_id else Condominio.objects.all()
+    versao = condominios.aggregate(v=Sum('versao_moradores'))['v'] or 0
+    alteracao = _do_condominio(Morador.objects, condominio_id).aggregate(u=Max('atualizado_em'))['u']
+    remocao = _do_condominio(MoradorRemovido.objects, condominio_id).aggregate(u=Max('removido_em'))['u']
+    ultima = max(filter(None, (alteracao, remocao)), default=None)
+    cursor = ultima.isoformat() if ultima else ''
+    etag = hashlib.sha1(f'{condominio_id}:{versao}:{cursor}'.encode()).hexdigest()[:20]
+    return f'"{etag}"', cursor
+
+
+def ler_cursor(texto):
+    try:
+        desde = datetime.datetime.fromisoformat(texto or '')
+    except ValueError:
+        return None
+    if timezone.is_naive(desde):
+        desde = timezone.make_aware(desde, datetime.timezone.utc)
+    return desde
+
+
+def moradores_do_diretorio(condominio_id, desde=None):
+    moradores = _do_condominio(Morador.objects, condominio_id)
+    # Cursor mais antigo que a retenção das marcas de remoção não garante o delta: manda o diretório completo.
+    if desde is None or desde < timezone.now() - RETENCAO_REMOVIDOS:
+        return {
+            'completo': True,
+            'moradores': list(moradores.order_by('bloco', 'apartamento').values(*CAMPOS_DIRETORIO)),
+            'removidos': [],
+        }
+    limite = desde - MARGEM_CURSOR
+    return {
+        'completo': False,
+        'moradores': list(moradores.filter(atualizado_em__gt=limite).order_by().values(*CAMPOS_DIRETORIO)),
+        'removidos': list(
+            _do_condominio(MoradorRemovido.objects, condominio_id)
+            .filter(removido_em__gt=limite).order_by().values_list('morador_id', flat=True).distinct()
+        ),
+    }
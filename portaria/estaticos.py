@@ -0,0 +1,121 @@
+import functools
+import gzip
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    # Sem o pacote brotli o collectstatic gera só o .gz.
+    brotli = None
+
+EXTENSOES_COMPRIMIVEIS = ('.css', '.js', '.json', '.svg', '.txt', '.html', '.xml', '.map', '.ico', '.webmanifest')
+TAMANHO_MINIMO = 512
+CACHE_VERSIONADO = 'public, max-age=31536000, immutable'
+CACHE_SEM_VERSAO = 'public, max-age=300'
+# Ordem de preferência: brotli comprime melhor que gzip.
+CODIFICACOES = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _gravar_se_menor(destino, original, comprimido):
+    # Variante que não economiza pelo menos 5% não vale o desvio de arquivo.
+    if len(comprimido) < len(original) * 0.95:
+        with open(destino, 'wb') as saida:
+            saida.write(comprimido)
+
+
+def comprimir_arquivo(caminho):
+    with open(caminho, 'rb') as arquivo:
+        conteudo = arquivo.read()
+    if len(conteudo) < TAMANHO_MINIMO:
+        return
+    # mtime=0: o mesmo arquivo gera sempre o mesmo .gz (builds reproduzíveis, sem diffs à toa).
+    _gravar_se_menor(caminho + '.gz', conteudo, gzip.compress(conteudo, compresslevel=9, mtime=0))
+    if brotli:
+        _gravar_se_menor(caminho + '.br', conteudo, brotli.compress(conteudo, quality=11))
+
+
+class ArmazenamentoEstatico(ManifestStaticFilesStorage):
+    # Nomes com hash de conteúdo (via staticfiles.json) + variantes .gz/.br geradas no collectstatic.
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for nome in {*self.hashed_files.keys(), *self.hashed_files.values()}:
+            if nome.lower().endswith(EXTENSOES_COMPRIMIVEIS) and self.exists(nome):
+                comprimir_arquivo(self.path(nome))
+
+    def stored_name(self, name):
+        # Sem collectstatic (dev, testes, deploy esquecido) a página não quebra: usa o nome sem hash.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+
+@functools.lru_cache(maxsize=1)
+def _versionados():
+    # staticfiles.json é lido uma vez por processo; um deploy novo recarrega a aplicação.
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def eh_versionado(nome):
+    return nome in _versionados()
+
+
+def _variante(caminho, aceitas):
+    for codificacao, sufixo in CODIFICACOES:
+        if codificacao in aceitas and os.path.isfile(caminho + sufixo):
+            return caminho + sufixo, codificacao
+    return caminho, None
+
+
+def servir_estatico(request, nome):
+    try:
+        caminho = safe_join(settings.STATIC_ROOT, nome)
+    except SuspiciousFileOperation:
+        return None
+    if not os.path.isfile(caminho):
+        return None
+    versionado = eh_versionado(nome)
+    estado = os.stat(caminho)
+    if not versionado and not was_modified_since(request.headers.get('If-Modified-Since'), estado.st_mtime):
+        return HttpResponseNotModified()
+    aceitas = {parte.split(';')[0].strip() for parte in request.headers.get('Accept-Encoding', '').split(',')}
+    arquivo, codificacao = _variante(caminho, aceitas)
+    tipo, _ = mimetypes.guess_type(caminho)
+    resposta = FileResponse(open(arquivo, 'rb'), content_type=tipo or 'application/octet-stream')
+    if codificacao:
+        resposta['Content-Encoding'] = codificacao
+    resposta['Vary'] = 'Accept-Encoding'
+    resposta['Last-Modified'] = http_date(estado.st_mtime)
+    # Nome com hash nunca muda de conteúdo: o navegador não precisa nem revalidar.
+    resposta['Cache-Control'] = CACHE_VERSIONADO if versionado else CACHE_SEM_VERSAO
+    return resposta
+
+
+class EstaticosMiddleware:
+    # Serve o STATIC_ROOT pela própria aplicação (hosts sem nginx configurável, como o PythonAnywhere).
+    # Fica logo após o SecurityMiddleware: arquivo estático não passa por sessão, autenticação nem view.
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVIR_ESTATICOS', False) or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefixo = '/' + settings.STATIC_URL.lstrip('/')
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path.startswith(self.prefixo):
+            resposta = servir_estatico(request, request.path[len(self.prefixo):])
+            if resposta is not None:
+                return resposta
+        return self.get_response(request)
@@ -0,0 +1,151 @@
+import csv
+import io
+import os
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django.db import transaction
+
+from .financeiro import recalcular_resumos
+from .models import Cobranca, Condominio, Morador
+from .utils import disparar_push_em_massa
+
+MODOS_FATURAMENTO = ('fixo', 'valores', 'fracao')
+CENTAVO = Decimal('0.01')
+
+
+class FaturamentoInvalido(ValueError):
+    pass
+
+
+def _normalizar(valor):
+    return str(valor or '').strip().upper()
+
+
+def ler_valor(texto, campo):
+    try:
+        valor = Decimal(str(texto).strip().replace(',', '.'))
+    except (InvalidOperation, ValueError):
+        raise FaturamentoInvalido(f"{campo} inválido: {texto!r}")
+    if valor < 0:
+        raise FaturamentoInvalido(f"{campo} não pode ser negativo.")
+    return valor
+
+
+def listar_unidades(condominio, bloco=None):
+    moradores = Morador.objects.filter(condominio=condominio).exclude(status_aprovacao='RECUSADO').exclude(apartamento='')
+    if bloco:
+        moradores = moradores.filter(bloco=bloco)
+    # Uma cobrança por unidade: o responsável é o primeiro morador com conta de acesso (ou o mais antigo).
+    unidades = {}
+    for morador in moradores.select_related('usuario').order_by('id'):
+        chave = (_normalizar(morador.bloco), _normalizar(morador.apartamento))
+        atual = unidades.get(chave)
+        if atual is None or (atual.usuario_id is None and morador.usuario_id is not None):
+            unidades[chave] = morador
+    return unidades
+
+
+def ler_tabela_unidades(texto):
+    tabela = {}
+    for numero, linha in enumerate(csv.reader(io.StringIO(texto or ''), delimiter=';'), start=1):
+        linha = [c.strip() for c in linha]
+        if not any(linha) or linha[0].lower() == 'bloco':
+            continue
+        if len(linha) < 3:
+            raise FaturamentoInvalido(f"Linha {numero} da tabela: use bloco;apartamento;valor[;chave pix].")
+        chave = (_normalizar(linha[0]), _normalizar(linha[1]))
+        tabela[chave] = {
+            'valor': ler_valor(linha[2], f"Valor da linha {numero}"),
+            'chave_pix': linha[3] if len(linha) > 3 else '',
+        }
+    return tabela
+
+
+def mapear_boletos(arquivos):
+    # O nome do arquivo identifica a unidade: "A-101.pdf", "A_101.pdf" ou "101.pdf" (sem bloco).
+    boletos = {}
+    for arquivo in arquivos or []:
+        base = os.path.splitext(os.path.basename(arquivo.name))[0]
+        partes = [p for p in re.split(r'[-_ ]+', base) if p]
+        if not partes:
+            continue
+        chave = (_normalizar(partes[0]), _normalizar(partes[1])) if len(partes) > 1 else ('', _normalizar(partes[0]))
+        boletos[chave] = arquivo
+    return boletos
+
+
+def _valores_por_unidade(unidades, modo, valor, tabela):
+    if modo == 'fixo':
+        return {chave: valor for chave in unidades}
+    if modo == 'valores':
+        return {chave: tabela[chave]['valor'] for chave in unidades if chave in tabela}
+    total_fracoes = sum((tabela[chave]['valor'] for chave in unidades if chave in tabela), Decimal('0'))
+    if not total_fracoes:
+        raise FaturamentoInvalido("Nenhuma fração ideal informada para as unidades selecionadas.")
+    # Frações em qualquer escala (0,0125 ou 1,25%): o rateio é proporcional à soma das unidades faturadas.
+    return {
+        chave: (valor * tabela[chave]['valor'] / total_fracoes).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+        for chave in unidades if chave in tabela
+    }
+
+
+def gerar_cobrancas_mes(condominio, competencia, descricao, data_vencimento, modo='fixo', valor=None,
+                        tabela=None, bloco=None, chave_pix='', boletos=None, notificar=True):
+    if modo not in MODOS_FATURAMENTO:
+        raise FaturamentoInvalido(f"Modo inválido: {modo}")
+    if modo in ('fixo', 'fracao') and not valor:
+        raise FaturamentoInvalido("Informe o valor da cobrança.")
+    if modo in ('valores', 'fracao') and not tabela:
+        raise FaturamentoInvalido("Informe a tabela de valores ou frações por unidade.")
+    competencia = competencia.replace(day=1)
+    tabela = tabela or {}
+    boletos = boletos or {}
+
+    unidades = listar_unidades(condominio, bloco=bloco)
+    valores = _valores_por_unidade(unidades, modo, valor, tabela)
+    resultado = {'unidades': len(unidades), 'criadas': 0, 'ja_faturadas': 0, 'sem_valor': len(unidades) - len(valores), 'total': Decimal('0')}
+
+    with transaction.atomic():
+        # Trava o condomínio antes da checagem: duas gerações simultâneas do mesmo mês rodam uma depois da outra,
+        # e a segunda já enxerga as cobranças da primeira. Sem ignore_conflicts, novas é exatamente o que foi gravado.
+        Condominio.objects.select_for_update().only('id').get(pk=condominio.pk)
+        # Idempotência por (condomínio, competência): unidades já faturadas no mês são puladas.
+        ja_faturadas = {
+            (_normalizar(b), _normalizar(a))
+            for b, a in Cobranca.objects.filter(condominio=condominio, competencia=competencia)
+            .values_list('morador__bloco', 'morador__apartamento')
+        }
+        novas = []
+        for chave, valor_unidade in valores.items():
+            if chave in ja_faturadas:
+                resultado['ja_faturadas'] += 1
+                continue
+            morador = unidades[chave]
+            cobranca = Cobranca(
+                condominio=condominio,
+                morador=morador,
+                descricao=descricao,
+                valor=valor_unidade,
+                data_vencimento=data_vencimento,
+                competencia=competencia,
+                chave_pix=(tabela.get(chave) or {}).get('chave_pix') or chave_pix or None,
+            )
+            boleto = boletos.get(chave) or boletos.get(('', chave[1]))
+            if boleto:
+                cobranca.arquivo_boleto = boleto
+            novas.append(cobranca)
+        Cobranca.objects.bulk_create(novas, batch_size=500)
+        # bulk_create não dispara post_save: o resumo do mês é recalculado uma vez aqui.
+        recalcular_resumos([(condominio.id, data_vencimento)])
+
+    resultado['criadas'] = len(novas)
+    resultado['total'] = sum((c.valor for c in novas), Decimal('0'))
+    if notificar and novas:
+        disparar_push_em_massa(
+            (c.morador.usuario, "Nova Cobrança",
+             f"Foi gerada a cobrança '{descricao}' no valor de R$ {c.valor} com vencimento em {data_vencimento:%d/%m/%Y}.",
+             "/morador/cobrancas/")
+            for c in novas if c.morador.usuario_id
+        )
+    return resultado
@@ -0,0 +1,156 @@
+import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Cobranca, Condominio, ResumoFinanceiroMensal
+
+STATUS_EM_ABERTO = ('PENDENTE', 'EM_ANALISE', 'ATRASADO')
+CAMPO_QTD_POR_STATUS = {
+    'PENDENTE': 'qtd_pendente',
+    'EM_ANALISE': 'qtd_em_analise',
+    'PAGO': 'qtd_pago',
+    'ATRASADO': 'qtd_atrasado',
+    'CANCELADO': 'qtd_cancelado',
+}
+CAMPOS_RESUMO = ('valor_faturado', 'valor_recebido', 'valor_em_aberto', 'valor_atrasado', *CAMPO_QTD_POR_STATUS.values())
+
+
+def mes_de(data):
+    if isinstance(data, str):
+        data = datetime.date.fromisoformat(data[:10])
+    if isinstance(data, datetime.datetime):
+        data = data.date()
+    return data.replace(day=1)
+
+
+def _proximo_mes(mes):
+    return (mes + datetime.timedelta(days=32)).replace(day=1)
+
+
+def _montar_resumo(condominio_id, mes, linhas_por_status):
+    resumo = ResumoFinanceiroMensal(condominio_id=condominio_id, mes=mes)
+    for status, quantidade, total in linhas_por_status:
+        total = total or Decimal('0')
+        campo = CAMPO_QTD_POR_STATUS.get(status)
+        if campo:
+            setattr(resumo, campo, quantidade)
+        if status != 'CANCELADO':
+            resumo.valor_faturado += total
+        if status == 'PAGO':
+            resumo.valor_recebido += total
+        if status in STATUS_EM_ABERTO:
+            resumo.valor_em_aberto += total
+        if status == 'ATRASADO':
+            resumo.valor_atrasado += total
+    return resumo
+
+
+def recalcular_resumos(buckets):
+    # Cada bucket (condomínio, mês) é recalculado a partir das cobranças daquele mês apenas,
+    # usando o índice (condominio, data_vencimento): custo proporcional às unidades, não ao histórico.
+    meses = {(condominio_id, mes_de(data)) for condominio_id, data in buckets if condominio_id and data}
+    for condominio_id, mes in sorted(meses):
+        with transaction.atomic():
+            # Trava a linha do condomínio: dois saves simultâneos do mesmo mês agregam um depois do outro,
+            # e o agregado gravado nunca é mais velho que o último commit.
+            if not Condominio.objects.select_for_update().only('id').filter(pk=condominio_id).first():
+                # Condomínio sendo excluído (cascata das cobranças): não há resumo a manter.
+                continue
+            linhas = (
+                Cobranca.objects
+                .filter(condominio_id=condominio_id, data_vencimento__gte=mes, data_vencimento__lt=_proximo_mes(mes))
+                .order_by()
+                .values_list('status')
+                .annotate(quantidade=Count('id'), total=Sum('valor'))
+            )
+            resumo = _montar_resumo(condominio_id, mes, linhas)
+            if resumo.qtd_pendente or resumo.qtd_em_analise or resumo.qtd_pago or resumo.qtd_atrasado or resumo.qtd_cancelado:
+                ResumoFinanceiroMensal.objects.update_or_create(
+                    condominio_id=condominio_id, mes=mes, defaults={campo: getattr(resumo, campo) for campo in CAMPOS_RESUMO},
+                )
+            else:
+                ResumoFinanceiroMensal.objects.filter(condominio_id=condominio_id, mes=mes).delete()
+
+
+def reconstruir_resumos(condominio_ids=None):
+    cobrancas = Cobranca.objects.all()
+    resumos = ResumoFinanceiroMensal.objects.all()
+    if condominio_ids is not None:
+        cobrancas = cobrancas.filter(condominio_id__in=condominio_ids)
+        resumos = resumos.filter(condominio_id__in=condominio_ids)
+    agrupado = {}
+    linhas = (
+        cobrancas.order_by()
+        .annotate(mes=TruncMonth('data_vencimento'))
+        .values_list('condominio_id', 'mes', 'status')
+        .annotate(quantidade=Count('id'), total=Sum('valor'))
+    )
+    for condominio_id, mes, status, quantidade, total in linhas:
+        agrupado.setdefault((condominio_id, mes_de(mes)), []).append((status, quantidade, total))
+    novos = [_montar_resumo(condominio_id, mes, itens) for (condominio_id, mes), itens in agrupado.items()]
+    with transaction.atomic():
+        resumos.delete()
+        ResumoFinanceiroMensal.objects.bulk_create(novos, batch_size=500)
+    return len(novos)
+
+
+def indicadores_financeiros(condominio, meses=6, hoje=None):
+    hoje = hoje or datetime.date.today()
+    resumos = list(ResumoFinanceiroMensal.objects.filter(condominio=condominio).order_by('mes'))
+    totais = {campo: sum(getattr(r, campo) for r in resumos) for campo in CAMPO_QTD_POR_STATUS.values()}
+    mes_atual = mes_de(hoje)
+    inicio_serie = mes_atual
+    for _ in range(meses - 1):
+        inicio_serie = (inicio_serie - datetime.timedelta(days=1)).replace(day=1)
+    por_mes = {r.mes: r for r in resumos}
+    serie = []
+    mes = inicio_serie
+    while mes <= mes_atual:
+        serie.append(por_mes.get(mes) or ResumoFinanceiroMensal(condominio=condominio, mes=mes))
+        mes = _proximo_mes(mes)
+    faturado = sum((r.valor_faturado for r in resumos), Decimal('0'))
+    atrasado = sum((r.valor_atrasado for r in resumos), Decimal('0'))
+    return {
+        'totais': totais,
+        'mes_atual': por_mes.get(mes_atual) or ResumoFinanceiroMensal(condominio=condominio, mes=mes_atual),
+        'serie': serie,
+        'valor_em_aberto': sum((r.valor_em_aberto for r in resumos), Decimal('0')),
+        'valor_atrasado': atrasado,
+        'taxa_inadimplencia': round(float(atrasado) * 100 / float(faturado), 1) if faturado else 0,
+    }
+
+
+def contagem_por_status(condominio, de=None, ate=None):
+    # Granularidade mensal: com filtro de datas, conta os meses que o intervalo toca.
+    resumos = ResumoFinanceiroMensal.objects.filter(condominio=condominio)
+    if de:
+        resumos = resumos.filter(mes__gte=mes_de(de))
+    if ate:
+        resumos = resumos.filter(mes__lte=mes_de(ate))
+    totais = resumos.aggregate(**{campo: Sum(campo) for campo in CAMPO_QTD_POR_STATUS.values()})
+    contagem = {status: totais[campo] or 0 for status, campo in CAMPO_QTD_POR_STATUS.items()}
+    contagem['TOTAL'] = sum(contagem.values())
+    return contagem
+
+
+CACHE_EM_ANALISE = 'cobrancas_em_analise:{}'
+CACHE_EM_ANALISE_TTL = 300
+
+
+def contar_cobrancas_em_analise(condominio_id):
+    # Cache por condomínio; os signals de Cobranca invalidam quando uma cobrança entra ou sai de EM_ANALISE.
+    # O TTL curto cobre caches locais por processo, onde a invalidação só alcança o próprio worker.
+    chave = CACHE_EM_ANALISE.format(condominio_id)
+    total = cache.get(chave)
+    if total is None:
+        total = Cobranca.objects.filter(condominio_id=condominio_id, status='EM_ANALISE').count()
+        cache.set(chave, total, CACHE_EM_ANALISE_TTL)
+    return total
+
+
+def invalidar_contagem_em_analise(condominio_id):
+    cache.delete(CACHE_EM_ANALISE.format(condominio_id))
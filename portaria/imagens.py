@@ -0,0 +1,171 @@
+import io
+import logging
+import os
+import queue
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+LARGURAS = (320, 640, 1280)
+FORMATOS = (
+    ('WEBP', 'webp', {'quality': 78, 'method': 4}),
+    ('JPEG', 'jpg', {'quality': 80, 'optimize': True, 'progressive': True}),
+)
+PASTA_DERIVADOS = 'derivados'
+CAMPOS_IMAGEM = (
+    ('portaria.Aviso', 'imagem'),
+    ('portaria.AreaComum', 'imagem'),
+    ('portaria.Ocorrencia', 'foto'),
+    ('portaria.LivroOcorrenciaZelador', 'foto'),
+    ('portaria.OrdemServico', 'foto_conclusao'),
+    ('portaria.Solicitacao', 'arquivo'),
+)
+EXTENSOES_IMAGEM = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff', '.heic', '.mpo')
+CACHE_DERIVADOS = 'derivados:{}'
+
+
+def eh_imagem(nome):
+    return os.path.splitext(nome or '')[1].lower() in EXTENSOES_IMAGEM
+
+
+def caminho_derivado(nome, largura, extensao):
+    base = os.path.splitext(nome)[0]
+    return f'{PASTA_DERIVADOS}/{base}_{largura}.{extensao}'
+
+
+def _salvar(destino, conteudo):
+    if default_storage.exists(destino):
+        default_storage.delete(destino)
+    default_storage.save(destino, ContentFile(conteudo))
+
+
+def gerar_derivados(nome):
+    if not eh_imagem(nome):
+        return False
+    try:
+        with default_storage.open(nome, 'rb') as arquivo:
+            imagem = Image.open(arquivo)
+            formato = imagem.format
+            # Só regrava o original quando há EXIF a remover (GPS, aparelho); sem isso, decodifica já reduzido.
+            remover_exif = formato in ('JPEG', 'MPO', 'WEBP') and bool(imagem.getexif())
+            if not remover_exif:
+                imagem.draft('RGB', (max(LARGURAS), max(LARGURAS)))
+            imagem.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        logger.warning("Não foi possível gerar derivados de %s: %s", nome, e)
+        return False
+
+    imagem = ImageOps.exif_transpose(imagem)
+    if imagem.mode not in ('RGB', 'RGBA'):
+        imagem = imagem.convert('RGBA' if 'A' in imagem.getbands() or 'transparency' in imagem.info else 'RGB')
+
+    for largura in LARGURAS:
+        copia = imagem.copy()
+        copia.thumbnail((largura, largura * 4), Image.Resampling.LANCZOS)
+        for formato_saida, extensao, opcoes in FORMATOS:
+            buffer = io.BytesIO()
+            (copia.convert('RGB') if formato_saida == 'JPEG' else copia).save(buffer, formato_saida, **opcoes)
+            _salvar(caminho_derivado(nome, largura, extensao), buffer.getvalue())
+
+    if remover_exif:
+        buffer = io.BytesIO()
+        imagem.convert('RGB').save(buffer, 'WEBP' if formato == 'WEBP' else 'JPEG', quality=90)
+        _salvar(nome, buffer.getvalue())
+
+    cache.set(CACHE_DERIVADOS.format(nome), True, 86400)
+    return True
+
+
+def derivados_prontos(nome):
+    # O JPEG maior é o último a ser gravado: se existe, o conjunto está completo. Só o resultado positivo vai para o cache.
+    if not eh_imagem(nome):
+        return False
+    chave = CACHE_DERIVADOS.format(nome)
+    if cache.get(chave):
+        return True
+    pronto = default_storage.exists(caminho_derivado(nome, LARGURAS[-1], 'jpg'))
+    if pronto:
+        cache.set(chave, True, 86400)
+    return pronto
+
+
+_fila = queue.Queue()
+_worker = None
+_trava_worker = threading.Lock()
+
+
+def _consumir_fila():
+    while True:
+        nome = _fila.get()
+        try:
+            gerar_derivados(nome)
+        except Exception:
+            logger.exception("Falha ao gerar derivados de %s", nome)
+        finally:
+            _fila.task_done()
+
+
+def _garantir_worker():
+    # Um único worker por processo: as imagens são processadas uma de cada vez, limitando CPU e memória do Pillow.
+    global _worker
+    with _trava_worker:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_consumir_fila, name='derivados-imagens', daemon=True)
+            _worker.start()
+
+
+def agendar_derivados(nomes):
+    nomes = [nome for nome in nomes if eh_imagem(nome)]
+    if not nomes:
+        return
+    if not getattr(settings, 'IMAGENS_SEGUNDO_PLANO', True):
+        for nome in nomes:
+            gerar_derivados(nome)
+        return
+
+    def enfileirar():
+        _garantir_worker()
+        for nome in nomes:
+            _fila.put(nome)
+
+    transaction.on_commit(enfileirar)
+
+
+def _campos_do_modelo():
+    campos = {}
+    for modelo, campo in CAMPOS_IMAGEM:
+        campos.setdefault(apps.get_model(modelo), []).append(campo)
+    return campos
+
+
+def _marcar_uploads(sender, instance, **kwargs):
+    # Arquivo recém-enviado ainda não foi gravado no storage (_committed False) quando o pre_save dispara.
+    instance._imagens_novas = [
+        campo for campo in CAMPOS_POR_MODELO.get(sender, [])
+        if getattr(instance, campo) and not getattr(instance, campo)._committed
+    ]
+
+
+def _processar_uploads(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    agendar_derivados([getattr(instance, campo).name for campo in getattr(instance, '_imagens_novas', [])])
+
+
+CAMPOS_POR_MODELO = {}
+
+
+def conectar_sinais():
+    CAMPOS_POR_MODELO.update(_campos_do_modelo())
+    for modelo in CAMPOS_POR_MODELO:
+        pre_save.connect(_marcar_uploads, sender=modelo, dispatch_uid=f'derivados_pre_{modelo._meta.label}')
+        post_save.connect(_processar_uploads, sender=modelo, dispatch_uid=f'derivados_post_{modelo._meta.label}')
@@ -0,0 +1,395 @@
+import csv
+import datetime
+import functools
+import io
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.db import connection, transaction, DatabaseError
+from django.db.models import Q
+from django.utils import timezone
+
+from .diretorio import marcar_diretorio_alterado
+from .models import Morador, ImportacaoMoradores
+
+COLUNAS = ('nome', 'apartamento', 'bloco', 'telefone', 'email', 'cpf')
+SENHA_PADRAO = 'mudar123'
+TAMANHO_LOTE = 500
+# Sem progresso por mais que isso, a importação é dada como interrompida (cada lote grava progresso em segundos).
+PARADA_APOS = datetime.timedelta(minutes=15)
+
+
+def _mapear_cabecalho(cabecalho):
+    nomes = [str(c or '').strip().lower() for c in cabecalho]
+    if 'nome' not in nomes or 'apartamento' not in nomes:
+        return None
+    return [nomes.index(campo) if campo in nomes else None for campo in COLUNAS]
+
+
+def _iterar_linhas_brutas(arquivo, nome_arquivo, delimitador=None, encoding='utf-8-sig'):
+    nome_arquivo = nome_arquivo.lower()
+    if nome_arquivo.endswith('.xlsx'):
+        import openpyxl
+        wb = openpyxl.load_workbook(arquivo, read_only=True)
+        try:
+            for row in wb.active.iter_rows(values_only=True):
+                yield [str(c).strip() if c is not None else '' for c in (row or ())]
+        finally:
+            wb.close()
+    elif nome_arquivo.endswith('.xls'):
+        import xlrd
+        wb = xlrd.open_workbook(file_contents=arquivo.read())
+        ws = wb.sheet_by_index(0)
+        for i in range(ws.nrows):
+            yield [str(ws.cell_value(i, j)).strip() for j in range(ws.ncols)]
+    elif nome_arquivo.endswith('.csv'):
+        texto = io.TextIOWrapper(getattr(arquivo, 'file', arquivo), encoding=encoding, newline='')
+        try:
+            cabecalho = texto.readline()
+            if not delimitador:
+                delimitador = ',' if ';' not in cabecalho and ',' in cabecalho else ';'
+            yield next(csv.reader([cabecalho], delimiter=delimitador), [])
+            for row in csv.reader(texto, delimiter=delimitador):
+                yield [c.strip() for c in row]
+        finally:
+            texto.detach()
+    else:
+        raise ValueError("Formato não suportado. Use .xlsx, .xls ou .csv")
+
+
+def ler_linhas_planilha(arquivo, nome_arquivo, delimitador=None, encoding='utf-8-sig'):
+    linhas = _iterar_linhas_brutas(arquivo, nome_arquivo, delimitador, encoding)
+    cabecalho = next(linhas, None)
+    if cabecalho is None:
+        return
+    # Com cabeçalho nomeado (ex.: planilhas de gerar_planilha_final.py) as colunas podem vir em qualquer ordem.
+    mapa = _mapear_cabecalho(cabecalho)
+    for row in linhas:
+        if not any(row):
+            continue
+        if mapa:
+            row = [row[i] if i is not None and i < len(row) else '' for i in mapa]
+        yield row
+
+
+def estimar_total_linhas(arquivo, nome_arquivo):
+    nome_arquivo = nome_arquivo.lower()
+    try:
+        if nome_arquivo.endswith('.csv'):
+            total = 0
+            for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+                total += bloco.count(b'\n')
+            return max(total - 1, 0)
+        if nome_arquivo.endswith('.xlsx'):
+            import openpyxl
+            wb = openpyxl.load_workbook(arquivo, read_only=True)
+            try:
+                return max((wb.active.max_row or 1) - 1, 0)
+            finally:
+                wb.close()
+    except Exception:
+        return None
+    finally:
+        if hasattr(arquivo, 'seek'):
+            arquivo.seek(0)
+    return None
+
+
+def gerar_username(nome, apartamento, bloco, existentes):
+    base_username = f"{nome.split()[0].lower()}.{apartamento}"
+    if bloco:
+        base_username += f".{bloco.lower()}"
+    username = base_username
+    counter = 1
+    while username in existentes:
+        username = f"{base_username}{counter}"
+        counter += 1
+    existentes.add(username)
+    return username
+
+
+@functools.cache
+def _limites_colunas():
+    return tuple((campo, Morador._meta.get_field(campo).max_length) for campo in COLUNAS)
+
+
+def _validar_linha(linha, numero):
+    dados = {campo: (linha[i].strip() if len(linha) > i and linha[i] else '') for i, campo in enumerate(COLUNAS)}
+    if not dados['nome'] or not dados['apartamento']:
+        raise ValueError(f"Linha {numero}: Nome e apartamento são obrigatórios.")
+    for campo, limite in _limites_colunas():
+        if limite and len(dados[campo]) > limite:
+            raise ValueError(f"Linha {numero}: {campo} longo demais (máximo {limite} caracteres).")
+    return dados
+
+
+def _gravar_lote(condominio, lote, senha_hash):
+    User = get_user_model()
+    Vinculo = User.condominios.through
+    campo_usuario = User.condominios.field.m2m_field_name()
+    campo_condominio = User.condominios.field.m2m_reverse_field_name()
+    with transaction.atomic():
+        usuarios = User.objects.bulk_create([
+            User(
+                username=dados['username'],
+                password=senha_hash,
+                first_name=dados['nome'].split()[0],
+                email=dados['email'],
+                tipo_usuario='morador',
+            ) for _, dados in lote
+        ])
+        Vinculo.objects.bulk_create([
+            Vinculo(**{f'{campo_usuario}_id': u.id, f'{campo_condominio}_id': condominio.id})
+            for u in usuarios
+        ])
+        Morador.objects.bulk_create([
+            Morador(
+                condominio=condominio,
+                nome=dados['nome'],
+                bloco=dados['bloco'],
+                apartamento=dados['apartamento'],
+                telefone=dados['telefone'],
+                email=dados['email'],
+                cpf=dados['cpf'],
+                usuario=u,
+            ) for (_, dados), u in zip(lote, usuarios)
+        ])
+        # bulk_create não dispara post_save: o diretório offline da portaria é invalidado aqui.
+        marcar_diretorio_alterado(condominio.id)
+    return len(usuarios)
+
+
+def _gravar_com_isolamento(condominio, lote, senha_hash, resultado):
+    try:
+        resultado['criados'] += _gravar_lote(condominio, lote, senha_hash)
+        return
+    except DatabaseError:
+        pass
+    # O lote falhou inteiro: regrava linha a linha para isolar apenas as que têm problema.
+    for item in lote:
+        numero, dados = item
+        try:
+            resultado['criados'] += _gravar_lote(condominio, [item], senha_hash)
+        except DatabaseError as e:
+            resultado['erros'].append({
+                'linha': numero,
+                'valores': [dados[c] for c in COLUNAS],
+                'motivo': f"Linha {numero} ({dados['nome']}): {e}",
+            })
+
+
+def _chave_unidade(bloco, apartamento, nome):
+    return (bloco.strip().lower(), apartamento.strip().lower(), nome.strip().lower())
+
+
+def importar_moradores(condominio, linhas, senha_padrao=SENHA_PADRAO, tamanho_lote=TAMANHO_LOTE, ao_progredir=None):
+    User = get_user_model()
+    existentes = set(User.objects.values_list('username', flat=True))
+    # Quem já mora na unidade com o mesmo nome é ignorado, então reenviar a planilha corrigida não duplica ninguém.
+    ja_cadastrados = {
+        _chave_unidade(*valores)
+        for valores in Morador.objects.filter(condominio=condominio).values_list('bloco', 'apartamento', 'nome')
+    }
+    senha_hash = make_password(senha_padrao)
+    resultado = {'processadas': 0, 'criados': 0, 'ignorados': 0, 'erros': []}
+    lote = []
+    for numero, linha in enumerate(linhas, start=1):
+        resultado['processadas'] += 1
+        try:
+            dados = _validar_linha(linha, numero)
+        except ValueError as e:
+            resultado['erros'].append({'linha': numero, 'valores': list(linha), 'motivo': str(e)})
+            continue
+        chave = _chave_unidade(dados['bloco'], dados['apartamento'], dados['nome'])
+        if chave in ja_cadastrados:
+            resultado['ignorados'] += 1
+            continue
+        ja_cadastrados.add(chave)
+        dados['username'] = gerar_username(dados['nome'], dados['apartamento'], dados['bloco'], existentes)
+        lote.append((numero, dados))
+        if len(lote) >= tamanho_lote:
+            _gravar_com_isolamento(condominio, lote, senha_hash, resultado)
+            lote = []
+            if ao_progredir:
+                ao_progredir(resultado)
+    if lote:
+        _gravar_com_isolamento(condominio, lote, senha_hash, resultado)
+    if ao_progredir:
+        ao_progredir(resultado)
+    return resultado
+
+
+CAMPOS_SINCRONIZADOS = ('nome', 'bloco', 'apartamento', 'telefone', 'email', 'cpf')
+CHAVES_SINCRONIZACAO = ('cpf', 'unidade')
+
+
+def _chave_sincronizacao(chave, dados):
+    if chave == 'cpf':
+        cpf = ''.join(c for c in dados['cpf'] if c.isdigit())
+        return cpf or None
+    return _chave_unidade(dados['bloco'], dados['apartamento'], dados['nome'])
+
+
+def sincronizar_moradores(condominio, linhas, chave='cpf', tamanho_lote=1000, dry_run=False, ao_progredir=None):
+    if chave not in CHAVES_SINCRONIZACAO:
+        raise ValueError(f"Chave inválida: {chave}. Use {' ou '.join(CHAVES_SINCRONIZACAO)}.")
+    # Índice em memória dos moradores já existentes: uma única consulta, sem get_or_create por linha.
+    existentes = {}
+    for valores in Morador.objects.filter(condominio=condominio).values_list('id', *CAMPOS_SINCRONIZADOS).order_by('id'):
+        atual = dict(zip(CAMPOS_SINCRONIZADOS, valores[1:]))
+        existentes.setdefault(_chave_sincronizacao(chave, atual), (valores[0], atual))
+    existentes.pop(None, None)
+
+    resultado = {'processadas': 0, 'criados': 0, 'atualizados': 0, 'inalterados': 0, 'duplicadas': 0, 'erros': []}
+    vistas = set()
+    novos, alterados = [], []
+
+    def gravar():
+        if not dry_run and (novos or alterados):
+            # bulk_update não aplica auto_now: o carimbo do diretório offline é posto à mão.
+            agora = timezone.now()
+            for morador in alterados:
+                morador.atualizado_em = agora
+            with transaction.atomic():
+                Morador.objects.bulk_create(novos, batch_size=tamanho_lote)
+                Morador.objects.bulk_update(alterados, (*CAMPOS_SINCRONIZADOS, 'atualizado_em'), batch_size=tamanho_lote)
+                marcar_diretorio_alterado(condominio.id)
+        resultado['criados'] += len(novos)
+        resultado['atualizados'] += len(alterados)
+        novos.clear()
+        alterados.clear()
+        if ao_progredir:
+            ao_progredir(resultado)
+
+    for numero, linha in enumerate(linhas, start=1):
+        resultado['processadas'] += 1
+        try:
+            dados = _validar_linha(linha, numero)
+        except ValueError as e:
+            resultado['erros'].append({'linha': numero, 'valores': list(linha), 'motivo': str(e)})
+            continue
+        identificador = _chave_sincronizacao(chave, dados)
+        if identificador is None:
+            resultado['erros'].append({'linha': numero, 'valores': list(linha), 'motivo': f"Linha {numero}: CPF ausente (use a chave 'unidade')."})
+            continue
+        if identificador in vistas:
+            resultado['duplicadas'] += 1
+            continue
+        vistas.add(identificador)
+        campos = {campo: dados[campo] for campo in CAMPOS_SINCRONIZADOS}
+        if identificador not in existentes:
+            novos.append(Morador(condominio=condominio, **campos))
+        else:
+            morador_id, atual = existentes[identificador]
+            if atual == campos:
+                resultado['inalterados'] += 1
+            else:
+                alterados.append(Morador(id=morador_id, condominio=condominio, **campos))
+        if len(novos) + len(alterados) >= tamanho_lote:
+            gravar()
+    gravar()
+    return resultado
+
+
+def criar_importacao(condominio, arquivo, usuario=None):
+    nome_original = os.path.basename(arquivo.name)
+    total = estimar_total_linhas(arquivo, nome_original)
+    return ImportacaoMoradores.objects.create(
+        condominio=condominio,
+        criado_por=usuario,
+        arquivo=File(arquivo, name=nome_original),
+        nome_original=nome_original,
+        total_estimado=total,
+    )
+
+
+def processar_importacao(importacao_id):
+    importacao = ImportacaoMoradores.objects.select_related('condominio').get(pk=importacao_id)
+    ImportacaoMoradores.objects.filter(pk=importacao.pk).update(status='PROCESSANDO', ultimo_progresso=timezone.now())
+
+    def ao_progredir(parcial):
+        ImportacaoMoradores.objects.filter(pk=importacao.pk).update(
+            ultimo_progresso=timezone.now(),
+            processadas=parcial['processadas'],
+            criados=parcial['criados'],
+            ignorados=parcial['ignorados'],
+            falhas=len(parcial['erros']),
+        )
+
+    try:
+        with importacao.arquivo.open('rb') as arquivo:
+            resultado = importar_moradores(
+                importacao.condominio,
+                ler_linhas_planilha(arquivo, importacao.nome_original),
+                ao_progredir=ao_progredir,
+            )
+    except Exception as e:
+        ImportacaoMoradores.objects.filter(pk=importacao.pk).update(
+            status='FALHOU', mensagem_erro=str(e), data_conclusao=timezone.now(),
+        )
+        return None
+    ImportacaoMoradores.objects.filter(pk=importacao.pk).update(
+        status='CONCLUIDA',
+        processadas=resultado['processadas'],
+        criados=resultado['criados'],
+        ignorados=resultado['ignorados'],
+        falhas=len(resultado['erros']),
+        linhas_com_erro=resultado['erros'],
+        data_conclusao=timezone.now(),
+    )
+    return resultado
+
+
+def _processar_em_thread(importacao_id):
+    try:
+        processar_importacao(importacao_id)
+    finally:
+        connection.close()
+
+
+def iniciar_importacao(importacao):
+    if not getattr(settings, 'IMPORTACAO_SEGUNDO_PLANO', True):
+        processar_importacao(importacao.pk)
+        return
+    # Só dispara depois do commit, senão a thread pode não enxergar o registro recém-criado.
+    transaction.on_commit(lambda: threading.Thread(
+        target=_processar_em_thread,
+        args=(importacao.pk,),
+        daemon=True,
+    ).start())
+
+
+def importacoes_paradas(parada_apos=PARADA_APOS, agora=None):
+    # Na fila há mais tempo que o limite ou processando sem progresso: a thread morreu com o worker (reload, reciclagem).
+    limite = (agora or timezone.now()) - parada_apos
+    sem_progresso = Q(ultimo_progresso__lt=limite) | Q(ultimo_progresso__isnull=True, data_criacao__lt=limite)
+    return ImportacaoMoradores.objects.filter(
+        Q(status='PENDENTE', data_criacao__lt=limite) | (Q(status='PROCESSANDO') & sem_progresso)
+    ).order_by('data_criacao')
+
+
+def retomar_importacoes(parada_apos=PARADA_APOS):
+    retomadas = []
+    for importacao in importacoes_paradas(parada_apos).only('id', 'status', 'ultimo_progresso'):
+        # Update condicional: se a thread original (ou outra execução) andou nesse meio-tempo, a importação não é tomada.
+        tomada = ImportacaoMoradores.objects.filter(
+            pk=importacao.pk, status=importacao.status, ultimo_progresso=importacao.ultimo_progresso,
+        ).update(status='PROCESSANDO', ultimo_progresso=timezone.now())
+        if tomada:
+            # Recomeça do início: quem a execução interrompida já cadastrou entra como ignorado, sem duplicar.
+            processar_importacao(importacao.pk)
+            retomadas.append(importacao.pk)
+    return retomadas
+
+
+def gerar_csv_falhas(importacao, destino):
+    writer = csv.writer(destino, delimiter=';')
+    writer.writerow(['linha', *COLUNAS, 'motivo'])
+    for erro in importacao.linhas_com_erro:
+        valores = list(erro.get('valores') or [])
+        valores += [''] * (len(COLUNAS) - len(valores))
+        writer.writerow([erro.get('linha'), *valores[:len(COLUNAS)], erro.get('motivo', '')])
@@ -0,0 +1,150 @@
+import json
+import os
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import models
+from django.utils import timezone
+
+from .armazenamento import PASTA_BLOBS, PASTA_TEMPORARIA, ArmazenamentoDeduplicado
+from .imagens import eh_imagem
+from .midia import PADRAO_DERIVADO
+
+CARENCIA_PADRAO = 24 * 3600
+INTERVALO_CHECKPOINT = 500
+LOTE = 2000
+
+
+def campos_de_arquivo():
+    # Todo FileField/ImageField de todos os apps: um upload_to novo entra na varredura sem mexer aqui.
+    for modelo in apps.get_models():
+        for campo in modelo._meta.concrete_fields:
+            if isinstance(campo, models.FileField):
+                yield modelo, campo.attname
+
+
+def nomes_referenciados():
+    referenciados = set()
+    for modelo, campo in campos_de_arquivo():
+        # values_list + iterator: só os nomes ficam em memória (proporcional aos arquivos vivos), não as linhas.
+        consulta = modelo._base_manager.exclude(**{f'{campo}__isnull': True}).exclude(**{campo: ''}).values_list(campo, flat=True)
+        referenciados.update(consulta.iterator(chunk_size=LOTE))
+    return referenciados
+
+
+def blobs_vivos():
+    from .models import ConteudoArquivo
+    return set(ConteudoArquivo.objects.filter(referencias__gt=0).values_list('sha256', flat=True).iterator(chunk_size=LOTE))
+
+
+def motivo_orfao(nome, referenciados, originais, blobs):
+    # None: arquivo em uso. Senão, o tipo de órfão (vai para o relatório).
+    if nome.startswith(PASTA_TEMPORARIA + '/'):
+        return 'temporario'
+    if nome.startswith(PASTA_BLOBS + '/'):
+        return None if os.path.basename(nome) in blobs else 'blob'
+    if nome in referenciados:
+        return None
+    derivado = PADRAO_DERIVADO.match(nome)
+    if derivado:
+        # Miniatura vive enquanto a imagem original estiver referenciada.
+        return None if derivado.group('base') in originais else 'derivado'
+    return 'arquivo'
+
+
+def _chave(nome):
+    return tuple(nome.split('/'))
+
+
+def percorrer(raiz, depois_de=None, relativo=''):
+    # Profundidade com nomes ordenados: a ordem é estável entre execuções e o checkpoint só precisa do último nome visto.
+    with os.scandir(os.path.join(raiz, relativo)) as entradas:
+        entradas = sorted(entradas, key=lambda entrada: entrada.name)
+    for entrada in entradas:
+        nome = f'{relativo}/{entrada.name}' if relativo else entrada.name
+        chave = _chave(nome)
+        if entrada.is_dir(follow_symlinks=False):
+            if depois_de is None or depois_de[:len(chave)] == chave or chave > depois_de:
+                yield from percorrer(raiz, depois_de, nome)
+        elif entrada.is_file(follow_symlinks=False) and (depois_de is None or chave > depois_de):
+            yield nome, entrada
+
+
+def _ler_checkpoint(caminho, parametros):
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            estado = json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+    # Checkpoint de outra raiz/modo/carência não vale: recomeça do zero.
+    return estado if estado.get('parametros') == parametros else None
+
+
+def _gravar_checkpoint(caminho, estado):
+    provisorio = caminho + '.tmp'
+    with open(provisorio, 'w', encoding='utf-8') as saida:
+        json.dump(estado, saida)
+    os.replace(provisorio, caminho)
+
+
+def _referencias_perdidas(storage, referenciados, carencia):
+    # Referência de deduplicação cujo arquivo sumiu fora do storage segura o blob para sempre; só é solta se nenhum registro usa o nome.
+    from .models import ReferenciaArquivo
+    if not isinstance(storage, ArmazenamentoDeduplicado):
+        return []
+    corte = timezone.now() - timedelta(seconds=carencia)
+    nomes = ReferenciaArquivo.objects.filter(criado_em__lte=corte).values_list('nome', flat=True).iterator(chunk_size=LOTE)
+    return [nome for nome in nomes if nome not in referenciados and not storage.exists(nome)]
+
+
+def limpar_midia(storage, apagar=False, carencia=CARENCIA_PADRAO, checkpoint=None, maximo=None, relatar=None):
+    raiz = storage.path('')
+    parametros = {'raiz': raiz, 'apagar': apagar, 'carencia': carencia}
+    estado = (checkpoint and _ler_checkpoint(checkpoint, parametros)) or {
+        'parametros': parametros, 'ultimo': None, 'verificados': 0, 'orfaos': 0, 'bytes': 0,
+    }
+    referenciados = nomes_referenciados()
+    originais = {os.path.splitext(nome)[0] for nome in referenciados if eh_imagem(nome)}
+    blobs = blobs_vivos()
+    limite = time.time() - carencia
+    depois_de = _chave(estado['ultimo']) if estado['ultimo'] else None
+    processados = 0
+    concluido = True
+    for nome, entrada in percorrer(raiz, depois_de):
+        if maximo is not None and processados >= maximo:
+            concluido = False
+            break
+        motivo = motivo_orfao(nome, referenciados, originais, blobs)
+        if motivo:
+            info = entrada.stat(follow_symlinks=False)
+            # ctime também conta: o hard link de um upload novo herda o mtime antigo do blob, mas o ctime muda no link.
+            if max(info.st_mtime, info.st_ctime) <= limite:
+                estado['orfaos'] += 1
+                estado['bytes'] += info.st_size
+                if relatar:
+                    relatar(nome, motivo, info.st_size)
+                if apagar:
+                    # Pelo storage: no deduplicado isso decrementa as referências e apaga o blob sem dono.
+                    storage.delete(nome)
+        estado['verificados'] += 1
+        estado['ultimo'] = nome
+        processados += 1
+        if checkpoint and processados % INTERVALO_CHECKPOINT == 0:
+            _gravar_checkpoint(checkpoint, estado)
+    estado['referencias_soltas'] = 0
+    if not concluido:
+        if checkpoint:
+            _gravar_checkpoint(checkpoint, estado)
+    else:
+        perdidas = _referencias_perdidas(storage, referenciados, carencia)
+        for nome in perdidas:
+            if relatar:
+                relatar(nome, 'referencia', 0)
+            if apagar:
+                storage.delete(nome)
+        estado['referencias_soltas'] = len(perdidas)
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+    estado['concluido'] = concluido
+    return estado
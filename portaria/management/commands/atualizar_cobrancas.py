@@ -0,0 +1,131 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django.db import transaction
+
+from django.utils import timezone
+
+from portaria.financeiro import recalcular_resumos
+
+from portaria.models import Cobranca, Notificacao
+
+from portaria.utils import enviar_push_em_massa
+
+class Command(BaseCommand):
+
+    help = 'Marca como ATRASADO as cobranças pendentes vencidas e notifica os moradores (rodar 1x ao dia via cron)'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('--lote', type=int, default=500, help='Cobranças atualizadas por transação (padrão: 500)')
+
+        parser.add_argument('--data', default=None, help='Data de referência AAAA-MM-DD (padrão: hoje)')
+
+        parser.add_argument('--sem-notificacao', action='store_true', help='Apenas atualiza o status, sem notificar')
+
+        parser.add_argument('--dry-run', action='store_true', help='Mostra quantas cobranças seriam atualizadas, sem gravar')
+
+    def handle(self, *args, **options):
+
+        lote = options['lote']
+
+        if lote < 1:
+
+            raise CommandError("--lote deve ser maior que zero.")
+
+        try:
+
+            hoje = date.fromisoformat(options['data']) if options['data'] else timezone.localdate()
+
+        except ValueError:
+
+            raise CommandError("--data deve estar no formato AAAA-MM-DD.")
+
+        vencidas = Cobranca.objects.filter(status='PENDENTE', data_vencimento__lt=hoje)
+
+        if options['dry_run']:
+
+            self.stdout.write(f"{vencidas.count()} cobrança(s) seriam marcadas como atrasadas (vencimento antes de {hoje:%d/%m/%Y}).")
+
+            return
+
+        total = 0
+
+        envios = []
+
+        ultimo_id = 0
+
+        while True:
+
+            # Keyset por id: cada lote é uma transação curta, sem segurar o lock de escrita do SQLite.
+            with transaction.atomic():
+
+                itens = list(
+
+                    vencidas.filter(id__gt=ultimo_id)
+
+                    .select_for_update()
+
+                    .select_related('morador__usuario')
+
+                    .order_by('id')[:lote]
+
+                )
+
+                if not itens:
+
+                    break
+
+                ultimo_id = itens[-1].id
+
+                Cobranca.objects.filter(id__in=[c.id for c in itens], status='PENDENTE').update(status='ATRASADO')
+
+                recalcular_resumos({(c.condominio_id, c.data_vencimento) for c in itens})
+
+                if not options['sem_notificacao']:
+
+                    notificacoes = []
+
+                    for c in itens:
+
+                        usuario = c.morador.usuario
+
+                        if not usuario:
+
+                            continue
+
+                        mensagem = f"Cobrança em atraso: {c.descricao} (R$ {c.valor}) venceu em {c.data_vencimento:%d/%m/%Y}."
+
+                        notificacoes.append(Notificacao(
+
+                            usuario=usuario,
+
+                            condominio_id=c.condominio_id,
+
+                            tipo='geral',
+
+                            mensagem=mensagem[:200],
+
+                            link='/morador/financeiro/'
+
+                        ))
+
+                        envios.append((usuario, 'Cobrança em atraso', mensagem, '/morador/financeiro/'))
+
+                    Notificacao.objects.bulk_create(notificacoes)
+
+            total += len(itens)
+
+            if options['verbosity'] >= 2:
+
+                self.stdout.write(f"  {total} cobrança(s) atualizada(s)...")
+
+        # O cron encerra o processo logo em seguida, então o push é enviado aqui mesmo e não numa thread.
+        enviados = enviar_push_em_massa(envios) if envios else 0
+
+        self.stdout.write(self.style.SUCCESS(
+
+            f"{total} cobrança(s) marcada(s) como atrasada(s); {len(envios)} morador(es) notificado(s), {enviados} push enviado(s)."
+
+        ))
@@ -0,0 +1,107 @@
+import os
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portaria.models import Condominio
+
+from portaria.conciliacao import ler_arquivo_retorno, conciliar, baixar_conciliados, envios_push, ArquivoRetornoInvalido
+
+from portaria.utils import enviar_push_em_massa
+
+class Command(BaseCommand):
+
+    help = 'Concilia um extrato OFX ou retorno CNAB 240/400 com as cobranças em aberto e dá baixa nas pagas'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('arquivo', help='Caminho do extrato OFX ou do arquivo de retorno CNAB')
+
+        parser.add_argument('--condominio', required=True, help='ID ou nome exato do condomínio')
+
+        parser.add_argument('--sem-notificacao', action='store_true', help='Não envia push aos moradores')
+
+        parser.add_argument('--dry-run', action='store_true', help='Apenas mostra a prévia, sem baixar nada')
+
+    def handle(self, *args, **options):
+
+        condominio = self._obter_condominio(options['condominio'])
+
+        caminho = options['arquivo']
+
+        if not os.path.isfile(caminho):
+
+            raise CommandError(f"Arquivo não encontrado: {caminho}")
+
+        inicio = time.monotonic()
+
+        with open(caminho, 'rb') as arquivo:
+
+            try:
+
+                formato, lancamentos = ler_arquivo_retorno(arquivo.read())
+
+            except ArquivoRetornoInvalido as e:
+
+                raise CommandError(str(e))
+
+        resultado = conciliar(condominio, lancamentos)
+
+        self.stdout.write(f"{formato}: {len(lancamentos)} crédito(s) lido(s).")
+
+        if options['verbosity'] >= 2:
+
+            for item in resultado['conciliados']:
+
+                cobranca = item['cobranca']
+
+                self.stdout.write(f"  linha {item['lancamento']['linha']}: cobrança {cobranca.id} ({cobranca.morador}) R$ {cobranca.valor} por {item['criterio']}")
+
+        for lancamento in resultado['nao_conciliados'][:20]:
+
+            self.stdout.write(self.style.ERROR(f"  linha {lancamento['linha']}: R$ {lancamento['valor']} sem cobrança correspondente"))
+
+        if len(resultado['nao_conciliados']) > 20:
+
+            self.stdout.write(self.style.ERROR(f"  ... e mais {len(resultado['nao_conciliados']) - 20} crédito(s) sem correspondência."))
+
+        if options['dry_run']:
+
+            self.stdout.write(self.style.SUCCESS(
+
+                f"Simulação: {len(resultado['conciliados'])} cobrança(s) seriam baixadas, totalizando R$ {resultado['total_conciliado']:.2f}."
+
+            ))
+
+            return
+
+        baixadas = baixar_conciliados(condominio, resultado['conciliados'])
+
+        # O comando termina logo em seguida: o push é enviado aqui mesmo, sem thread em segundo plano.
+
+        if not options['sem_notificacao']:
+
+            enviar_push_em_massa(envios_push(baixadas))
+
+        duracao = time.monotonic() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+
+            f"Conciliação finalizada em {duracao:.1f}s! {len(baixadas)} cobrança(s) baixada(s), "
+
+            f"{len(resultado['nao_conciliados'])} crédito(s) sem correspondência."
+
+        ))
+
+    def _obter_condominio(self, valor):
+
+        filtro = {'id': valor} if str(valor).isdigit() else {'nome': valor}
+
+        try:
+
+            return Condominio.objects.get(**filtro)
+
+        except Condominio.DoesNotExist:
+
+            raise CommandError(f"Condomínio não encontrado: {valor}")
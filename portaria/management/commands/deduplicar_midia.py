@@ -0,0 +1,45 @@
+import os
+
+from django.core.files.storage import storages
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portaria.armazenamento import PASTA_BLOBS, ArmazenamentoDeduplicado
+
+class Command(BaseCommand):
+
+    help = 'Converte os arquivos enviados antes da deduplicação em links para um blob único por conteúdo (SHA-256)'
+
+    def handle(self, *args, **options):
+
+        storage = storages['default']
+
+        if not isinstance(storage, ArmazenamentoDeduplicado):
+
+            raise CommandError('O storage padrão não é o ArmazenamentoDeduplicado (veja STORAGES no settings).')
+
+        raiz = storage.path('')
+
+        arquivos = 0
+
+        liberados = 0
+
+        for pasta, subpastas, nomes in os.walk(raiz):
+
+            if pasta == raiz:
+
+                subpastas[:] = [s for s in subpastas if s != PASTA_BLOBS]
+
+            for nome in nomes:
+
+                relativo = os.path.relpath(os.path.join(pasta, nome), raiz).replace(os.sep, '/')
+
+                liberados += storage.adotar(relativo)
+
+                arquivos += 1
+
+        self.stdout.write(self.style.SUCCESS(
+
+            f'{arquivos} arquivo(s) verificado(s); {liberados / (1024 * 1024):.1f} MB liberados por conteúdo repetido.'
+
+        ))
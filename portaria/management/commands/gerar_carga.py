@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portaria.carga import PREFIXO_CARGA, SENHA_CARGA, popular_condominio
+
+class Command(BaseCommand):
+
+    help = 'Gera condomínios sintéticos (unidades, contas, visitantes, encomendas, cobranças, reservas e mensagens) para testes de carga'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('--condominios', type=int, default=10, help='Quantidade de condomínios a gerar')
+
+        parser.add_argument('--unidades', type=int, default=200, help='Média de unidades por condomínio (cada um varia entre 50%% e 150%%)')
+
+        parser.add_argument('--visitantes-por-dia', type=float, default=25, help='Média de visitantes por dia em cada condomínio')
+
+        parser.add_argument('--dias', type=int, default=90, help='Dias de histórico de portaria')
+
+        parser.add_argument('--meses', type=int, default=6, help='Meses de cobranças')
+
+        parser.add_argument('--proporcao-contas', type=float, default=0.6, help='Fração das unidades com login de morador')
+
+        parser.add_argument('--semente', type=int, default=0, help='Semente do sorteio (mesma semente, mesmos dados)')
+
+    def handle(self, *args, **options):
+
+        if options['condominios'] < 1 or options['unidades'] < 1:
+
+            raise CommandError('--condominios e --unidades precisam ser positivos.')
+
+        totais = {}
+
+        inicio = time.perf_counter()
+
+        for indice in range(options['condominios']):
+
+            # O tamanho varia entre os condomínios, como na base real (de prédio pequeno a condomínio-clube).
+
+            unidades = max(1, round(options['unidades'] * (0.5 + ((indice * 7919 + options['semente']) % 101) / 100)))
+
+            gerado = popular_condominio(
+
+                f'{PREFIXO_CARGA} {indice + 1:03d}',
+
+                unidades=unidades,
+
+                visitantes_por_dia=options['visitantes_por_dia'] * unidades / options['unidades'],
+
+                dias=options['dias'],
+
+                meses=options['meses'],
+
+                proporcao_contas=options['proporcao_contas'],
+
+                semente=options['semente'],
+
+            )
+
+            for modelo, quantidade in gerado['linhas'].items():
+
+                totais[modelo] = totais.get(modelo, 0) + quantidade
+
+            if options['verbosity'] >= 2:
+
+                self.stdout.write(f"  {gerado['condominio'].nome}: {unidades} unidades, síndico {gerado['sindico'].username}")
+
+        duracao = time.perf_counter() - inicio
+
+        linhas = sum(totais.values())
+
+        for modelo, quantidade in sorted(totais.items()):
+
+            self.stdout.write(f'  {modelo}: {quantidade}')
+
+        self.stdout.write(self.style.SUCCESS(
+
+            f"{options['condominios']} condomínio(s), {linhas} linhas em {duracao:.1f}s ({linhas / max(duracao, 0.001) * 60:,.0f} linhas/min). "
+
+            f"Senha de todos os usuários gerados: {SENHA_CARGA}"
+
+        ))
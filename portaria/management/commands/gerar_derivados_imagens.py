@@ -0,0 +1,47 @@
+from django.apps import apps
+
+from django.core.management.base import BaseCommand
+
+from portaria.imagens import CAMPOS_IMAGEM, derivados_prontos, eh_imagem, gerar_derivados
+
+class Command(BaseCommand):
+
+    help = 'Gera as versões reduzidas (WebP/JPEG, sem EXIF) das imagens já enviadas'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('--forcar', action='store_true', help='Regera mesmo as imagens que já têm derivados')
+
+    def handle(self, *args, **options):
+
+        geradas = 0
+
+        falhas = 0
+
+        for modelo, campo in CAMPOS_IMAGEM:
+
+            nomes = (
+
+                apps.get_model(modelo).objects
+
+                .exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+
+                .order_by().values_list(campo, flat=True).iterator(chunk_size=500)
+
+            )
+
+            for nome in nomes:
+
+                if not eh_imagem(nome) or (not options['forcar'] and derivados_prontos(nome)):
+
+                    continue
+
+                if gerar_derivados(nome):
+
+                    geradas += 1
+
+                else:
+
+                    falhas += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{geradas} imagem(ns) processada(s), {falhas} falha(s).'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from portaria.precache import gravar_manifesto
+
+class Command(BaseCommand):
+
+    help = 'Gera o manifesto versionado de precache do service worker (rodar após alterar CSS/JS/ícones ou após o collectstatic)'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('--saida', default=None, help='Caminho do JSON gerado (padrão: STATIC_ROOT após o collectstatic, senão static/precache-manifest.json)')
+
+    def handle(self, *args, **options):
+
+        destino, manifesto = gravar_manifesto(options['saida'])
+
+        if options['verbosity'] >= 2:
+
+            for arquivo in manifesto['arquivos']:
+
+                self.stdout.write(f"  {arquivo['url']} ({arquivo['revisao']})")
+
+        self.stdout.write(self.style.SUCCESS(
+
+            f"Manifesto {manifesto['versao']} com {len(manifesto['arquivos'])} arquivo(s) gravado em {destino}."
+
+        ))
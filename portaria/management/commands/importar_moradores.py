@@ -1,51 +1,119 @@
-import csv
+import os
 
-from django.core.management.base import BaseCommand
+import time
 
-from portaria.models import Morador
+from django.core.management.base import BaseCommand, CommandError
+
+from portaria.models import Condominio
+
+from portaria.importacao import ler_linhas_planilha, sincronizar_moradores, CHAVES_SINCRONIZACAO
 
 class Command(BaseCommand):
 
-    help = 'Importa moradores de um arquivo CSV'
+    help = 'Importa ou atualiza moradores de uma planilha (.csv, .xlsx, .xls) em lote, de forma idempotente'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('arquivo', nargs='?', default='moradores.csv', help='Caminho da planilha (padrão: moradores.csv)')
+
+        parser.add_argument('--condominio', required=True, help='ID ou nome exato do condomínio')
+
+        parser.add_argument('--delimitador', default=None, help='Separador do CSV (padrão: detecta ; ou ,)')
+
+        parser.add_argument('--encoding', default='utf-8-sig', help='Codificação do CSV (padrão: utf-8-sig)')
+
+        parser.add_argument('--chave', choices=CHAVES_SINCRONIZACAO, default='cpf', help='Identifica o morador por CPF ou por bloco+apartamento+nome')
+
+        parser.add_argument('--lote', type=int, default=1000, help='Registros gravados por lote (padrão: 1000)')
+
+        parser.add_argument('--dry-run', action='store_true', help='Apenas simula e mostra o resumo, sem gravar nada')
 
     def handle(self, *args, **options):
 
-        self.stdout.write(self.style.WARNING('Iniciando importação...'))
+        condominio = self._obter_condominio(options['condominio'])
+
+        caminho = options['arquivo']
+
+        if not os.path.isfile(caminho):
+
+            raise CommandError(f"Arquivo não encontrado: {caminho}")
+
+        if options['lote'] < 1:
+
+            raise CommandError("--lote deve ser maior que zero.")
+
+        modo = ' (simulação, nada será gravado)' if options['dry_run'] else ''
+
+        self.stdout.write(self.style.WARNING(f'Iniciando importação para {condominio.nome}{modo}...'))
 
-        with open('moradores.csv', encoding='utf-8') as arquivo:
+        def ao_progredir(parcial):
 
-            leitor = csv.DictReader(arquivo)
+            if options['verbosity'] >= 2:
 
-            contador = 0
+                self.stdout.write(f"  {parcial['processadas']} linhas processadas...")
 
-            for linha in leitor:
+        inicio = time.monotonic()
 
-                morador, created = Morador.objects.get_or_create(
+        try:
 
-                    cpf=linha['cpf'], 
+            with open(caminho, 'rb') as arquivo:
 
-                    defaults={
+                linhas = ler_linhas_planilha(arquivo, caminho, delimitador=options['delimitador'], encoding=options['encoding'])
 
-                        'nome': linha['nome'],
+                resultado = sincronizar_moradores(
 
-                        'bloco': linha['bloco'],
+                    condominio,
 
-                        'apartamento': linha['apartamento'],
+                    linhas,
 
-                        'telefone': linha['telefone']
+                    chave=options['chave'],
 
-                    }
+                    tamanho_lote=options['lote'],
+
+                    dry_run=options['dry_run'],
+
+                    ao_progredir=ao_progredir,
 
                 )
 
-                if created:
+        except (ValueError, UnicodeDecodeError) as e:
+
+            raise CommandError(f"Erro ao ler o arquivo: {e}")
+
+        duracao = time.monotonic() - inicio
+
+        erros = resultado['erros']
+
+        for erro in erros[:20]:
+
+            self.stdout.write(self.style.ERROR(erro['motivo']))
+
+        if len(erros) > 20:
+
+            self.stdout.write(self.style.ERROR(f"... e mais {len(erros) - 20} linha(s) com erro."))
+
+        prefixo = 'Simulação finalizada' if options['dry_run'] else 'Processo finalizado'
+
+        self.stdout.write(self.style.SUCCESS(
+
+            f"{prefixo} em {duracao:.1f}s! {resultado['processadas']} linhas: "
+
+            f"{resultado['criados']} criados, {resultado['atualizados']} atualizados, "
+
+            f"{resultado['inalterados']} inalterados, {resultado['duplicadas']} duplicadas no arquivo, "
+
+            f"{len(erros)} com erro."
+
+        ))
+
+    def _obter_condominio(self, valor):
 
-                    contador += 1
+        filtro = {'id': valor} if str(valor).isdigit() else {'nome': valor}
 
-                    self.stdout.write(f"Criado: {morador.nome} - {morador.apartamento}")
+        try:
 
-                else:
+            return Condominio.objects.get(**filtro)
 
-                    self.stdout.write(f"Já existe: {morador.nome}")
+        except Condominio.DoesNotExist:
 
-        self.stdout.write(self.style.SUCCESS(f'Processo finalizado! {contador} novos moradores importados.'))
+            raise CommandError(f"Condomínio não encontrado: {valor}")
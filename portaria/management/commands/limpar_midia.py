@@ -0,0 +1,71 @@
+import os
+
+from django.conf import settings
+
+from django.core.files.storage import storages
+
+from django.core.management.base import BaseCommand
+
+from portaria.limpeza import CARENCIA_PADRAO, limpar_midia
+
+class Command(BaseCommand):
+
+    help = 'Lista (ou apaga, com --apagar) arquivos do MEDIA_ROOT que nenhum registro referencia mais'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('--apagar', action='store_true', help='Apaga os órfãos encontrados (sem esta opção só lista)')
+
+        parser.add_argument('--carencia-horas', type=float, default=CARENCIA_PADRAO / 3600, help='Ignora arquivos mais novos que isso (upload em andamento). Padrão: 24')
+
+        parser.add_argument('--checkpoint', default=os.path.join(settings.BASE_DIR, 'limpar_midia.checkpoint.json'), help='Arquivo de progresso para retomar a varredura interrompida')
+
+        parser.add_argument('--maximo', type=int, default=None, help='Para depois de verificar N arquivos; a próxima execução continua do checkpoint')
+
+        parser.add_argument('--recomecar', action='store_true', help='Descarta o checkpoint e varre desde o início')
+
+    def handle(self, *args, **options):
+
+        checkpoint = options['checkpoint']
+
+        if options['recomecar'] and os.path.exists(checkpoint):
+
+            os.remove(checkpoint)
+
+        listar = not options['apagar'] or options['verbosity'] >= 2
+
+        def relatar(nome, motivo, tamanho):
+
+            if listar:
+
+                self.stdout.write(f'  [{motivo}] {nome} ({tamanho / 1024:.1f} KB)')
+
+        resultado = limpar_midia(
+
+            storages['default'],
+
+            apagar=options['apagar'],
+
+            carencia=int(options['carencia_horas'] * 3600),
+
+            checkpoint=checkpoint,
+
+            maximo=options['maximo'],
+
+            relatar=relatar,
+
+        )
+
+        acao = 'apagado(s)' if options['apagar'] else 'encontrado(s)'
+
+        self.stdout.write(self.style.SUCCESS(
+
+            f"{resultado['verificados']} arquivo(s) verificado(s); {resultado['orfaos']} órfão(s) {acao} "
+
+            f"({resultado['bytes'] / (1024 * 1024):.1f} MB); {resultado['referencias_soltas']} referência(s) sem arquivo."
+
+        ))
+
+        if not resultado['concluido']:
+
+            self.stdout.write(self.style.WARNING(f'Varredura parcial: rode de novo para continuar a partir de {resultado["ultimo"]}.'))
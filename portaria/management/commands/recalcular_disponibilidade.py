@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from portaria.reservas import reconstruir_disponibilidade
+
+class Command(BaseCommand):
+
+    help = 'Reconstrói o índice de datas ocupadas por área comum a partir das reservas'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('--area', type=int, action='append', help='ID da área comum (pode repetir; padrão: todas)')
+
+    def handle(self, *args, **options):
+
+        total = reconstruir_disponibilidade(options['area'])
+
+        self.stdout.write(self.style.SUCCESS(f'{total} mês(es) de disponibilidade reconstruído(s).'))
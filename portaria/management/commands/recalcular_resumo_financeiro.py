@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from portaria.financeiro import reconstruir_resumos
+
+class Command(BaseCommand):
+
+    help = 'Reconstrói a tabela de resumo financeiro mensal a partir das cobranças'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('--condominio', type=int, action='append', help='ID do condomínio (pode repetir; padrão: todos)')
+
+    def handle(self, *args, **options):
+
+        total = reconstruir_resumos(options['condominio'])
+
+        self.stdout.write(self.style.SUCCESS(f'{total} resumo(s) mensal(is) reconstruído(s).'))
@@ -0,0 +1,35 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portaria.importacao import PARADA_APOS, importacoes_paradas, retomar_importacoes
+
+class Command(BaseCommand):
+
+    help = 'Retoma importações de moradores paradas (na fila ou processando sem progresso) cuja thread morreu com o worker web'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('--parada-ha', type=float, default=PARADA_APOS.total_seconds() / 60, help='Minutos sem progresso para considerar a importação parada. Padrão: 15')
+
+        parser.add_argument('--dry-run', action='store_true', help='Só lista as importações que seriam retomadas')
+
+    def handle(self, *args, **options):
+
+        if options['parada_ha'] <= 0:
+
+            raise CommandError('--parada-ha precisa ser positivo.')
+
+        parada_apos = datetime.timedelta(minutes=options['parada_ha'])
+
+        if options['dry_run']:
+
+            for importacao in importacoes_paradas(parada_apos).select_related('condominio'):
+
+                self.stdout.write(f'  #{importacao.id} {importacao.nome_original} ({importacao.condominio.nome}): {importacao.get_status_display()}')
+
+            return
+
+        retomadas = retomar_importacoes(parada_apos)
+
+        self.stdout.write(self.style.SUCCESS(f'{len(retomadas)} importação(ões) retomada(s).'))
@@ -0,0 +1,209 @@
+import json
+
+import random
+
+import threading
+
+import time
+
+from importlib import import_module
+
+from urllib.error import HTTPError, URLError
+
+from urllib.parse import urlencode
+
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django.urls import reverse
+
+from portaria.carga import MISTURA_PAPEIS, PREFIXO_CARGA, ROTEIROS, resumir_latencias
+
+class SemRedirecionamento(HTTPRedirectHandler):
+
+    # Redirecionamento (sessão inválida -> login, sem permissão -> home) conta como erro, não como a página de destino.
+
+    def redirect_request(self, *args, **kwargs):
+
+        return None
+
+class Command(BaseCommand):
+
+    help = 'Reproduz a mistura de acessos de porteiros, síndicos e moradores contra um servidor local e mede p50/p95/p99 por endpoint'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Endereço do servidor (que use o mesmo banco deste settings)')
+
+        parser.add_argument('--duracao', type=float, default=60, help='Segundos de teste')
+
+        parser.add_argument('--concorrencia', type=int, default=10, help='Usuários simultâneos (threads)')
+
+        parser.add_argument('--usuarios', type=int, default=50, help='Máximo de usuários sorteados por papel')
+
+        parser.add_argument('--prefixo', default=PREFIXO_CARGA, help='Só usa condomínios cujo nome começa com isto (os do gerar_carga)')
+
+        parser.add_argument('--saida', default=None, help='Grava o resumo em JSON (para comparar execuções)')
+
+        parser.add_argument('--semente', type=int, default=0)
+
+    def _sessoes(self, prefixo, limite):
+
+        # Sessões criadas direto no banco (como o force_login dos testes): sem passar pelo POST de login, que tem rate limit.
+
+        SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+
+        backend = settings.AUTHENTICATION_BACKENDS[0]
+
+        sessoes = {}
+
+        for papel in MISTURA_PAPEIS:
+
+            usuarios = get_user_model().objects.filter(tipo_usuario=papel, is_active=True, condominios__nome__startswith=prefixo).distinct()[:limite]
+
+            chaves = []
+
+            for usuario in usuarios:
+
+                sessao = SessionStore()
+
+                sessao[SESSION_KEY] = str(usuario.pk)
+
+                sessao[BACKEND_SESSION_KEY] = backend
+
+                sessao[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+
+                sessao.save()
+
+                chaves.append(sessao.session_key)
+
+            if chaves:
+
+                sessoes[papel] = chaves
+
+        return sessoes
+
+    def handle(self, *args, **options):
+
+        sessoes = self._sessoes(options['prefixo'], options['usuarios'])
+
+        if not sessoes:
+
+            raise CommandError(f"Nenhum usuário em condomínios '{options['prefixo']}*'. Rode antes: python manage.py gerar_carga")
+
+        papeis = list(sessoes)
+
+        pesos_papeis = [MISTURA_PAPEIS[p] for p in papeis]
+
+        rotas = {papel: [(nome, reverse(rota) + (f'?{urlencode(params)}' if params else '')) for nome, rota, params, _ in ROTEIROS[papel]] for papel in papeis}
+
+        pesos_rotas = {papel: [peso for *_, peso in ROTEIROS[papel]] for papel in papeis}
+
+        base = options['url'].rstrip('/')
+
+        amostras = {}
+
+        erros = {}
+
+        trava = threading.Lock()
+
+        fim = time.monotonic() + options['duracao']
+
+        def trabalhador(indice):
+
+            sorteio = random.Random(options['semente'] * 1000 + indice)
+
+            abridor = build_opener(SemRedirecionamento)
+
+            while time.monotonic() < fim:
+
+                papel = sorteio.choices(papeis, weights=pesos_papeis)[0]
+
+                endpoint, caminho = sorteio.choices(rotas[papel], weights=pesos_rotas[papel])[0]
+
+                requisicao = Request(base + caminho, headers={
+
+                    'Cookie': f'{settings.SESSION_COOKIE_NAME}={sorteio.choice(sessoes[papel])}',
+
+                    'User-Agent': 'teste-carga',
+
+                })
+
+                inicio = time.perf_counter()
+
+                try:
+
+                    with abridor.open(requisicao, timeout=30) as resposta:
+
+                        resposta.read()
+
+                        status = resposta.status
+
+                except HTTPError as erro:
+
+                    status = erro.code
+
+                except (URLError, OSError):
+
+                    status = 0
+
+                duracao = time.perf_counter() - inicio
+
+                with trava:
+
+                    if status == 200:
+
+                        amostras.setdefault(endpoint, []).append(duracao)
+
+                    else:
+
+                        erros[endpoint] = erros.get(endpoint, 0) + 1
+
+        self.stdout.write(f"{options['concorrencia']} usuário(s) simultâneo(s) por {options['duracao']:.0f}s contra {base} ...")
+
+        inicio = time.monotonic()
+
+        trabalhadores = [threading.Thread(target=trabalhador, args=(i,), daemon=True) for i in range(options['concorrencia'])]
+
+        for thread in trabalhadores:
+
+            thread.start()
+
+        for thread in trabalhadores:
+
+            thread.join()
+
+        decorrido = time.monotonic() - inicio
+
+        resumo = resumir_latencias(amostras, erros)
+
+        self.stdout.write(f"{'endpoint':<28} {'req':>6} {'erros':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'máx ms':>8}")
+
+        for linha in resumo:
+
+            self.stdout.write(
+
+                f"{linha['endpoint']:<28} {linha['requisicoes']:>6} {linha['erros']:>6} "
+
+                f"{linha['p50'] * 1000:>8.1f} {linha['p95'] * 1000:>8.1f} {linha['p99'] * 1000:>8.1f} {linha['max'] * 1000:>8.1f}"
+
+            )
+
+        total = sum(linha['requisicoes'] for linha in resumo)
+
+        total_erros = sum(linha['erros'] for linha in resumo)
+
+        estilo = self.style.SUCCESS if not total_erros else self.style.WARNING
+
+        self.stdout.write(estilo(f'{total} requisição(ões) com sucesso, {total_erros} erro(s), {total / max(decorrido, 0.001):.1f} req/s.'))
+
+        if options['saida']:
+
+            with open(options['saida'], 'w', encoding='utf-8') as saida:
+
+                json.dump({'parametros': {k: options[k] for k in ('url', 'duracao', 'concorrencia')}, 'req_por_segundo': total / max(decorrido, 0.001), 'endpoints': resumo}, saida, indent=2)
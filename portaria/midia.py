@@ -0,0 +1,173 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Exists, OuterRef, Q
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, quote_etag
+
+from .imagens import EXTENSOES_IMAGEM, PASTA_DERIVADOS
+
+# Quem enxerga o arquivo além do dono: qualquer vínculo com o condomínio, a equipe (síndico/portaria/zeladoria) ou só a gestão.
+TIPOS_POR_NIVEL = {
+    'membro': {'sindico', 'porteiro', 'zelador', 'morador'},
+    'equipe': {'sindico', 'porteiro', 'zelador'},
+    'gestao': {'sindico'},
+}
+
+# Pasta do upload_to -> (modelo, campos de arquivo, campo do condomínio, nível, caminhos até o usuário dono)
+REGRAS_MIDIA = {
+    'condominios/': ('portaria.Condominio', ('logo',), 'pk', 'membro', ()),
+    'cobrancas/': ('portaria.Cobranca', ('arquivo_boleto', 'comprovante'), 'condominio_id', 'gestao', ('morador__usuario',)),
+    'solicitacoes/': ('portaria.Solicitacao', ('arquivo',), 'condominio_id', 'equipe', ('morador__usuario', 'criado_por')),
+    'avisos/': ('portaria.Aviso', ('imagem', 'arquivo'), 'condominio_id', 'membro', ()),
+    'areas_comuns/': ('portaria.AreaComum', ('imagem',), 'condominio_id', 'membro', ()),
+    'ocorrencias/': ('portaria.Ocorrencia', ('foto',), 'condominio_id', 'equipe', ('autor__usuario',)),
+    'documentos/': ('portaria.DocumentoCondominio', ('arquivo',), 'condominio_id', 'membro', ()),
+    'feedbacks/': ('portaria.FeedbackMorador', ('foto',), 'condominio_id', 'gestao', ('morador__usuario',)),
+    'importacoes/': ('portaria.ImportacaoMoradores', ('arquivo',), 'condominio_id', 'gestao', ('criado_por',)),
+    'os_zelador_conclusao/': ('portaria.OrdemServico', ('foto_conclusao',), 'condominio_id', 'equipe', ('solicitacao_origem__morador__usuario',)),
+    'os_zelador/': ('portaria.OrdemServicoZelador', ('foto',), 'condominio_id', 'equipe', ()),
+    'ocorrencias_zelador/': ('portaria.LivroOcorrenciaZelador', ('foto',), 'condominio_id', 'equipe', ()),
+}
+
+PADRAO_DERIVADO = re.compile(rf'^{PASTA_DERIVADOS}/(?P<base>.+)_\d+\.(webp|jpg)$')
+CACHE_MIDIA = 'private, max-age=86400'
+CACHE_IMAGEM_PUBLICA = 'public, max-age=86400'
+BLOCO = 64 * 1024
+
+
+def _regra(nome):
+    pasta = nome.split('/', 1)[0] + '/'
+    return REGRAS_MIDIA.get(pasta)
+
+
+def _nomes_consultados(nome):
+    # Derivado (derivados/<original sem extensão>_<largura>.<ext>) herda a permissão da imagem original.
+    derivado = PADRAO_DERIVADO.match(nome)
+    if not derivado:
+        return nome, [nome]
+    base = derivado.group('base')
+    return base, [base + ext for extensao in EXTENSOES_IMAGEM for ext in (extensao, extensao.upper())]
+
+
+def _vinculos(usuario, campo_condominio):
+    # Vínculo com o condomínio por qualquer um dos caminhos do sistema; cada Exists bate num índice único por usuário.
+    condominio = OuterRef(campo_condominio)
+    campo_m2m = apps.get_model(settings.AUTH_USER_MODEL).condominios.field
+    Vinculo = campo_m2m.remote_field.through
+    return (
+        Q(Exists(Vinculo.objects.filter(**{f'{campo_m2m.m2m_field_name()}_id': usuario.id, f'{campo_m2m.m2m_reverse_field_name()}_id': condominio})))
+        | Q(Exists(apps.get_model('portaria.Sindico').objects.filter(usuario_id=usuario.id, condominio_id=condominio)))
+        | Q(Exists(apps.get_model('portaria.Porteiro').objects.filter(usuario_id=usuario.id, condominio_id=condominio)))
+        | Q(Exists(apps.get_model('portaria.Morador').objects.filter(usuario_id=usuario.id, condominio_id=condominio)))
+    )
+
+
+def pode_acessar_midia(usuario, nome):
+    if not usuario.is_authenticated:
+        return False
+    base, nomes = _nomes_consultados(nome)
+    regra = _regra(base)
+    if not regra:
+        return False
+    modelo, campos, campo_condominio, nivel, donos = regra
+    arquivo = Q()
+    for campo in campos:
+        arquivo |= Q(**{f'{campo}__in': nomes})
+    consulta = apps.get_model(modelo).objects.filter(arquivo)
+    if usuario.is_superuser or usuario.tipo_usuario == 'admin':
+        return consulta.exists()
+    permissao = Q(pk__in=[])
+    if usuario.tipo_usuario in TIPOS_POR_NIVEL[nivel]:
+        permissao |= _vinculos(usuario, campo_condominio)
+    for dono in donos:
+        permissao |= Q(**{dono: usuario})
+    # Uma única consulta: arquivo (coluna indexada) + dono/vínculo como subconsultas EXISTS.
+    return consulta.filter(permissao).exists()
+
+
+def _etag(estado):
+    return quote_etag(f'{estado.st_mtime_ns:x}-{estado.st_size:x}')
+
+
+def _intervalo(cabecalho, tamanho):
+    # Só um intervalo por requisição (o que players de vídeo e leitores de PDF pedem); múltiplos caem no arquivo inteiro.
+    faixa = re.fullmatch(r'bytes=(\d*)-(\d*)', (cabecalho or '').strip())
+    if not faixa or faixa.group(1) == faixa.group(2) == '':
+        return None
+    inicio, fim = faixa.groups()
+    if inicio == '':
+        inicio, fim = max(tamanho - int(fim), 0), tamanho - 1
+    else:
+        inicio, fim = int(inicio), min(int(fim), tamanho - 1) if fim else tamanho - 1
+    if inicio >= tamanho or inicio > fim:
+        return False
+    return inicio, fim
+
+
+def _fatia(caminho, inicio, tamanho):
+    with open(caminho, 'rb') as arquivo:
+        arquivo.seek(inicio)
+        while tamanho > 0:
+            bloco = arquivo.read(min(BLOCO, tamanho))
+            if not bloco:
+                break
+            tamanho -= len(bloco)
+            yield bloco
+
+
+def _resposta_arquivo(request, caminho, nome, cache_control):
+    estado = os.stat(caminho)
+    etag = _etag(estado)
+    if etag in [valor.strip() for valor in request.headers.get('If-None-Match', '').split(',')]:
+        resposta = HttpResponseNotModified()
+        resposta['ETag'] = etag
+        return resposta
+    tipo = mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+    # If-Range: se o arquivo mudou desde o pedaço que o cliente já tem, manda o arquivo inteiro.
+    intervalo = None
+    if request.headers.get('If-Range', etag) == etag:
+        intervalo = _intervalo(request.headers.get('Range'), estado.st_size)
+    if intervalo is False:
+        resposta = HttpResponse(status=416)
+        resposta['Content-Range'] = f'bytes */{estado.st_size}'
+        return resposta
+    if intervalo:
+        inicio, fim = intervalo
+        resposta = StreamingHttpResponse(_fatia(caminho, inicio, fim - inicio + 1), status=206, content_type=tipo)
+        resposta['Content-Range'] = f'bytes {inicio}-{fim}/{estado.st_size}'
+        resposta['Content-Length'] = str(fim - inicio + 1)
+    else:
+        # Arquivo inteiro via FileResponse: o servidor WSGI usa sendfile quando disponível.
+        resposta = FileResponse(open(caminho, 'rb'), content_type=tipo, filename=os.path.basename(nome))
+    resposta['Accept-Ranges'] = 'bytes'
+    resposta['ETag'] = etag
+    resposta['Last-Modified'] = http_date(estado.st_mtime)
+    resposta['Cache-Control'] = cache_control
+    return resposta
+
+
+def servir_arquivo(request, raiz, nome, cache_control, acelerar=False):
+    try:
+        caminho = safe_join(raiz, nome)
+    except SuspiciousFileOperation:
+        return None
+    if not os.path.isfile(caminho):
+        return None
+    envio = getattr(settings, 'MIDIA_ENVIO', '') if acelerar else ''
+    if envio in ('x-accel', 'x-sendfile'):
+        # O servidor web (nginx/Apache) transfere o arquivo, com Range e ETag próprios; o worker Python fica livre na hora.
+        resposta = HttpResponse(content_type=mimetypes.guess_type(nome)[0] or 'application/octet-stream')
+        if envio == 'x-accel':
+            resposta['X-Accel-Redirect'] = settings.MIDIA_PREFIXO_INTERNO.rstrip('/') + '/' + quote(nome)
+        else:
+            resposta['X-Sendfile'] = caminho
+        resposta['Cache-Control'] = cache_control
+        return resposta
+    return _resposta_arquivo(request, caminho, nome, cache_control)
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0027_add_geral_notification_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacaoMoradores',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('arquivo', models.FileField(upload_to='importacoes/%Y/%m/')),
+                ('nome_original', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('PENDENTE', 'Na fila'), ('PROCESSANDO', 'Processando'), ('CONCLUIDA', 'Concluída'), ('FALHOU', 'Falhou')], default='PENDENTE', max_length=20)),
+                ('total_estimado', models.PositiveIntegerField(blank=True, null=True)),
+                ('processadas', models.PositiveIntegerField(default=0)),
+                ('criados', models.PositiveIntegerField(default=0)),
+                ('ignorados', models.PositiveIntegerField(default=0)),
+                ('falhas', models.PositiveIntegerField(default=0)),
+                ('linhas_com_erro', models.JSONField(blank=True, default=list)),
+                ('mensagem_erro', models.TextField(blank=True, default='')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True)),
+                ('data_conclusao', models.DateTimeField(blank=True, null=True)),
+                ('condominio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='importacoes_moradores', to='portaria.condominio')),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Importação de Moradores',
+                'verbose_name_plural': 'Importações de Moradores',
+                'ordering': ['-data_criacao'],
+            },
+        ),
+    ]
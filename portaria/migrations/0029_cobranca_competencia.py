@@ -0,0 +1,22 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0028_importacaomoradores'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cobranca',
+            name='competencia',
+            field=models.DateField(blank=True, help_text='Mês de referência das cobranças geradas em lote', null=True, verbose_name='Competência'),
+        ),
+        migrations.AddConstraint(
+            model_name='cobranca',
+            constraint=models.UniqueConstraint(condition=models.Q(('competencia__isnull', False)), fields=('condominio', 'competencia', 'morador'), name='cobranca_unica_por_competencia'),
+        ),
+    ]
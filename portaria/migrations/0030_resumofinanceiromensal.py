@@ -0,0 +1,75 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:40
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def popular_resumos(apps, schema_editor):
+    Cobranca = apps.get_model('portaria', 'Cobranca')
+    Resumo = apps.get_model('portaria', 'ResumoFinanceiroMensal')
+    campos = {'PENDENTE': 'qtd_pendente', 'EM_ANALISE': 'qtd_em_analise', 'PAGO': 'qtd_pago', 'ATRASADO': 'qtd_atrasado', 'CANCELADO': 'qtd_cancelado'}
+    resumos = {}
+    linhas = (
+        Cobranca.objects.order_by()
+        .annotate(mes=TruncMonth('data_vencimento'))
+        .values_list('condominio_id', 'mes', 'status')
+        .annotate(quantidade=Count('id'), total=Sum('valor'))
+    )
+    for condominio_id, mes, status, quantidade, total in linhas:
+        if hasattr(mes, 'date'):
+            mes = mes.date()
+        resumo = resumos.setdefault((condominio_id, mes), Resumo(condominio_id=condominio_id, mes=mes))
+        total = total or Decimal('0')
+        if status in campos:
+            setattr(resumo, campos[status], quantidade)
+        if status != 'CANCELADO':
+            resumo.valor_faturado += total
+        if status == 'PAGO':
+            resumo.valor_recebido += total
+        if status in ('PENDENTE', 'EM_ANALISE', 'ATRASADO'):
+            resumo.valor_em_aberto += total
+        if status == 'ATRASADO':
+            resumo.valor_atrasado += total
+    Resumo.objects.bulk_create(resumos.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0029_cobranca_competencia'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cobranca',
+            index=models.Index(fields=['condominio', 'data_vencimento'], name='cobranca_cond_venc_idx'),
+        ),
+        migrations.CreateModel(
+            name='ResumoFinanceiroMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(verbose_name='Mês de Vencimento')),
+                ('valor_faturado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('valor_recebido', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('valor_em_aberto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('valor_atrasado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('qtd_pendente', models.PositiveIntegerField(default=0)),
+                ('qtd_em_analise', models.PositiveIntegerField(default=0)),
+                ('qtd_pago', models.PositiveIntegerField(default=0)),
+                ('qtd_atrasado', models.PositiveIntegerField(default=0)),
+                ('qtd_cancelado', models.PositiveIntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('condominio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_financeiros', to='portaria.condominio')),
+            ],
+            options={
+                'verbose_name': 'Resumo Financeiro Mensal',
+                'verbose_name_plural': 'Resumos Financeiros Mensais',
+                'ordering': ['-mes'],
+                'constraints': [models.UniqueConstraint(fields=('condominio', 'mes'), name='resumo_financeiro_unico_por_mes')],
+            },
+        ),
+        migrations.RunPython(popular_resumos, migrations.RunPython.noop),
+    ]
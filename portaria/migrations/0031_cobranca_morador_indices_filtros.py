@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0030_resumofinanceiromensal'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cobranca',
+            index=models.Index(fields=['condominio', 'status', 'data_vencimento'], name='cobranca_cond_status_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='morador',
+            index=models.Index(fields=['condominio', 'bloco', 'apartamento'], name='morador_cond_unidade_idx'),
+        ),
+    ]
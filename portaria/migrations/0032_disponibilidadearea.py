@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def popular_disponibilidade(apps, schema_editor):
+    Reserva = apps.get_model('portaria', 'Reserva')
+    Disponibilidade = apps.get_model('portaria', 'DisponibilidadeArea')
+    meses = {}
+    linhas = Reserva.objects.filter(status__in=('PENDENTE', 'APROVADA')).order_by().values_list('area_id', 'data').distinct()
+    for area_id, data in linhas:
+        meses.setdefault((area_id, data.replace(day=1)), set()).add(data.isoformat())
+    Disponibilidade.objects.bulk_create(
+        [Disponibilidade(area_id=area_id, mes=mes, datas_bloqueadas=sorted(datas)) for (area_id, mes), datas in meses.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0031_cobranca_morador_indices_filtros'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['area', 'data'], name='reserva_area_data_idx'),
+        ),
+        migrations.CreateModel(
+            name='DisponibilidadeArea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(verbose_name='Mês')),
+                ('datas_bloqueadas', models.JSONField(default=list, verbose_name='Datas ocupadas (ISO)')),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='disponibilidade', to='portaria.areacomum')),
+            ],
+            options={
+                'verbose_name': 'Disponibilidade da Área',
+                'verbose_name_plural': 'Disponibilidade das Áreas',
+                'constraints': [models.UniqueConstraint(fields=('area', 'mes'), name='disponibilidade_unica_por_mes')],
+            },
+        ),
+        migrations.RunPython(popular_disponibilidade, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:40
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0032_disponibilidadearea'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reserva',
+            name='reserva_area_data_idx',
+        ),
+        migrations.AddField(
+            model_name='areacomum',
+            name='duracao_horario',
+            field=models.PositiveSmallIntegerField(default=0, help_text='0 = reserva do dia inteiro', verbose_name='Duração de cada horário (min)'),
+        ),
+        migrations.AddField(
+            model_name='areacomum',
+            name='reservas_por_horario',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Reservas simultâneas por horário'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['area', 'data', 'horario_inicio'], name='reserva_area_data_inicio_idx'),
+        ),
+    ]
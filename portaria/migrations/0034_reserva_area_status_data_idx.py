@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0033_areacomum_horarios'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['area', 'status', 'data'], name='reserva_area_status_data_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0034_reserva_area_status_data_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='encomenda',
+            name='uuid_cliente',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True, verbose_name='UUID do registro offline'),
+        ),
+        migrations.AddField(
+            model_name='solicitacao',
+            name='uuid_cliente',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True, verbose_name='UUID do registro offline'),
+        ),
+        migrations.AddField(
+            model_name='visitante',
+            name='uuid_cliente',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True, verbose_name='UUID do registro offline'),
+        ),
+    ]
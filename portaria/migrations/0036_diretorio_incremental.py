@@ -0,0 +1,49 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0035_uuid_cliente_offline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoradorRemovido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('morador_id', models.BigIntegerField()),
+                ('removido_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Morador removido',
+                'verbose_name_plural': 'Moradores removidos',
+            },
+        ),
+        migrations.AddField(
+            model_name='condominio',
+            name='versao_moradores',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Versão do diretório de moradores'),
+        ),
+        migrations.AddField(
+            model_name='morador',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, verbose_name='Atualizado em'),
+        ),
+        migrations.AddIndex(
+            model_name='morador',
+            index=models.Index(fields=['condominio', 'atualizado_em'], name='morador_cond_atualizado_idx'),
+        ),
+        migrations.AddField(
+            model_name='moradorremovido',
+            name='condominio',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='moradores_removidos', to='portaria.condominio'),
+        ),
+        migrations.AddIndex(
+            model_name='moradorremovido',
+            index=models.Index(fields=['condominio', 'removido_em'], name='removido_cond_data_idx'),
+        ),
+    ]
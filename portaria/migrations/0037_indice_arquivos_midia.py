@@ -0,0 +1,85 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:05
+
+import portaria.models
+import portaria.models_zelador
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0036_diretorio_incremental'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='areacomum',
+            name='imagem',
+            field=models.ImageField(blank=True, db_index=True, upload_to='areas_comuns/', verbose_name='Foto do Espaço'),
+        ),
+        migrations.AlterField(
+            model_name='aviso',
+            name='arquivo',
+            field=models.FileField(blank=True, db_index=True, upload_to='avisos/anexos/%Y/%m/', verbose_name='Arquivo Anexo'),
+        ),
+        migrations.AlterField(
+            model_name='aviso',
+            name='imagem',
+            field=models.ImageField(blank=True, db_index=True, upload_to='avisos/%Y/%m/', verbose_name='Imagem'),
+        ),
+        migrations.AlterField(
+            model_name='cobranca',
+            name='arquivo_boleto',
+            field=models.FileField(blank=True, db_index=True, null=True, upload_to='cobrancas/boletos/', verbose_name='Arquivo do Boleto'),
+        ),
+        migrations.AlterField(
+            model_name='cobranca',
+            name='comprovante',
+            field=models.FileField(blank=True, db_index=True, null=True, upload_to='cobrancas/comprovantes/', verbose_name='Comprovante de Pagamento'),
+        ),
+        migrations.AlterField(
+            model_name='condominio',
+            name='logo',
+            field=models.ImageField(blank=True, db_index=True, upload_to='condominios/', verbose_name='Logo'),
+        ),
+        migrations.AlterField(
+            model_name='documentocondominio',
+            name='arquivo',
+            field=models.FileField(db_index=True, upload_to='documentos/%Y/%m/', verbose_name='Arquivo'),
+        ),
+        migrations.AlterField(
+            model_name='feedbackmorador',
+            name='foto',
+            field=models.FileField(blank=True, db_index=True, null=True, upload_to='feedbacks/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='importacaomoradores',
+            name='arquivo',
+            field=models.FileField(db_index=True, upload_to='importacoes/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='livroocorrenciazelador',
+            name='foto',
+            field=models.ImageField(blank=True, db_index=True, null=True, upload_to='ocorrencias_zelador/', validators=[portaria.models_zelador.validate_file_size]),
+        ),
+        migrations.AlterField(
+            model_name='ocorrencia',
+            name='foto',
+            field=models.FileField(blank=True, db_index=True, null=True, upload_to='ocorrencias/%Y/%m/', verbose_name='Foto/Prova'),
+        ),
+        migrations.AlterField(
+            model_name='ordemservico',
+            name='foto_conclusao',
+            field=models.ImageField(blank=True, db_index=True, null=True, upload_to='os_zelador_conclusao/', validators=[portaria.models.validate_foto_conclusao]),
+        ),
+        migrations.AlterField(
+            model_name='ordemservicozelador',
+            name='foto',
+            field=models.ImageField(blank=True, db_index=True, null=True, upload_to='os_zelador/', validators=[portaria.models_zelador.validate_file_size]),
+        ),
+        migrations.AlterField(
+            model_name='solicitacao',
+            name='arquivo',
+            field=models.FileField(blank=True, db_index=True, upload_to='solicitacoes/%Y/%m/', verbose_name='Foto/Vídeo'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0037_indice_arquivos_midia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConteudoArquivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('tamanho', models.BigIntegerField()),
+                ('referencias', models.PositiveIntegerField(default=0)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Conteúdo de arquivo',
+                'verbose_name_plural': 'Conteúdos de arquivos',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReferenciaArquivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=255, unique=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('conteudo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='nomes', to='portaria.conteudoarquivo')),
+            ],
+            options={
+                'verbose_name': 'Referência de arquivo',
+                'verbose_name_plural': 'Referências de arquivos',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-19 09:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0038_deduplicacao_arquivos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importacaomoradores',
+            name='ultimo_progresso',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -28,7 +28,7 @@ class Condominio(models.Model):
 
     email = models.EmailField(blank=True, verbose_name="E-mail")
 
-    logo = models.ImageField(upload_to='condominios/', blank=True, verbose_name="Logo")
+    logo = models.ImageField(upload_to='condominios/', db_index=True, blank=True, verbose_name="Logo")
 
     codigo_convite = models.UUIDField(default=uuid.uuid4, unique=True, verbose_name="Código de Convite")
 
@@ -36,6 +36,8 @@ class Condominio(models.Model):
 
     ativo = models.BooleanField(default=True, verbose_name="Ativo")
 
+    versao_moradores = models.PositiveIntegerField(default=0, editable=False, verbose_name="Versão do diretório de moradores")
+
     def __str__(self):
 
         return self.nome
@@ -69,6 +71,14 @@ class CustomUser(AbstractUser):
 
         pass
 
+        # Dentro de uma requisição o ContextoCondominioMiddleware já resolveu (uma vez só) o condomínio da sessão.
+
+        contexto = getattr(self, '_contexto_condominio', None)
+
+        if contexto is not None:
+
+            return contexto.condominio
+
         return self.condominios.first()
 
     @property
@@ -181,6 +191,8 @@ class Morador(models.Model):
 
     )
 
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
     def __str__(self):
 
         if self.bloco:
@@ -197,6 +209,36 @@ class Morador(models.Model):
 
         ordering = ['bloco', 'apartamento']
 
+        indexes = [
+
+            models.Index(fields=['condominio', 'bloco', 'apartamento'], name='morador_cond_unidade_idx'),
+
+            models.Index(fields=['condominio', 'atualizado_em'], name='morador_cond_atualizado_idx'),
+
+        ]
+
+class MoradorRemovido(models.Model):
+
+    # Marca de exclusão para a sincronização incremental do diretório offline da portaria.
+
+    condominio = models.ForeignKey(Condominio, on_delete=models.CASCADE, related_name='moradores_removidos')
+
+    morador_id = models.BigIntegerField()
+
+    removido_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+
+        verbose_name = "Morador removido"
+
+        verbose_name_plural = "Moradores removidos"
+
+        indexes = [
+
+            models.Index(fields=['condominio', 'removido_em'], name='removido_cond_data_idx'),
+
+        ]
+
 class Cobranca(models.Model):
 
     pass
@@ -233,12 +275,14 @@ class Cobranca(models.Model):
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDENTE', verbose_name="Status")
 
-    arquivo_boleto = models.FileField(upload_to='cobrancas/boletos/', null=True, blank=True, verbose_name="Arquivo do Boleto")
+    arquivo_boleto = models.FileField(upload_to='cobrancas/boletos/', db_index=True, null=True, blank=True, verbose_name="Arquivo do Boleto")
 
-    comprovante = models.FileField(upload_to='cobrancas/comprovantes/', null=True, blank=True, verbose_name="Comprovante de Pagamento")
+    comprovante = models.FileField(upload_to='cobrancas/comprovantes/', db_index=True, null=True, blank=True, verbose_name="Comprovante de Pagamento")
 
     chave_pix = models.CharField(max_length=255, null=True, blank=True, verbose_name="Chave PIX ou Link")
 
+    competencia = models.DateField(null=True, blank=True, verbose_name="Competência", help_text="Mês de referência das cobranças geradas em lote")
+
     data_criacao = models.DateTimeField(auto_now_add=True, verbose_name="Gerado em")
 
     def __str__(self):
@@ -253,6 +297,82 @@ class Cobranca(models.Model):
 
         ordering = ['-data_vencimento']
 
+        constraints = [
+
+            models.UniqueConstraint(
+
+                fields=['condominio', 'competencia', 'morador'],
+
+                condition=models.Q(competencia__isnull=False),
+
+                name='cobranca_unica_por_competencia',
+
+            ),
+
+        ]
+
+        indexes = [
+
+            models.Index(fields=['condominio', 'data_vencimento'], name='cobranca_cond_venc_idx'),
+
+            models.Index(fields=['condominio', 'status', 'data_vencimento'], name='cobranca_cond_status_venc_idx'),
+
+        ]
+
+class ResumoFinanceiroMensal(models.Model):
+
+    condominio = models.ForeignKey(Condominio, on_delete=models.CASCADE, related_name='resumos_financeiros')
+
+    mes = models.DateField(verbose_name="Mês de Vencimento")
+
+    valor_faturado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    valor_recebido = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    valor_em_aberto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    valor_atrasado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    qtd_pendente = models.PositiveIntegerField(default=0)
+
+    qtd_em_analise = models.PositiveIntegerField(default=0)
+
+    qtd_pago = models.PositiveIntegerField(default=0)
+
+    qtd_atrasado = models.PositiveIntegerField(default=0)
+
+    qtd_cancelado = models.PositiveIntegerField(default=0)
+
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    @property
+
+    def taxa_inadimplencia(self):
+
+        if not self.valor_faturado:
+
+            return 0
+
+        return round(float(self.valor_atrasado) * 100 / float(self.valor_faturado), 1)
+
+    def __str__(self):
+
+        return f"{self.condominio.nome} - {self.mes:%m/%Y}"
+
+    class Meta:
+
+        verbose_name = "Resumo Financeiro Mensal"
+
+        verbose_name_plural = "Resumos Financeiros Mensais"
+
+        ordering = ['-mes']
+
+        constraints = [
+
+            models.UniqueConstraint(fields=['condominio', 'mes'], name='resumo_financeiro_unico_por_mes'),
+
+        ]
+
 class Visitante(models.Model):
 
     condominio = models.ForeignKey(Condominio, on_delete=models.CASCADE,
@@ -283,6 +403,8 @@ class Visitante(models.Model):
 
     registrado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Porteiro Responsável")
 
+    uuid_cliente = models.UUIDField(null=True, blank=True, unique=True, editable=False, verbose_name="UUID do registro offline")
+
     def __str__(self):
 
         return self.nome_completo
@@ -317,6 +439,8 @@ class Encomenda(models.Model):
 
     porteiro_entrega = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='entregou_encomenda')
 
+    uuid_cliente = models.UUIDField(null=True, blank=True, unique=True, editable=False, verbose_name="UUID do registro offline")
+
     def __str__(self):
 
         return f"{self.volume} - {self.morador}"
@@ -355,7 +479,7 @@ class Solicitacao(models.Model):
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDENTE', verbose_name="Status Atual")
 
-    arquivo = models.FileField(upload_to='solicitacoes/%Y/%m/', blank=True, verbose_name="Foto/Vídeo")
+    arquivo = models.FileField(upload_to='solicitacoes/%Y/%m/', db_index=True, blank=True, verbose_name="Foto/Vídeo")
 
     criado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, verbose_name="Registrado por")
 
@@ -363,6 +487,8 @@ class Solicitacao(models.Model):
 
     resposta_admin = models.TextField(blank=True, verbose_name="Resposta da Administração")
 
+    uuid_cliente = models.UUIDField(null=True, blank=True, unique=True, editable=False, verbose_name="UUID do registro offline")
+
     def __str__(self):
 
         return f"{self.get_tipo_display()} - {self.morador or 'Portaria'}"
@@ -385,9 +511,9 @@ class Aviso(models.Model):
 
     conteudo = models.TextField(verbose_name="Conteúdo")
 
-    imagem = models.ImageField(upload_to='avisos/%Y/%m/', blank=True, verbose_name="Imagem")
+    imagem = models.ImageField(upload_to='avisos/%Y/%m/', db_index=True, blank=True, verbose_name="Imagem")
 
-    arquivo = models.FileField(upload_to='avisos/anexos/%Y/%m/', blank=True, verbose_name="Arquivo Anexo")
+    arquivo = models.FileField(upload_to='avisos/anexos/%Y/%m/', db_index=True, blank=True, verbose_name="Arquivo Anexo")
 
     data_publicacao = models.DateTimeField(auto_now_add=True, verbose_name="Data de Publicação")
 
@@ -467,7 +593,7 @@ class AreaComum(models.Model):
 
     descricao = models.TextField(blank=True, verbose_name="Descrição / Regras de Uso")
 
-    imagem = models.ImageField(upload_to='areas_comuns/', blank=True, verbose_name="Foto do Espaço")
+    imagem = models.ImageField(upload_to='areas_comuns/', db_index=True, blank=True, verbose_name="Foto do Espaço")
 
     capacidade = models.PositiveIntegerField(help_text="Capacidade máxima de pessoas", verbose_name="Capacidade")
 
@@ -487,6 +613,28 @@ class AreaComum(models.Model):
 
     )
 
+    duracao_horario = models.PositiveSmallIntegerField(
+
+        default=0, verbose_name="Duração de cada horário (min)",
+
+        help_text="0 = reserva do dia inteiro"
+
+    )
+
+    reservas_por_horario = models.PositiveSmallIntegerField(
+
+        default=1, validators=[MinValueValidator(1)],
+
+        verbose_name="Reservas simultâneas por horário"
+
+    )
+
+    @property
+
+    def usa_horarios(self):
+
+        return self.duracao_horario > 0
+
     def __str__(self):
 
         return f"{self.nome} — {self.condominio.nome}"
@@ -561,6 +709,40 @@ class Reserva(models.Model):
 
         ordering = ['-data', '-horario_inicio']
 
+        indexes = [
+
+            models.Index(fields=['area', 'data', 'horario_inicio'], name='reserva_area_data_inicio_idx'),
+
+            models.Index(fields=['area', 'status', 'data'], name='reserva_area_status_data_idx'),
+
+        ]
+
+class DisponibilidadeArea(models.Model):
+
+    area = models.ForeignKey(AreaComum, on_delete=models.CASCADE, related_name='disponibilidade')
+
+    mes = models.DateField(verbose_name="Mês")
+
+    datas_bloqueadas = models.JSONField(default=list, verbose_name="Datas ocupadas (ISO)")
+
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+
+        return f"{self.area.nome} - {self.mes:%m/%Y}"
+
+    class Meta:
+
+        verbose_name = "Disponibilidade da Área"
+
+        verbose_name_plural = "Disponibilidade das Áreas"
+
+        constraints = [
+
+            models.UniqueConstraint(fields=['area', 'mes'], name='disponibilidade_unica_por_mes'),
+
+        ]
+
 class Mensagem(models.Model):
 
     condominio = models.ForeignKey(Condominio, on_delete=models.CASCADE, related_name='mensagens')
@@ -609,7 +791,7 @@ class Ocorrencia(models.Model):
 
     descricao = models.TextField(verbose_name="Descrição da Ocorrência")
 
-    foto = models.FileField(upload_to='ocorrencias/%Y/%m/', blank=True, null=True, verbose_name="Foto/Prova")
+    foto = models.FileField(upload_to='ocorrencias/%Y/%m/', db_index=True, blank=True, null=True, verbose_name="Foto/Prova")
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='REGISTRADA', verbose_name="Status")
 
@@ -675,7 +857,7 @@ class DocumentoCondominio(models.Model):
 
     categoria = models.CharField(max_length=20, choices=CATEGORIA_CHOICES, default='OUTROS', verbose_name="Categoria")
 
-    arquivo = models.FileField(upload_to='documentos/%Y/%m/', verbose_name="Arquivo")
+    arquivo = models.FileField(upload_to='documentos/%Y/%m/', db_index=True, verbose_name="Arquivo")
 
     data_upload = models.DateTimeField(auto_now_add=True, verbose_name="Data de Upload")
 
@@ -735,7 +917,7 @@ class FeedbackMorador(models.Model):
 
     descricao = models.TextField()
 
-    foto = models.FileField(upload_to='feedbacks/%Y/%m/', blank=True, null=True)
+    foto = models.FileField(upload_to='feedbacks/%Y/%m/', db_index=True, blank=True, null=True)
 
     data_envio = models.DateTimeField(auto_now_add=True)
 
@@ -755,6 +937,124 @@ class FeedbackMorador(models.Model):
 
         ordering = ['-data_envio']
 
+class ImportacaoMoradores(models.Model):
+
+    STATUS_CHOICES = (
+
+        ('PENDENTE', 'Na fila'),
+
+        ('PROCESSANDO', 'Processando'),
+
+        ('CONCLUIDA', 'Concluída'),
+
+        ('FALHOU', 'Falhou'),
+
+    )
+
+    condominio = models.ForeignKey(Condominio, on_delete=models.CASCADE, related_name='importacoes_moradores')
+
+    criado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+
+    arquivo = models.FileField(upload_to='importacoes/%Y/%m/', db_index=True)
+
+    nome_original = models.CharField(max_length=255)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDENTE')
+
+    total_estimado = models.PositiveIntegerField(null=True, blank=True)
+
+    processadas = models.PositiveIntegerField(default=0)
+
+    criados = models.PositiveIntegerField(default=0)
+
+    ignorados = models.PositiveIntegerField(default=0)
+
+    falhas = models.PositiveIntegerField(default=0)
+
+    linhas_com_erro = models.JSONField(default=list, blank=True)
+
+    mensagem_erro = models.TextField(blank=True, default='')
+
+    data_criacao = models.DateTimeField(auto_now_add=True)
+
+    data_conclusao = models.DateTimeField(null=True, blank=True)
+
+    ultimo_progresso = models.DateTimeField(null=True, blank=True)
+
+    @property
+
+    def em_andamento(self):
+
+        return self.status in ('PENDENTE', 'PROCESSANDO')
+
+    @property
+
+    def percentual(self):
+
+        if not self.em_andamento:
+
+            return 100
+
+        if not self.total_estimado:
+
+            return 0
+
+        return min(99, int(self.processadas * 100 / self.total_estimado))
+
+    def __str__(self):
+
+        return f"{self.nome_original} ({self.get_status_display()})"
+
+    class Meta:
+
+        verbose_name = "Importação de Moradores"
+
+        verbose_name_plural = "Importações de Moradores"
+
+        ordering = ['-data_criacao']
+
+class ConteudoArquivo(models.Model):
+
+    # Conteúdo único de um upload (SHA-256), gravado uma só vez em blobs/; os arquivos com o mesmo conteúdo são links para ele.
+
+    sha256 = models.CharField(max_length=64, unique=True)
+
+    tamanho = models.BigIntegerField()
+
+    referencias = models.PositiveIntegerField(default=0)
+
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+
+        return f"{self.sha256[:12]} ({self.referencias} ref.)"
+
+    class Meta:
+
+        verbose_name = "Conteúdo de arquivo"
+
+        verbose_name_plural = "Conteúdos de arquivos"
+
+class ReferenciaArquivo(models.Model):
+
+    # Nome gravado no FileField -> conteúdo deduplicado. Excluir o arquivo pelo storage decrementa as referências.
+
+    nome = models.CharField(max_length=255, unique=True)
+
+    conteudo = models.ForeignKey(ConteudoArquivo, on_delete=models.PROTECT, related_name='nomes')
+
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+
+        return self.nome
+
+    class Meta:
+
+        verbose_name = "Referência de arquivo"
+
+        verbose_name_plural = "Referências de arquivos"
+
 def validate_foto_conclusao(value):
     from django.core.exceptions import ValidationError
     if value.size > 5242880:
@@ -773,14 +1073,14 @@ class OrdemServico(models.Model):
     descricao = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pendente')
     feedback_texto = models.TextField(blank=True, null=True)
-    foto_conclusao = models.ImageField(upload_to='os_zelador_conclusao/', blank=True, null=True, validators=[validate_foto_conclusao])
+    foto_conclusao = models.ImageField(upload_to='os_zelador_conclusao/', db_index=True, blank=True, null=True, validators=[validate_foto_conclusao])
     data_criacao = models.DateTimeField(auto_now_add=True)
     data_conclusao = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return self.titulo
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 
 @receiver(post_save, sender=Solicitacao)
@@ -849,6 +1149,75 @@ def notificar_zelador_nova_os(sender, instance, created, **kwargs):
                 link='/zelador/os/'
             )
 
+@receiver(pre_save, sender=Cobranca)
+def guardar_bucket_anterior_cobranca(sender, instance, **kwargs):
+    # Se o vencimento (ou o condomínio) mudar, o resumo do mês antigo também precisa ser recalculado.
+    instance._bucket_anterior = None
+    instance._status_anterior = None
+    if instance.pk and not kwargs.get('raw'):
+        anterior = Cobranca.objects.filter(pk=instance.pk).values_list('condominio_id', 'data_vencimento', 'status').first()
+        if anterior:
+            instance._bucket_anterior = anterior[:2]
+            instance._status_anterior = anterior[2]
+
+@receiver(post_save, sender=Cobranca)
+def atualizar_resumo_financeiro_ao_salvar(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    from .financeiro import recalcular_resumos, invalidar_contagem_em_analise
+    buckets = {(instance.condominio_id, instance.data_vencimento)}
+    anterior = getattr(instance, '_bucket_anterior', None)
+    if anterior:
+        buckets.add(anterior)
+    recalcular_resumos(buckets)
+    if 'EM_ANALISE' in (instance.status, getattr(instance, '_status_anterior', None)):
+        invalidar_contagem_em_analise(instance.condominio_id)
+        if anterior:
+            invalidar_contagem_em_analise(anterior[0])
+
+@receiver(post_delete, sender=Cobranca)
+def atualizar_resumo_financeiro_ao_excluir(sender, instance, **kwargs):
+    from .financeiro import recalcular_resumos, invalidar_contagem_em_analise
+    recalcular_resumos([(instance.condominio_id, instance.data_vencimento)])
+    if instance.status == 'EM_ANALISE':
+        invalidar_contagem_em_analise(instance.condominio_id)
+
+@receiver(pre_save, sender=Reserva)
+def guardar_bucket_anterior_reserva(sender, instance, **kwargs):
+    instance._bucket_anterior = None
+    if instance.pk and not kwargs.get('raw'):
+        instance._bucket_anterior = Reserva.objects.filter(pk=instance.pk).values_list('area_id', 'data').first()
+
+@receiver(post_save, sender=Reserva)
+def atualizar_disponibilidade_ao_salvar(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    from .reservas import recalcular_disponibilidade
+    buckets = {(instance.area_id, instance.data)}
+    if getattr(instance, '_bucket_anterior', None):
+        buckets.add(instance._bucket_anterior)
+    recalcular_disponibilidade(buckets)
+
+@receiver(post_delete, sender=Reserva)
+def atualizar_disponibilidade_ao_excluir(sender, instance, **kwargs):
+    from .reservas import recalcular_disponibilidade
+    recalcular_disponibilidade([(instance.area_id, instance.data)])
+
+@receiver(post_save, sender=Morador)
+def invalidar_diretorio_ao_salvar(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    from .diretorio import marcar_diretorio_alterado
+    marcar_diretorio_alterado(instance.condominio_id)
+
+@receiver(post_delete, sender=Morador)
+def registrar_morador_removido(sender, instance, origin=None, **kwargs):
+    # Na exclusão do próprio condomínio não há diretório a sincronizar (e a marca apontaria para um condomínio apagado).
+    if getattr(origin, 'model', type(origin)) is Condominio:
+        return
+    from .diretorio import registrar_remocao
+    registrar_remocao(instance.condominio_id, instance.pk)
+
 @receiver(post_save, sender=DocumentoCondominio)
 def notificar_moradores_novo_documento(sender, instance, created, **kwargs):
     if created and instance.condominio:
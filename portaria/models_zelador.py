@@ -33,7 +33,7 @@ class OrdemServicoZelador(models.Model):
     titulo = models.CharField(max_length=200)
     descricao = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ABERTA')
-    foto = models.ImageField(upload_to='os_zelador/', blank=True, null=True, validators=[validate_file_size])
+    foto = models.ImageField(upload_to='os_zelador/', db_index=True, blank=True, null=True, validators=[validate_file_size])
     data_abertura = models.DateTimeField(auto_now_add=True)
     data_encerramento = models.DateTimeField(null=True, blank=True)
     zelador = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
@@ -61,7 +61,7 @@ class LivroOcorrenciaZelador(models.Model):
     titulo = models.CharField(max_length=200)
     descricao = models.TextField()
     gravidade = models.CharField(max_length=10, choices=GRAVIDADE_CHOICES, default='BAIXA')
-    foto = models.ImageField(upload_to='ocorrencias_zelador/', blank=True, null=True, validators=[validate_file_size])
+    foto = models.ImageField(upload_to='ocorrencias_zelador/', db_index=True, blank=True, null=True, validators=[validate_file_size])
     data_registro = models.DateTimeField(auto_now_add=True)
     zelador = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
 
@@ -0,0 +1,50 @@
+import datetime
+
+from django.db.models import Q
+
+POR_PAGINA = 30
+
+
+def _codificar(objeto, campo):
+    valor = getattr(objeto, campo)
+    return f"{valor.isoformat()}_{objeto.pk}"
+
+
+def _decodificar(cursor, converter):
+    try:
+        valor, pk = cursor.rsplit('_', 1)
+        return converter(valor), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def paginar_por_chave(queryset, campo, apos=None, antes=None, por_pagina=POR_PAGINA,
+                      converter=datetime.date.fromisoformat):
+    # Paginação keyset sobre (campo, id) em ordem decrescente: o custo de cada página não depende
+    # de quantas páginas vieram antes, ao contrário de OFFSET.
+    cursor_apos = _decodificar(apos, converter) if apos else None
+    cursor_antes = _decodificar(antes, converter) if antes else None
+
+    if cursor_antes:
+        valor, pk = cursor_antes
+        itens = list(
+            queryset.filter(Q(**{f'{campo}__gt': valor}) | Q(**{campo: valor, 'pk__gt': pk}))
+            .order_by(campo, 'pk')[:por_pagina + 1]
+        )
+        tem_anterior = len(itens) > por_pagina
+        itens = list(reversed(itens[:por_pagina]))
+        tem_proximo = True
+    else:
+        if cursor_apos:
+            valor, pk = cursor_apos
+            queryset = queryset.filter(Q(**{f'{campo}__lt': valor}) | Q(**{campo: valor, 'pk__lt': pk}))
+        itens = list(queryset.order_by(f'-{campo}', '-pk')[:por_pagina + 1])
+        tem_proximo = len(itens) > por_pagina
+        itens = itens[:por_pagina]
+        tem_anterior = bool(cursor_apos)
+
+    return {
+        'itens': itens,
+        'proximo': _codificar(itens[-1], campo) if itens and tem_proximo else None,
+        'anterior': _codificar(itens[0], campo) if itens and tem_anterior else None,
+    }
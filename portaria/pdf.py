@@ -0,0 +1,151 @@
+import io
+import importlib.util
+import threading
+import multiprocessing
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+
+class PdfIndisponivel(Exception):
+    pass
+
+
+class FilaPdfCheia(PdfIndisponivel):
+    pass
+
+
+class PdfTimeout(PdfIndisponivel):
+    pass
+
+
+_lock = threading.Lock()
+_vagas = None
+_vagas_total = None
+_execucao = None
+_execucao_total = None
+
+
+def _config(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+def _limitar_memoria(limite_mb):
+    if not limite_mb:
+        return
+    try:
+        import resource
+        limite = int(limite_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def _renderizar_pdf(html):
+    # Executa no processo filho: só xhtml2pdf, sem ORM nem templates.
+    from xhtml2pdf import pisa
+    destino = io.BytesIO()
+    try:
+        status = pisa.CreatePDF(html, dest=destino)
+    except MemoryError:
+        return None, 'limite de memória excedido'
+    if status.err:
+        return None, str(status.err)
+    return destino.getvalue(), None
+
+
+def _processo_pdf(conexao, html, limite_mb):
+    # Um processo por job: encerrar um relatório travado não derruba o de nenhum outro usuário.
+    _limitar_memoria(limite_mb)
+    try:
+        conexao.send(_renderizar_pdf(html))
+    finally:
+        conexao.close()
+
+
+def _get_vagas():
+    # Vagas = processos rodando + jobs esperando; sem vaga, a requisição recebe 503 na hora.
+    global _vagas, _vagas_total
+    total = _config('PDF_WORKERS', 2) + _config('PDF_FILA_MAXIMA', 4)
+    with _lock:
+        if _vagas is None or _vagas_total != total:
+            _vagas = threading.BoundedSemaphore(total)
+            _vagas_total = total
+        return _vagas
+
+
+def _get_execucao():
+    global _execucao, _execucao_total
+    total = _config('PDF_WORKERS', 2)
+    with _lock:
+        if _execucao is None or _execucao_total != total:
+            _execucao = threading.BoundedSemaphore(total)
+            _execucao_total = total
+        return _execucao
+
+
+def _executar_em_processo(html):
+    contexto = multiprocessing.get_context('spawn')
+    recebe, envia = contexto.Pipe(duplex=False)
+    processo = contexto.Process(target=_processo_pdf, args=(envia, html, _config('PDF_MEMORIA_MB', 512)), daemon=True)
+    processo.start()
+    # Sem a ponta de escrita aberta aqui, a morte do filho (p.ex. pelo limite de memória) vira EOF no recv.
+    envia.close()
+    try:
+        # O prazo conta a partir do início do job, não da entrada na fila.
+        if not recebe.poll(_config('PDF_TIMEOUT', 60)):
+            processo.terminate()
+            raise PdfTimeout('tempo limite excedido')
+        try:
+            return recebe.recv()
+        except EOFError:
+            raise PdfIndisponivel('processo de geração interrompido')
+    finally:
+        recebe.close()
+        processo.join(5)
+        if processo.is_alive():
+            processo.terminate()
+            processo.join()
+
+
+def gerar_pdf_bytes(html):
+    if not _config('PDF_WORKERS', 2):
+        conteudo, erro = _renderizar_pdf(html)
+        if erro:
+            raise PdfIndisponivel(erro)
+        return conteudo
+
+    vagas = _get_vagas()
+    if not vagas.acquire(blocking=False):
+        raise FilaPdfCheia('fila de relatórios cheia')
+    try:
+        # Na fila, espera um dos PDF_WORKERS processos terminar (cada um limitado pelo PDF_TIMEOUT).
+        with _get_execucao():
+            conteudo, erro = _executar_em_processo(html)
+    finally:
+        vagas.release()
+    if erro:
+        raise PdfIndisponivel(erro)
+    return conteudo
+
+
+def gerar_pdf_response(template_name, context, filename, inline=False):
+    if importlib.util.find_spec('xhtml2pdf') is None:
+        return HttpResponse("Erro: Biblioteca xhtml2pdf não instalada. Rode: pip install xhtml2pdf")
+
+    # O template é renderizado aqui (precisa do ORM); só o HTML pronto vai para o processo filho.
+    html = render_to_string(template_name, context)
+    try:
+        conteudo = gerar_pdf_bytes(html)
+    except FilaPdfCheia:
+        return HttpResponse('Muitos relatórios sendo gerados no momento. Tente novamente em instantes.', status=503)
+    except PdfTimeout:
+        return HttpResponse('A geração do PDF excedeu o tempo limite. Tente um período menor.', status=504)
+    except PdfIndisponivel as e:
+        return HttpResponse(f'Erro ao gerar PDF: {e}', status=500)
+
+    response = HttpResponse(conteudo, content_type='application/pdf')
+    disposicao = 'inline' if inline else 'attachment'
+    response['Content-Disposition'] = f'{disposicao}; filename="{filename}"'
+    return response
@@ -0,0 +1,85 @@
+import fnmatch
+import hashlib
+import json
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+ARQUIVO_MANIFESTO = 'precache-manifest.json'
+ARQUIVO_SERVICE_WORKER = 'sw.js'
+# O que a portaria precisa para abrir sem rede: CSS/JS próprios, ícones do PWA e o manifest do app.
+PADROES_PRECACHE = ('css/*.css', 'js/*.js', 'img/icon-*.png', 'img/logo.ico', 'manifest.json')
+IGNORADOS = (ARQUIVO_SERVICE_WORKER, ARQUIVO_MANIFESTO)
+
+
+def _arquivos_estaticos():
+    vistos = set()
+    for finder in finders.get_finders():
+        for caminho, storage in finder.list(['admin/*', 'import_export/*']):
+            caminho = caminho.replace(os.sep, '/')
+            if caminho in vistos or caminho in IGNORADOS or not any(fnmatch.fnmatch(caminho, p) for p in PADROES_PRECACHE):
+                continue
+            vistos.add(caminho)
+            yield caminho, storage
+
+
+def _revisao(storage, caminho):
+    resumo = hashlib.sha256()
+    with storage.open(caminho) as arquivo:
+        for bloco in iter(lambda: arquivo.read(64 * 1024), b''):
+            resumo.update(bloco)
+    return resumo.hexdigest()[:12]
+
+
+def gerar_manifesto():
+    arquivos = sorted(
+        ({'url': staticfiles_storage.url(caminho), 'revisao': _revisao(storage, caminho)} for caminho, storage in _arquivos_estaticos()),
+        key=lambda item: item['url'],
+    )
+    # A versão muda sempre que qualquer arquivo muda: o service worker troca o precache inteiro de uma vez.
+    versao = hashlib.sha256(json.dumps(arquivos, sort_keys=True).encode()).hexdigest()[:12]
+    return {'versao': versao, 'arquivos': arquivos}
+
+
+def _pasta_manifesto():
+    # Depois do collectstatic as URLs têm hash: o manifesto vai para o STATIC_ROOT, junto do staticfiles.json, e não para o código.
+    if settings.STATIC_ROOT and os.path.exists(os.path.join(settings.STATIC_ROOT, 'staticfiles.json')):
+        return settings.STATIC_ROOT
+    return settings.STATICFILES_DIRS[0]
+
+
+def gravar_manifesto(destino=None):
+    manifesto = gerar_manifesto()
+    destino = destino or os.path.join(_pasta_manifesto(), ARQUIVO_MANIFESTO)
+    with open(destino, 'w', encoding='utf-8') as saida:
+        json.dump(manifesto, saida, ensure_ascii=False, indent=2)
+        saida.write('\n')
+    return destino, manifesto
+
+
+def _ler_estatico(nome):
+    caminho = finders.find(nome)
+    if caminho:
+        with open(caminho, encoding='utf-8') as arquivo:
+            return arquivo.read()
+    if staticfiles_storage.exists(nome):
+        with staticfiles_storage.open(nome) as arquivo:
+            return arquivo.read().decode('utf-8')
+    return None
+
+
+def carregar_manifesto():
+    coletado = os.path.join(settings.STATIC_ROOT or '', ARQUIVO_MANIFESTO)
+    if settings.STATIC_ROOT and os.path.exists(coletado):
+        with open(coletado, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    conteudo = _ler_estatico(ARQUIVO_MANIFESTO)
+    return json.loads(conteudo) if conteudo else {'versao': '0', 'arquivos': []}
+
+
+def script_service_worker():
+    # O manifesto vai embutido no próprio script: qualquer mudança de revisão muda os bytes do SW e dispara a atualização no navegador.
+    manifesto = json.dumps(carregar_manifesto(), ensure_ascii=False, separators=(',', ':'))
+    return f'self.PRECACHE_MANIFESTO = {manifesto};\n' + (_ler_estatico(ARQUIVO_SERVICE_WORKER) or '')
@@ -0,0 +1,239 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Q
+
+from .financeiro import mes_de
+from .models import AreaComum, DisponibilidadeArea, Reserva
+
+STATUS_OCUPAM = ('PENDENTE', 'APROVADA')
+MAX_DIAS_CONSULTA = 31
+CAMPOS_PORTARIA = (
+    'id', 'data', 'horario_inicio', 'horario_fim', 'acesso_liberado', 'nome_liberado',
+    'area__nome', 'morador__nome', 'morador__bloco', 'morador__apartamento',
+)
+
+
+class ReservaIndisponivel(ValueError):
+    pass
+
+
+def _proximo_mes(mes):
+    return (mes + datetime.timedelta(days=32)).replace(day=1)
+
+
+def horarios_da_area(area):
+    # Horários fixos de duracao_horario minutos entre a abertura e o fechamento; o último que não cabe inteiro é descartado.
+    if not area.usa_horarios:
+        return []
+    base = datetime.date(2000, 1, 1)
+    atual = datetime.datetime.combine(base, area.horario_abertura)
+    fechamento = datetime.datetime.combine(base, area.horario_fechamento)
+    passo = datetime.timedelta(minutes=area.duracao_horario)
+    horarios = []
+    while atual + passo <= fechamento:
+        horarios.append((atual.time(), (atual + passo).time()))
+        atual += passo
+    return horarios
+
+
+def _ocupacao(horarios, intervalos):
+    # Sobreposição de intervalos semiabertos [início, fim): conta quantas reservas tocam cada horário.
+    return [sum(1 for inicio, fim in intervalos if inicio < h_fim and fim > h_inicio) for h_inicio, h_fim in horarios]
+
+
+def _datas_bloqueadas(area, linhas):
+    # linhas: (data, horario_inicio, horario_fim) das reservas que ocupam a área.
+    if not area.usa_horarios:
+        return {data for data, _, _ in linhas}
+    por_dia = {}
+    for data, inicio, fim in linhas:
+        por_dia.setdefault(data, []).append((inicio, fim))
+    horarios = horarios_da_area(area)
+    return {
+        data for data, intervalos in por_dia.items()
+        if horarios and all(n >= area.reservas_por_horario for n in _ocupacao(horarios, intervalos))
+    }
+
+
+def _areas(area_ids):
+    return AreaComum.objects.only(
+        'id', 'horario_abertura', 'horario_fechamento', 'duracao_horario', 'reservas_por_horario'
+    ).in_bulk(area_ids)
+
+
+def recalcular_disponibilidade(buckets):
+    # Cada bucket (área, mês) é refeito a partir das reservas daquele mês, pelo índice (area, data, horario_inicio).
+    meses = {(area_id, mes_de(data)) for area_id, data in buckets if area_id and data}
+    areas = _areas({area_id for area_id, _ in meses})
+    for area_id, mes in meses:
+        area = areas.get(area_id)
+        if area is None:
+            continue
+        linhas = (
+            Reserva.objects
+            .filter(area_id=area_id, data__gte=mes, data__lt=_proximo_mes(mes), status__in=STATUS_OCUPAM)
+            .order_by().values_list('data', 'horario_inicio', 'horario_fim')
+        )
+        datas = sorted(d.isoformat() for d in _datas_bloqueadas(area, linhas))
+        if datas:
+            DisponibilidadeArea.objects.update_or_create(area_id=area_id, mes=mes, defaults={'datas_bloqueadas': datas})
+        else:
+            DisponibilidadeArea.objects.filter(area_id=area_id, mes=mes).delete()
+
+
+def reconstruir_disponibilidade(area_ids=None):
+    reservas = Reserva.objects.filter(status__in=STATUS_OCUPAM)
+    registros = DisponibilidadeArea.objects.all()
+    if area_ids is not None:
+        reservas = reservas.filter(area_id__in=area_ids)
+        registros = registros.filter(area_id__in=area_ids)
+    linhas_por_mes = {}
+    for area_id, data, inicio, fim in reservas.order_by().values_list('area_id', 'data', 'horario_inicio', 'horario_fim'):
+        linhas_por_mes.setdefault((area_id, mes_de(data)), []).append((data, inicio, fim))
+    areas = _areas({area_id for area_id, _ in linhas_por_mes})
+    novos = []
+    for (area_id, mes), linhas in linhas_por_mes.items():
+        datas = _datas_bloqueadas(areas[area_id], linhas)
+        if datas:
+            novos.append(DisponibilidadeArea(area_id=area_id, mes=mes, datas_bloqueadas=sorted(d.isoformat() for d in datas)))
+    with transaction.atomic():
+        registros.delete()
+        DisponibilidadeArea.objects.bulk_create(novos, batch_size=500)
+    return len(novos)
+
+
+def disponibilidade_mes(area, mes):
+    mes = mes_de(mes)
+    registro = DisponibilidadeArea.objects.filter(area=area, mes=mes).first()
+    return registro or DisponibilidadeArea(area=area, mes=mes, datas_bloqueadas=[])
+
+
+def calendario_mes(area, mes):
+    registro = disponibilidade_mes(area, mes)
+    return {
+        'area': area.id,
+        'mes': registro.mes.strftime('%Y-%m'),
+        'datas_bloqueadas': registro.datas_bloqueadas,
+        'atualizado_em': registro.atualizado_em.isoformat() if registro.atualizado_em else None,
+    }
+
+
+def horarios_livres(area, inicio, fim):
+    # Uma única consulta cobre todo o intervalo de datas; a ocupação de cada dia é calculada em memória.
+    inicio = max(inicio, datetime.date.today())
+    fim = min(fim, inicio + datetime.timedelta(days=MAX_DIAS_CONSULTA - 1))
+    horarios = horarios_da_area(area)
+    por_dia = {}
+    linhas = (
+        Reserva.objects
+        .filter(area=area, data__gte=inicio, data__lte=fim, status__in=STATUS_OCUPAM)
+        .order_by().values_list('data', 'horario_inicio', 'horario_fim')
+    )
+    for data, h_inicio, h_fim in linhas:
+        por_dia.setdefault(data, []).append((h_inicio, h_fim))
+    livres = {}
+    dia = inicio
+    while dia <= fim:
+        ocupacao = _ocupacao(horarios, por_dia.get(dia, []))
+        livres[dia.isoformat()] = [
+            {'inicio': h_inicio.strftime('%H:%M'), 'fim': h_fim.strftime('%H:%M'), 'vagas': area.reservas_por_horario - n}
+            for (h_inicio, h_fim), n in zip(horarios, ocupacao) if n < area.reservas_por_horario
+        ]
+        dia += datetime.timedelta(days=1)
+    return livres
+
+
+def reservar_dia(area, morador, data, observacoes=''):
+    if area.usa_horarios:
+        raise ReservaIndisponivel('Esta área é reservada por horário. Escolha um horário disponível.')
+    if data < datetime.date.today():
+        raise ReservaIndisponivel('Não é possível reservar uma data passada.')
+    with transaction.atomic():
+        # A trava na linha da área serializa pedidos simultâneos para o mesmo espaço.
+        AreaComum.objects.select_for_update().only('id').get(pk=area.pk)
+        if data.isoformat() in disponibilidade_mes(area, data).datas_bloqueadas:
+            raise ReservaIndisponivel('Esta data já está reservada. Escolha outra data disponível.')
+        return Reserva.objects.create(
+            area=area,
+            morador=morador,
+            data=data,
+            horario_inicio=area.horario_abertura,
+            horario_fim=area.horario_fechamento,
+            observacoes=observacoes,
+        )
+
+
+def reservar_horario(area, morador, data, inicio, quantidade=1, observacoes=''):
+    horarios = horarios_da_area(area)
+    inicios = [h_inicio for h_inicio, _ in horarios]
+    if inicio not in inicios or quantidade < 1 or inicios.index(inicio) + quantidade > len(horarios):
+        raise ReservaIndisponivel('Horário inválido para esta área.')
+    if data < datetime.date.today():
+        raise ReservaIndisponivel('Não é possível reservar uma data passada.')
+    pedidos = horarios[inicios.index(inicio):inicios.index(inicio) + quantidade]
+    fim = pedidos[-1][1]
+    with transaction.atomic():
+        AreaComum.objects.select_for_update().only('id').get(pk=area.pk)
+        # Só as reservas do dia que cruzam [início, fim) são lidas, direto do índice (area, data, horario_inicio).
+        sobrepostas = list(
+            Reserva.objects
+            .filter(area=area, data=data, status__in=STATUS_OCUPAM, horario_inicio__lt=fim, horario_fim__gt=inicio)
+            .values_list('horario_inicio', 'horario_fim')
+        )
+        if any(n >= area.reservas_por_horario for n in _ocupacao(pedidos, sobrepostas)):
+            raise ReservaIndisponivel('Este horário já está lotado. Escolha outro horário disponível.')
+        return Reserva.objects.create(
+            area=area,
+            morador=morador,
+            data=data,
+            horario_inicio=inicio,
+            horario_fim=fim,
+            observacoes=observacoes,
+        )
+
+
+def listar_reservas(condominio, status=None, area_id=None, de=None, ate=None):
+    # Filtra por area_id IN (subconsulta das áreas do condomínio): o filtro cai direto nos índices (area, ...) de Reserva.
+    areas = AreaComum.objects.filter(condominio=condominio)
+    if area_id:
+        areas = areas.filter(id=area_id)
+    reservas = Reserva.objects.filter(area_id__in=areas.values('id'))
+    if status:
+        reservas = reservas.filter(status=status)
+    if de:
+        reservas = reservas.filter(data__gte=de)
+    if ate:
+        reservas = reservas.filter(data__lte=ate)
+    return reservas.select_related('area', 'morador')
+
+
+def _data_da_busca(busca):
+    for formato in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.datetime.strptime(busca.strip(), formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def semana_de(dia):
+    inicio = dia - datetime.timedelta(days=dia.weekday())
+    return inicio, inicio + datetime.timedelta(days=6)
+
+
+def reservas_na_portaria(condominio, hoje, busca=None):
+    # Projeção enxuta das reservas aprovadas da semana (ou da busca), só com as colunas usadas no balcão.
+    reservas = Reserva.objects.filter(status='APROVADA')
+    if condominio:
+        reservas = reservas.filter(area_id__in=AreaComum.objects.filter(condominio=condominio).values('id'))
+    if busca:
+        filtro = Q(morador__nome__icontains=busca) | Q(area__nome__icontains=busca)
+        data = _data_da_busca(busca)
+        if data:
+            filtro |= Q(data=data)
+        reservas = reservas.filter(filtro)
+    else:
+        inicio, fim = semana_de(hoje)
+        reservas = reservas.filter(data__gte=inicio, data__lte=fim)
+    return reservas.select_related('area', 'morador').only(*CAMPOS_PORTARIA).order_by('data', 'horario_inicio')
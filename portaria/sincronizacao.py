@@ -0,0 +1,182 @@
+import datetime
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from .models import Encomenda, Morador, Notificacao, Sindico, Solicitacao, Visitante
+
+MARCA_OFFLINE = ' [Registrado offline]'
+ROTULOS = {'visitantes': 'Visitante', 'encomendas': 'Encomenda', 'solicitacoes': 'Solicitação'}
+
+
+class ItemInvalido(ValueError):
+    pass
+
+
+def _texto(modelo, campo, valor, padrao=''):
+    # Corta no max_length da coluna: um texto longo não pode derrubar o lote inteiro no bulk_create.
+    texto = str(valor or padrao).strip() or padrao
+    return texto[:modelo._meta.get_field(campo).max_length]
+
+
+def _inteiro(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _uuid(item):
+    # Clientes antigos não mandam uuid: recebem um novo, sem garantia de idempotência (como antes).
+    if not item.get('uuid'):
+        return uuid.uuid4()
+    try:
+        return uuid.UUID(str(item['uuid']))
+    except ValueError:
+        raise ItemInvalido('Identificador (uuid) inválido.')
+
+
+def _morador(item, moradores, obrigatorio=False):
+    morador_id = _inteiro(item.get('morador_id'))
+    if morador_id is None:
+        if obrigatorio:
+            raise ItemInvalido('Morador não informado.')
+        return None
+    if morador_id not in moradores:
+        raise ItemInvalido('Morador não encontrado.')
+    return moradores[morador_id]
+
+
+def _condominio_id(morador, condominio):
+    condominio_id = (morador and morador.condominio_id) or (condominio and condominio.id)
+    if not condominio_id:
+        raise ItemInvalido('Condomínio não identificado.')
+    return condominio_id
+
+
+def _visitante(item, moradores, condominio, usuario):
+    morador = _morador(item, moradores)
+    try:
+        nascimento = datetime.date.fromisoformat(item['data_nascimento']) if item.get('data_nascimento') else None
+    except (TypeError, ValueError):
+        raise ItemInvalido('Data de nascimento inválida.')
+    return Visitante(
+        condominio_id=_condominio_id(morador, condominio),
+        nome_completo=_texto(Visitante, 'nome_completo', item.get('nome_completo'), 'Sem nome'),
+        cpf=_texto(Visitante, 'cpf', item.get('cpf')),
+        data_nascimento=nascimento,
+        placa_veiculo=_texto(Visitante, 'placa_veiculo', item.get('placa_veiculo')),
+        morador_responsavel=morador,
+        quem_autorizou=_texto(Visitante, 'quem_autorizou', item.get('quem_autorizou')),
+        observacoes=str(item.get('observacoes') or '') + MARCA_OFFLINE,
+        registrado_por=usuario,
+    )
+
+
+def _encomenda(item, moradores, condominio, usuario):
+    morador = _morador(item, moradores, obrigatorio=True)
+    return Encomenda(
+        condominio_id=_condominio_id(morador, condominio),
+        morador=morador,
+        volume=_texto(Encomenda, 'volume', item.get('volume'), 'Sem descrição'),
+        destinatario_alternativo=_texto(Encomenda, 'destinatario_alternativo', item.get('destinatario_alternativo')),
+        porteiro_cadastro=usuario,
+    )
+
+
+def _solicitacao(item, moradores, condominio, usuario):
+    morador = _morador(item, moradores)
+    return Solicitacao(
+        condominio_id=_condominio_id(morador, condominio),
+        tipo=_texto(Solicitacao, 'tipo', item.get('tipo'), 'OUTRO'),
+        descricao=str(item.get('descricao') or '') + MARCA_OFFLINE,
+        morador=morador,
+        criado_por=usuario,
+    )
+
+
+# chave do payload -> (modelo, construtor, contador na resposta)
+ENTIDADES = {
+    'visitantes': (Visitante, _visitante, 'visitantes_criados'),
+    'encomendas': (Encomenda, _encomenda, 'encomendas_criadas'),
+    'solicitacoes': (Solicitacao, _solicitacao, 'solicitacoes_criadas'),
+}
+
+
+def _notificar_sindicos(solicitacoes, usuario):
+    sindicos = {}
+    for condominio_id, usuario_id in Sindico.objects.filter(condominio_id__in={s.condominio_id for s in solicitacoes}).values_list('condominio_id', 'usuario_id'):
+        sindicos.setdefault(condominio_id, []).append(usuario_id)
+    autor = usuario.get_full_name() or usuario.username
+    Notificacao.objects.bulk_create([
+        Notificacao(
+            usuario_id=usuario_id,
+            condominio_id=s.condominio_id,
+            tipo='solicitacao',
+            mensagem=f'Porteiro {autor}: solicitação #{s.id} [offline]'[:200],
+            link='/sindico/solicitacoes/'
+        )
+        for s in solicitacoes for usuario_id in sindicos.get(s.condominio_id, [])
+    ], batch_size=500)
+
+
+def sincronizar_pendencias(usuario, condominio, dados):
+    lotes = {chave: [item for item in (dados.get(chave) or []) if isinstance(item, dict)] for chave in ENTIDADES}
+
+    # Todos os moradores citados no lote em uma única consulta.
+    ids = {_inteiro(item.get('morador_id')) for itens in lotes.values() for item in itens} - {None}
+    moradores = Morador.objects.only('id', 'condominio_id')
+    if condominio:
+        moradores = moradores.filter(condominio=condominio)
+    moradores = moradores.in_bulk(ids)
+
+    resultado = {'confirmados': [], 'erros': []}
+    validos = {}
+    vistos = set()
+    for chave, (modelo, montar, _) in ENTIDADES.items():
+        validos[chave] = []
+        for posicao, item in enumerate(lotes[chave], start=1):
+            try:
+                identificador = _uuid(item)
+                objeto = montar(item, moradores, condominio, usuario)
+            except ItemInvalido as e:
+                resultado['erros'].append(f'{ROTULOS[chave]} #{posicao}: {e}')
+                resultado['confirmados'].append({'uuid': item.get('uuid'), 'tipo': chave, 'status': 'erro', 'erro': str(e)})
+                continue
+            if identificador in vistos:
+                resultado['confirmados'].append({'uuid': str(identificador), 'tipo': chave, 'status': 'duplicado'})
+                continue
+            vistos.add(identificador)
+            objeto.uuid_cliente = identificador
+            validos[chave].append(objeto)
+
+    criadas = []
+    with transaction.atomic():
+        # A fila offline é do usuário: trava a linha dele antes de checar o que já existe. Dois envios simultâneos
+        # (sincronização da página e Background Sync, ou um reenvio) rodam um depois do outro, e o segundo só
+        # confirma como duplicado, sem notificar nem triar de novo o que o primeiro gravou.
+        get_user_model().objects.select_for_update().only('id').get(pk=usuario.pk)
+        for chave, (modelo, _, contador) in ENTIDADES.items():
+            objetos = validos[chave]
+            # Reenvio de um lote cuja resposta se perdeu: o que já existe só é confirmado de novo.
+            existentes = set(modelo.objects.filter(uuid_cliente__in=[o.uuid_cliente for o in objetos]).values_list('uuid_cliente', flat=True))
+            novos = [o for o in objetos if o.uuid_cliente not in existentes]
+            modelo.objects.bulk_create(novos, batch_size=500, ignore_conflicts=True)
+            resultado[contador] = len(novos)
+            resultado['confirmados'].extend(
+                {'uuid': str(o.uuid_cliente), 'tipo': chave, 'status': 'duplicado' if o.uuid_cliente in existentes else 'criado'}
+                for o in objetos
+            )
+            if chave == 'solicitacoes' and novos:
+                # Com ignore_conflicts o banco não devolve os ids: busca de volta para a notificação e a triagem.
+                criadas = list(Solicitacao.objects.filter(uuid_cliente__in=[o.uuid_cliente for o in novos], criado_por=usuario))
+                _notificar_sindicos(criadas, usuario)
+
+    # bulk_create não dispara post_save: a triagem (O.S. automática para manutenção) roda aqui, após o commit.
+    for solicitacao in criadas:
+        post_save.send(sender=Solicitacao, instance=solicitacao, created=True, update_fields=None, raw=False, using='default')
+
+    resultado['ok'] = not resultado['erros']
+    return resultado
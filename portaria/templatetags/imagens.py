@@ -0,0 +1,59 @@
+from django import template
+
+from django.core.files.storage import default_storage
+
+from django.utils.html import format_html, format_html_join
+
+from portaria.imagens import LARGURAS, caminho_derivado, derivados_prontos
+
+register = template.Library()
+
+def _srcset(nome, extensao):
+
+    pass
+
+    return ', '.join(f'{default_storage.url(caminho_derivado(nome, largura, extensao))} {largura}w' for largura in LARGURAS)
+
+@register.simple_tag
+
+def imagem_responsiva(arquivo, sizes='100vw', **atributos):
+
+    pass
+
+    if not arquivo:
+
+        return ''
+
+    # Atributos com hífen não cabem como argumento do template: data_bs_toggle vira data-bs-toggle.
+
+    atributos = {nome.replace('_', '-'): valor for nome, valor in atributos.items()}
+
+    atributos.setdefault('loading', 'lazy')
+
+    atributos.setdefault('decoding', 'async')
+
+    extras = format_html_join(' ', '{}="{}"', atributos.items())
+
+    if not derivados_prontos(arquivo.name):
+
+        return format_html('<img src="{}" {}>', arquivo.url, extras)
+
+    return format_html(
+
+        '<picture style="display: contents"><source type="image/webp" srcset="{}" sizes="{}">'
+
+        '<img src="{}" srcset="{}" sizes="{}" {}></picture>',
+
+        _srcset(arquivo.name, 'webp'),
+
+        sizes,
+
+        default_storage.url(caminho_derivado(arquivo.name, LARGURAS[1], 'jpg')),
+
+        _srcset(arquivo.name, 'jpg'),
+
+        sizes,
+
+        extras,
+
+    )
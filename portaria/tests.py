@@ -109,3 +109,2020 @@ class WebPushAutomatedTests(TestCase):
         )
 
         self.assertEqual(mock_webpush.call_count, 1)
+
+
+from django.test import override_settings
+
+from .models import Condominio, Visitante
+
+from . import pdf as pdf_service
+
+class RelatorioPdfTests(TestCase):
+
+    def setUp(self):
+
+        self.condominio = Condominio.objects.create(nome='Residencial Teste')
+
+        self.porteiro = User.objects.create_user(username='porteiro_pdf', password='123', tipo_usuario='porteiro')
+
+        self.porteiro.condominios.add(self.condominio)
+
+        Visitante.objects.create(condominio=self.condominio, nome_completo='Visitante PDF')
+
+        self.client.login(username='porteiro_pdf', password='123')
+
+    @override_settings(PDF_WORKERS=0)
+
+    def test_relatorio_gerado_no_proprio_processo(self):
+
+        resposta = self.client.get(reverse('exportar_relatorio'))
+
+        self.assertEqual(resposta['Content-Type'], 'application/pdf')
+
+        self.assertTrue(resposta.content.startswith(b'%PDF'))
+
+    @override_settings(PDF_WORKERS=1, PDF_FILA_MAXIMA=0)
+
+    def test_fila_cheia_responde_503(self):
+
+        vagas = pdf_service._get_vagas()
+
+        vagas.acquire()
+
+        try:
+
+            resposta = self.client.get(reverse('exportar_relatorio'))
+
+        finally:
+
+            vagas.release()
+
+        self.assertEqual(resposta.status_code, 503)
+
+    @override_settings(PDF_WORKERS=1, PDF_FILA_MAXIMA=1)
+
+    def test_timeout_encerra_so_o_proprio_job(self):
+
+        with self.settings(PDF_TIMEOUT=0):
+
+            self.assertEqual(self.client.get(reverse('exportar_relatorio')).status_code, 504)
+
+        resposta = self.client.get(reverse('exportar_relatorio'))
+
+        self.assertEqual(resposta.status_code, 200)
+
+        self.assertTrue(resposta.content.startswith(b'%PDF'))
+
+    def test_erro_na_geracao_responde_500(self):
+
+        with patch('portaria.pdf.gerar_pdf_bytes', side_effect=pdf_service.PdfIndisponivel('html inválido')):
+
+            resposta = self.client.get(reverse('exportar_relatorio'))
+
+        self.assertEqual(resposta.status_code, 500)
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+import io
+
+import os
+
+import tempfile
+
+import datetime
+
+from django.core.management import call_command
+
+from django.utils import timezone
+
+from .models import ImportacaoMoradores
+
+from .importacao import criar_importacao, importar_moradores, ler_linhas_planilha
+
+class ImportacaoMoradoresTests(TestCase):
+
+    def setUp(self):
+
+        self.condominio = Condominio.objects.create(nome='Residencial Importação')
+
+        User.objects.create_user(username='joão.101.a', password='123')
+
+    def test_importacao_em_lote(self):
+
+        linhas = [
+
+            ['João Silva', '101', 'A', '11999990000', 'joao@email.com', '12345678901'],
+
+            ['João Souza', '101', 'A', '', '', ''],
+
+            ['', '102', 'A'],
+
+            ['Maria Lima', '102', 'B', '', '', '1' * 20],
+
+            ['Ana Costa', '201'],
+
+        ]
+
+        resultado = importar_moradores(self.condominio, linhas, tamanho_lote=2)
+
+        self.assertEqual(resultado['processadas'], 5)
+
+        self.assertEqual(resultado['criados'], 3)
+
+        self.assertEqual([e['linha'] for e in resultado['erros']], [3, 4])
+
+        usernames = set(Morador.objects.filter(condominio=self.condominio).values_list('usuario__username', flat=True))
+
+        self.assertEqual(usernames, {'joão.101.a1', 'joão.101.a2', 'ana.201'})
+
+        usuario = User.objects.get(username='ana.201')
+
+        self.assertTrue(usuario.check_password('mudar123'))
+
+        self.assertEqual(list(usuario.condominios.all()), [self.condominio])
+
+    def test_reimportacao_ignora_ja_cadastrados_e_respeita_cabecalho(self):
+
+        importar_moradores(self.condominio, [['Carlos Melo', '301', 'C']])
+
+        conteudo = 'cpf;bloco;apartamento;nome\n;C;301;Carlos Melo\n123;C;302;Paula Alves\n;C;302;Paula Alves\n'.encode('utf-8')
+
+        linhas = ler_linhas_planilha(io.BytesIO(conteudo), 'moradores.csv')
+
+        resultado = importar_moradores(self.condominio, linhas)
+
+        self.assertEqual((resultado['criados'], resultado['ignorados']), (1, 2))
+
+        self.assertEqual(Morador.objects.get(nome='Paula Alves').cpf, '123')
+
+    @override_settings(IMPORTACAO_SEGUNDO_PLANO=False, MEDIA_ROOT=tempfile.mkdtemp())
+
+    def test_upload_csv_pelo_sindico(self):
+
+        sindico = User.objects.create_user(username='sindico_imp', password='123', tipo_usuario='sindico')
+
+        sindico.condominios.add(self.condominio)
+
+        self.client.login(username='sindico_imp', password='123')
+
+        conteudo = 'Nome;Apartamento;Bloco;Telefone;Email\nCarlos Melo;301;C;;\nPaula Alves;302;C;;\n;303;C;;\n'.encode('utf-8-sig')
+
+        arquivo = SimpleUploadedFile('moradores.csv', conteudo, content_type='text/csv')
+
+        resposta = self.client.post(reverse('sindico_moradores'), {'action': 'importar', 'arquivo': arquivo})
+
+        self.assertEqual(resposta.status_code, 302)
+
+        self.assertEqual(Morador.objects.filter(condominio=self.condominio).count(), 2)
+
+        importacao = ImportacaoMoradores.objects.get(condominio=self.condominio)
+
+        progresso = self.client.get(reverse('sindico_importacao_progresso', args=[importacao.id])).json()
+
+        self.assertEqual(progresso['status'], 'CONCLUIDA')
+
+        self.assertEqual((progresso['processadas'], progresso['criados'], progresso['falhas']), (3, 2, 1))
+
+        falhas = self.client.get(reverse('sindico_importacao_falhas', args=[importacao.id]))
+
+        self.assertIn('obrigatórios', falhas.content.decode('utf-8'))
+
+        outro = Condominio.objects.create(nome='Outro')
+
+        alheia = ImportacaoMoradores.objects.create(condominio=outro, nome_original='x.csv')
+
+        self.assertEqual(self.client.get(reverse('sindico_importacao_progresso', args=[alheia.id])).status_code, 404)
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+
+    def test_retoma_importacao_parada(self):
+
+        conteudo = 'Nome;Apartamento;Bloco\nCarlos Melo;301;C\nPaula Alves;302;C\n'.encode('utf-8')
+
+        parada = criar_importacao(self.condominio, SimpleUploadedFile('parada.csv', conteudo))
+
+        ativa = criar_importacao(self.condominio, SimpleUploadedFile('ativa.csv', conteudo))
+
+        # A thread de "parada" cadastrou o primeiro morador e morreu com o worker; "ativa" acabou de gravar progresso.
+
+        importar_moradores(self.condominio, [['Carlos Melo', '301', 'C']])
+
+        uma_hora_atras = timezone.now() - datetime.timedelta(hours=1)
+
+        ImportacaoMoradores.objects.filter(pk=parada.pk).update(status='PROCESSANDO', ultimo_progresso=uma_hora_atras)
+
+        ImportacaoMoradores.objects.filter(pk=ativa.pk).update(status='PROCESSANDO', ultimo_progresso=timezone.now())
+
+        saida = io.StringIO()
+
+        call_command('retomar_importacoes', stdout=saida)
+
+        self.assertIn('1 importação(ões) retomada(s)', saida.getvalue())
+
+        parada.refresh_from_db()
+
+        self.assertEqual((parada.status, parada.criados, parada.ignorados), ('CONCLUIDA', 1, 1))
+
+        self.assertEqual(ImportacaoMoradores.objects.get(pk=ativa.pk).status, 'PROCESSANDO')
+
+        self.assertEqual(Morador.objects.filter(condominio=self.condominio).count(), 2)
+
+from django.core.management import call_command
+
+from .importacao import sincronizar_moradores
+
+class SincronizacaoMoradoresTests(TestCase):
+
+    def setUp(self):
+
+        self.condominio = Condominio.objects.create(nome='Residencial Upsert')
+
+        self.caminho = os.path.join(tempfile.mkdtemp(), 'moradores.csv')
+
+    def _escrever(self, conteudo):
+
+        with open(self.caminho, 'w', encoding='utf-8') as arquivo:
+
+            arquivo.write(conteudo)
+
+    def test_upsert_por_cpf_e_idempotente(self):
+
+        Morador.objects.create(condominio=self.condominio, nome='Ana Lima', apartamento='10', bloco='A', cpf='111')
+
+        linhas = [
+
+            ['Ana Lima', '11', 'A', '', '', '111'],
+
+            ['Bruno Reis', '12', 'A', '', '', '222'],
+
+            ['Bruno Repetido', '13', 'A', '', '', '222'],
+
+            ['Sem CPF', '14', 'A', '', '', ''],
+
+        ]
+
+        resultado = sincronizar_moradores(self.condominio, linhas, tamanho_lote=1)
+
+        self.assertEqual((resultado['criados'], resultado['atualizados'], resultado['duplicadas'], len(resultado['erros'])), (1, 1, 1, 1))
+
+        self.assertEqual(Morador.objects.get(cpf='111').apartamento, '11')
+
+        novamente = sincronizar_moradores(self.condominio, linhas)
+
+        self.assertEqual((novamente['criados'], novamente['atualizados'], novamente['inalterados']), (0, 0, 2))
+
+        self.assertEqual(Morador.objects.filter(condominio=self.condominio).count(), 2)
+
+    def test_comando_dry_run_e_chave_unidade(self):
+
+        self._escrever('nome|cpf|bloco|apartamento|telefone|email\nCarla Dias||B|201|9999|\nDiego Luz||B|202||\n')
+
+        saida = io.StringIO()
+
+        call_command('importar_moradores', self.caminho, condominio=str(self.condominio.id), delimitador='|', chave='unidade', dry_run=True, stdout=saida)
+
+        self.assertIn('2 criados', saida.getvalue())
+
+        self.assertFalse(Morador.objects.exists())
+
+        call_command('importar_moradores', self.caminho, condominio=self.condominio.nome, delimitador='|', chave='unidade', stdout=io.StringIO())
+
+        self.assertEqual(Morador.objects.get(nome='Carla Dias').telefone, '9999')
+
+        self._escrever('nome|cpf|bloco|apartamento|telefone|email\nCarla Dias||B|201|8888|\n')
+
+        saida = io.StringIO()
+
+        call_command('importar_moradores', self.caminho, condominio=self.condominio.nome, delimitador='|', chave='unidade', stdout=saida)
+
+        self.assertIn('1 atualizados', saida.getvalue())
+
+        self.assertEqual(Morador.objects.filter(condominio=self.condominio).count(), 2)
+
+import datetime
+
+from .models import Cobranca, Notificacao
+
+class AtualizarCobrancasTests(TestCase):
+
+    def setUp(self):
+
+        self.condominio = Condominio.objects.create(nome='Residencial Cobranças')
+
+        usuario = User.objects.create_user(username='morador_cob', password='123', tipo_usuario='morador')
+
+        self.morador = Morador.objects.create(condominio=self.condominio, nome='Morador Cob', apartamento='1', usuario=usuario)
+
+        sem_conta = Morador.objects.create(condominio=self.condominio, nome='Sem Conta', apartamento='2')
+
+        hoje = datetime.date.today()
+
+        ontem = hoje - datetime.timedelta(days=1)
+
+        self.vencidas = [
+
+            Cobranca.objects.create(condominio=self.condominio, morador=m, valor=100, data_vencimento=ontem)
+
+            for m in (self.morador, self.morador, sem_conta)
+
+        ]
+
+        self.em_dia = Cobranca.objects.create(condominio=self.condominio, morador=self.morador, valor=100, data_vencimento=hoje)
+
+        self.paga = Cobranca.objects.create(condominio=self.condominio, morador=self.morador, valor=100, data_vencimento=ontem, status='PAGO')
+
+    def test_atualiza_em_lotes_e_notifica_uma_vez(self):
+
+        call_command('atualizar_cobrancas', lote=2, stdout=io.StringIO())
+
+        self.assertEqual(Cobranca.objects.filter(status='ATRASADO').count(), 3)
+
+        self.em_dia.refresh_from_db()
+
+        self.paga.refresh_from_db()
+
+        self.assertEqual((self.em_dia.status, self.paga.status), ('PENDENTE', 'PAGO'))
+
+        self.assertEqual(Notificacao.objects.filter(usuario=self.morador.usuario).count(), 2)
+
+        call_command('atualizar_cobrancas', stdout=io.StringIO())
+
+        self.assertEqual(Notificacao.objects.count(), 2)
+
+    def test_dry_run_e_pagina_financeiro_nao_gravam(self):
+
+        saida = io.StringIO()
+
+        call_command('atualizar_cobrancas', dry_run=True, stdout=saida)
+
+        self.assertIn('3 cobrança(s) seriam', saida.getvalue())
+
+        sindico = User.objects.create_user(username='sindico_cob', password='123', tipo_usuario='sindico')
+
+        sindico.condominios.add(self.condominio)
+
+        self.client.login(username='sindico_cob', password='123')
+
+        self.assertEqual(self.client.get(reverse('sindico_financeiro')).status_code, 200)
+
+        self.assertEqual(Cobranca.objects.filter(status='ATRASADO').count(), 0)
+
+from decimal import Decimal
+
+from .faturamento import gerar_cobrancas_mes, ler_tabela_unidades, mapear_boletos
+
+class FaturamentoLoteTests(TestCase):
+
+    def setUp(self):
+
+        self.condominio = Condominio.objects.create(nome='Residencial Faturamento')
+
+        usuario = User.objects.create_user(username='resp_a101', password='123', tipo_usuario='morador')
+
+        Morador.objects.create(condominio=self.condominio, nome='Dependente', bloco='A', apartamento='101')
+
+        self.responsavel = Morador.objects.create(condominio=self.condominio, nome='Responsável', bloco='A', apartamento='101', usuario=usuario)
+
+        Morador.objects.create(condominio=self.condominio, nome='Vizinho', bloco='A', apartamento='102')
+
+        Morador.objects.create(condominio=self.condominio, nome='Outro Bloco', bloco='B', apartamento='101')
+
+        self.competencia = datetime.date(2026, 11, 1)
+
+        self.vencimento = datetime.date(2026, 11, 10)
+
+    @patch('portaria.faturamento.disparar_push_em_massa')
+
+    def test_valor_fixo_por_bloco_e_idempotente(self, mock_push):
+
+        resultado = gerar_cobrancas_mes(self.condominio, self.competencia, 'Taxa', self.vencimento, valor=Decimal('350'), bloco='A')
+
+        self.assertEqual((resultado['unidades'], resultado['criadas']), (2, 2))
+
+        self.assertTrue(Cobranca.objects.filter(morador=self.responsavel, competencia=self.competencia).exists())
+
+        self.assertEqual(len(list(mock_push.call_args[0][0])), 1)
+
+        novamente = gerar_cobrancas_mes(self.condominio, datetime.date(2026, 11, 20), 'Taxa', self.vencimento, valor=Decimal('350'))
+
+        self.assertEqual((novamente['criadas'], novamente['ja_faturadas']), (1, 2))
+
+        self.assertEqual(Cobranca.objects.filter(condominio=self.condominio).count(), 3)
+
+    @patch('portaria.faturamento.disparar_push_em_massa')
+
+    def test_rateio_por_fracao_com_pix_e_boleto_por_unidade(self, mock_push):
+
+        tabela = ler_tabela_unidades('bloco;apartamento;fracao\nA;101;2;pix-a101\nA;102;1\nB;101;1\n')
+
+        boletos = mapear_boletos([SimpleUploadedFile('A-102.pdf', b'%PDF-1.4')])
+
+        with override_settings(MEDIA_ROOT=tempfile.mkdtemp()):
+
+            resultado = gerar_cobrancas_mes(self.condominio, self.competencia, 'Taxa', self.vencimento, modo='fracao', valor=Decimal('1000'), tabela=tabela, chave_pix='pix-geral', boletos=boletos)
+
+        self.assertEqual(resultado['total'], Decimal('1000.00'))
+
+        a101 = Cobranca.objects.get(morador=self.responsavel)
+
+        a102 = Cobranca.objects.get(morador__nome='Vizinho')
+
+        self.assertEqual((a101.valor, a101.chave_pix), (Decimal('500.00'), 'pix-a101'))
+
+        self.assertEqual((a102.valor, a102.chave_pix), (Decimal('250.00'), 'pix-geral'))
+
+        self.assertTrue(a102.arquivo_boleto.name.endswith('.pdf'))
+
+    @patch('portaria.faturamento.disparar_push_em_massa')
+
+    def test_faturamento_pela_tela_financeiro(self, mock_push):
+
+        sindico = User.objects.create_user(username='sindico_fat', password='123', tipo_usuario='sindico')
+
+        sindico.condominios.add(self.condominio)
+
+        self.client.login(username='sindico_fat', password='123')
+
+        dados = {'action': 'gerar_lote', 'competencia': '2026-11', 'data_vencimento': '2026-11-10', 'modo': 'fixo', 'valor': '300,50', 'descricao': 'Taxa'}
+
+        self.client.post(reverse('sindico_financeiro'), dados)
+
+        self.client.post(reverse('sindico_financeiro'), dados)
+
+        self.assertEqual(Cobranca.objects.filter(condominio=self.condominio, valor=Decimal('300.50')).count(), 3)
+
+from .models import ResumoFinanceiroMensal
+
+from .financeiro import indicadores_financeiros
+
+class ResumoFinanceiroTests(TestCase):
+
+    def setUp(self):
+
+        self.condominio = Condominio.objects.create(nome='Residencial Resumo')
+
+        self.morador = Morador.objects.create(condominio=self.condominio, nome='Morador Resumo', apartamento='1')
+
+    def _resumo(self, mes):
+
+        return ResumoFinanceiroMensal.objects.get(condominio=self.condominio, mes=mes)
+
+    def test_resumo_mantido_ao_salvar_e_excluir(self):
+
+        nov = datetime.date(2026, 11, 1)
+
+        c1 = Cobranca.objects.create(condominio=self.condominio, morador=self.morador, valor=100, data_vencimento='2026-11-10')
+
+        c2 = Cobranca.objects.create(condominio=self.condominio, morador=self.morador, valor=50, data_vencimento=datetime.date(2026, 11, 20))
+
+        c1.status = 'PAGO'
+
+        c1.save()
+
+        c2.status = 'ATRASADO'
+
+        c2.save()
+
+        resumo = self._resumo(nov)
+
+        self.assertEqual((resumo.valor_faturado, resumo.valor_recebido, resumo.valor_atrasado), (150, 100, 50))
+
+        self.assertEqual((resumo.qtd_pago, resumo.qtd_atrasado), (1, 1))
+
+        self.assertEqual(resumo.taxa_inadimplencia, 33.3)
+
+        c2.data_vencimento = datetime.date(2026, 12, 5)
+
+        c2.save()
+
+        self.assertEqual(self._resumo(nov).valor_atrasado, 0)
+
+        self.assertEqual(self._resumo(datetime.date(2026, 12, 1)).qtd_atrasado, 1)
+
+        c1.delete()
+
+        self.assertFalse(ResumoFinanceiroMensal.objects.filter(condominio=self.condominio, mes=nov).exists())
+
+    def test_resumo_atualizado_na_mesma_linha(self):
+
+        dez = datetime.date(2026, 12, 1)
+
+        Cobranca.objects.create(condominio=self.condominio, morador=self.morador, valor=100, data_vencimento=datetime.date(2026, 12, 10))
+
+        original = self._resumo(dez)
+
+        Cobranca.objects.create(condominio=self.condominio, morador=self.morador, valor=40, data_vencimento=datetime.date(2026, 12, 15), status='PAGO')
+
+        atualizado = self._resumo(dez)
+
+        self.assertEqual(atualizado.pk, original.pk)
+
+        self.assertEqual((atualizado.valor_faturado, atualizado.qtd_pendente, atualizado.qtd_pago), (140, 1, 1))
+
+    def test_comando_reconstroi_e_indicadores(self):
+
+        Cobranca.objects.create(condominio=self.condominio, morador=self.morador, valor=80, data_vencimento=datetime.date(2026, 10, 5), status='PAGO')
+
+        Cobranca.objects.filter(condominio=self.condominio).update(valor=90)
+
+        ResumoFinanceiroMensal.objects.all().delete()
+
+        call_command('recalcular_resumo_financeiro', stdout=io.StringIO())
+
+        self.assertEqual(self._resumo(datetime.date(2026, 10, 1)).valor_recebido, 90)
+
+        indicadores = indicadores_financeiros(self.condominio, meses=3, hoje=datetime.date(2026, 11, 15))
+
+        self.assertEqual([r.mes.month for r in indicadores['serie']], [9, 10, 11])
+
+        self.assertEqual(indicadores['totais']['qtd_pago'], 1)
+
+        sindico = User.objects.create_user(username='sindico_res', password='123', tipo_usuario='sindico')
+
+        sindico.condominios.add(self.condominio)
+
+        self.client.login(username='sindico_res', password='123')
+
+        resposta = self.client.get(reverse('sindico_painel'))
+
+        self.assertEqual(resposta.context['stats']['cobrancas_pagas'], 1)
+
+from .paginacao import paginar_por_chave
+
+class ListagemFinanceiroTests(TestCase):
+
+    def setUp(self):
+
+        self.condominio = Condominio.objects.create(nome='Residencial Listagem')
+
+        a101 = Morador.objects.create(condominio=self.condominio, nome='Ana', bloco='A', apartamento='101')
+
+        b201 = Morador.objects.create(condominio=self.condominio, nome='Beto', bloco='B', apartamento='201')
+
+        base = datetime.date(2026, 1, 10)
+
+        for i in range(7):
+
+            Cobranca.objects.create(condominio=self.condominio, morador=a101 if i % 2 else b201, valor=10, data_vencimento=base + datetime.timedelta(days=30 * (i // 2)))
+
+        sindico = User.objects.create_user(username='sindico_lst', password='123', tipo_usuario='sindico')
+
+        sindico.condominios.add(self.condominio)
+
+        self.client.login(username='sindico_lst', password='123')
+
+    def test_keyset_percorre_sem_repetir_e_volta(self):
+
+        qs = Cobranca.objects.filter(condominio=self.condominio)
+
+        vistos = []
+
+        pagina = paginar_por_chave(qs, 'data_vencimento', por_pagina=3)
+
+        paginas = [pagina]
+
+        while pagina['proximo']:
+
+            pagina = paginar_por_chave(qs, 'data_vencimento', apos=pagina['proximo'], por_pagina=3)
+
+            paginas.append(pagina)
+
+        for p in paginas:
+
+            vistos.extend(c.id for c in p['itens'])
+
+        esperado = list(qs.order_by('-data_vencimento', '-id').values_list('id', flat=True))
+
+        self.assertEqual(vistos, esperado)
+
+        anterior = paginar_por_chave(qs, 'data_vencimento', antes=paginas[1]['anterior'], por_pagina=3)
+
+        self.assertEqual([c.id for c in anterior['itens']], [c.id for c in paginas[0]['itens']])
+
+        self.assertIsNone(anterior['anterior'])
+
+    def test_filtros_de_unidade_e_contagem_do_resumo(self):
+
+        resposta = self.client.get(reverse('sindico_financeiro'), {'bloco': 'A', 'apartamento': '101'})
+
+        self.assertEqual(len(resposta.context['cobrancas']), 3)
+
+        self.assertEqual(resposta.context['contagem_status']['TOTAL'], 7)
+
+        self.assertNotIn('moradores', resposta.context)
+
+        filtrada = self.client.get(reverse('sindico_financeiro'), {'data_inicio': '2026-02-01', 'data_fim': '2026-02-28'})
+
+        self.assertEqual(filtrada.context['contagem_status']['PENDENTE'], 2)
+
+from django.core.cache import cache
+
+from .financeiro import contar_cobrancas_em_analise
+
+class BadgeCobrancasEmAnaliseTests(TestCase):
+
+    def setUp(self):
+
+        cache.clear()
+
+        self.condominio = Condominio.objects.create(nome='Residencial Badge')
+
+        morador = Morador.objects.create(condominio=self.condominio, nome='Morador Badge', apartamento='1')
+
+        self.cobranca = Cobranca.objects.create(condominio=self.condominio, morador=morador, valor=10, data_vencimento=datetime.date(2026, 5, 1))
+
+    def test_contagem_cacheada_e_invalidada_nas_transicoes(self):
+
+        self.assertEqual(contar_cobrancas_em_analise(self.condominio.id), 0)
+
+        with self.assertNumQueries(0):
+
+            contar_cobrancas_em_analise(self.condominio.id)
+
+        self.cobranca.status = 'EM_ANALISE'
+
+        self.cobranca.save()
+
+        self.assertEqual(contar_cobrancas_em_analise(self.condominio.id), 1)
+
+        self.cobranca.status = 'PAGO'
+
+        self.cobranca.save()
+
+        self.assertEqual(contar_cobrancas_em_analise(self.condominio.id), 0)
+
+    def test_badge_renderizado_sem_laco_no_template(self):
+
+        self.cobranca.status = 'EM_ANALISE'
+
+        self.cobranca.save()
+
+        sindico = User.objects.create_user(username='sindico_badge', password='123', tipo_usuario='sindico')
+
+        sindico.condominios.add(self.condominio)
+
+        self.client.login(username='sindico_badge', password='123')
+
+        resposta = self.client.get(reverse('sindico_moradores'))
+
+        self.assertEqual(resposta.context['cobrancas_em_analise_count'], 1)
+
+        self.assertContains(resposta, 'var count = 1;')
+
+from .conciliacao import ler_arquivo_retorno, conciliar, baixar_conciliados
+
+def _linha_cnab240(segmento, campos):
+
+    linha = list('001' + '0001' + '3' + ' ' * 232)
+
+    linha[13] = segmento
+
+    for inicio, valor in campos:
+
+        linha[inicio:inicio + len(valor)] = valor
+
+    return ''.join(linha)
+
+class ConciliacaoBancariaTests(TestCase):
+
+    def setUp(self):
+
+        self.condominio = Condominio.objects.create(nome='Residencial Conciliação')
+
+        usuario = User.objects.create_user(username='morador_conc', password='123', tipo_usuario='morador')
+
+        self.morador = Morador.objects.create(condominio=self.condominio, nome='Pagador', bloco='A', apartamento='101', usuario=usuario)
+
+        vizinho = Morador.objects.create(condominio=self.condominio, nome='Vizinho', bloco='A', apartamento='102')
+
+        self.vencimento = datetime.date(2026, 11, 10)
+
+        self.cobranca = Cobranca.objects.create(condominio=self.condominio, morador=self.morador, valor=Decimal('350.00'), data_vencimento=self.vencimento)
+
+        self.outra = Cobranca.objects.create(condominio=self.condominio, morador=vizinho, valor=Decimal('350.00'), data_vencimento=self.vencimento)
+
+    def test_cnab240_baixa_em_lote_pelo_nosso_numero(self):
+
+        linhas = []
+
+        for cobranca in (self.cobranca, self.outra):
+
+            linhas.append(_linha_cnab240('T', [(15, '06'), (37, str(cobranca.id).zfill(20)), (73, '10112026'), (81, '35000'.zfill(15))]))
+
+            linhas.append(_linha_cnab240('U', [(15, '06'), (77, '35000'.zfill(15)), (137, '09112026')]))
+
+        linhas.append(_linha_cnab240('T', [(15, '02'), (37, '9'.zfill(20))]))
+
+        formato, lancamentos = ler_arquivo_retorno('\r\n'.join(linhas).encode())
+
+        self.assertEqual((formato, len(lancamentos)), ('CNAB 240', 2))
+
+        resultado = conciliar(self.condominio, lancamentos)
+
+        self.assertEqual([item['criterio'] for item in resultado['conciliados']], ['nosso número', 'nosso número'])
+
+        baixadas = baixar_conciliados(self.condominio, resultado['conciliados'])
+
+        self.assertEqual(len(baixadas), 2)
+
+        self.cobranca.refresh_from_db()
+
+        self.assertEqual((self.cobranca.status, self.cobranca.data_pagamento), ('PAGO', datetime.date(2026, 11, 9)))
+
+        self.assertEqual(Notificacao.objects.filter(usuario=self.morador.usuario).count(), 1)
+
+        self.assertEqual(ResumoFinanceiroMensal.objects.get(condominio=self.condominio).qtd_pago, 2)
+
+        self.assertEqual(conciliar(self.condominio, lancamentos)['conciliados'], [])
+
+    @patch('portaria.utils.disparar_push_em_massa')
+
+    def test_ofx_previa_e_confirmacao_pela_unidade(self, mock_push):
+
+        ofx = (
+
+            'OFXHEADER:100\nDATA:OFXSGML\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n'
+
+            '<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20261108120000[-3:BRT]<TRNAMT>350.00<FITID>1<MEMO>PIX TAXA BL A AP 101</STMTTRN>\n'
+
+            '<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20261108<TRNAMT>-80.00<FITID>2<MEMO>TARIFA</STMTTRN>\n'
+
+            '<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20261108<TRNAMT>999.00<FITID>3<MEMO>DEPOSITO</STMTTRN>\n'
+
+            '</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n'
+
+        )
+
+        sindico = User.objects.create_user(username='sindico_conc', password='123', tipo_usuario='sindico')
+
+        sindico.condominios.add(self.condominio)
+
+        self.client.login(username='sindico_conc', password='123')
+
+        with override_settings(MEDIA_ROOT=tempfile.mkdtemp()):
+
+            previa = self.client.post(reverse('sindico_conciliacao'), {'arquivo': SimpleUploadedFile('extrato.ofx', ofx.encode('latin-1'))})
+
+            self.assertEqual(len(previa.context['resultado']['conciliados']), 1)
+
+            self.assertEqual(len(previa.context['resultado']['nao_conciliados']), 1)
+
+            self.cobranca.refresh_from_db()
+
+            self.assertEqual(self.cobranca.status, 'PENDENTE')
+
+            self.client.post(reverse('sindico_conciliacao'), {'token': previa.context['token'], 'confirmar': '1'})
+
+        self.cobranca.refresh_from_db()
+
+        self.outra.refresh_from_db()
+
+        self.assertEqual((self.cobranca.status, self.outra.status), ('PAGO', 'PENDENTE'))
+
+        self.assertEqual(len(mock_push.call_args[0][0]), 1)
+
+from .models import AreaComum, Reserva, DisponibilidadeArea
+
+from .reservas import reservar_dia, ReservaIndisponivel
+
+class DisponibilidadeAreaTests(TestCase):
+
+    def setUp(self):
+
+        self.condominio = Condominio.objects.create(nome='Residencial Reservas')
+
+        usuario = User.objects.create_user(username='morador_reserva', password='123', tipo_usuario='morador')
+
+        self.morador = Morador.objects.create(condominio=self.condominio, nome='Festeiro', bloco='A', apartamento='1', usuario=usuario)
+
+        self.area = AreaComum.objects.create(condominio=self.condominio, nome='Salão', capacidade=50, horario_abertura=datetime.time(8), horario_fechamento=datetime.time(22))
+
+        self.data = datetime.date.today() + datetime.timedelta(days=40)
+
+    def test_indice_acompanha_status_e_bloqueia_conflito(self):
+
+        reserva = reservar_dia(self.area, self.morador, self.data)
+
+        indice = DisponibilidadeArea.objects.get(area=self.area, mes=self.data.replace(day=1))
+
+        self.assertEqual(indice.datas_bloqueadas, [self.data.isoformat()])
+
+        with self.assertRaises(ReservaIndisponivel):
+
+            reservar_dia(self.area, self.morador, self.data)
+
+        reserva.status = 'RECUSADA'
+
+        reserva.save()
+
+        self.assertFalse(DisponibilidadeArea.objects.filter(area=self.area).exists())
+
+        reservar_dia(self.area, self.morador, self.data)
+
+        self.assertEqual(Reserva.objects.filter(area=self.area, status='PENDENTE').count(), 1)
+
+        self.area.delete()
+
+        self.assertFalse(DisponibilidadeArea.objects.exists())
+
+    def test_api_calendario_com_etag(self):
+
+        reservar_dia(self.area, self.morador, self.data)
+
+        self.client.login(username='morador_reserva', password='123')
+
+        url = reverse('api_calendario_area', args=[self.area.id]) + f'?mes={self.data:%Y-%m}'
+
+        resposta = self.client.get(url)
+
+        self.assertEqual(resposta.json()['datas_bloqueadas'], [self.data.isoformat()])
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=resposta['ETag']).status_code, 304)
+
+        self.client.post(reverse('morador_fazer_reserva', args=[self.area.id]), {'data': self.data.isoformat()})
+
+        self.assertEqual(Reserva.objects.filter(area=self.area).count(), 1)
+
+from .reservas import reservar_horario, horarios_livres
+
+class ReservaPorHorarioTests(TestCase):
+
+    def setUp(self):
+
+        self.condominio = Condominio.objects.create(nome='Residencial Academia')
+
+        usuario = User.objects.create_user(username='morador_academia', password='123', tipo_usuario='morador')
+
+        self.morador = Morador.objects.create(condominio=self.condominio, nome='Atleta', bloco='A', apartamento='1', usuario=usuario)
+
+        self.area = AreaComum.objects.create(condominio=self.condominio, nome='Academia', capacidade=10, horario_abertura=datetime.time(8), horario_fechamento=datetime.time(11), duracao_horario=60, reservas_por_horario=2)
+
+        self.data = datetime.date.today() + datetime.timedelta(days=3)
+
+    def test_sobreposicao_respeita_capacidade_e_lota_o_dia(self):
+
+        reservar_horario(self.area, self.morador, self.data, datetime.time(8), quantidade=2)
+
+        reservar_horario(self.area, self.morador, self.data, datetime.time(9))
+
+        with self.assertRaises(ReservaIndisponivel):
+
+            reservar_horario(self.area, self.morador, self.data, datetime.time(8), quantidade=2)
+
+        with self.assertRaises(ReservaIndisponivel):
+
+            reservar_horario(self.area, self.morador, self.data, datetime.time(9, 30))
+
+        self.assertFalse(DisponibilidadeArea.objects.filter(area=self.area).exists())
+
+        reservar_horario(self.area, self.morador, self.data, datetime.time(8))
+
+        reservar_horario(self.area, self.morador, self.data, datetime.time(10), quantidade=1)
+
+        reservar_horario(self.area, self.morador, self.data, datetime.time(10))
+
+        indice = DisponibilidadeArea.objects.get(area=self.area)
+
+        self.assertEqual(indice.datas_bloqueadas, [self.data.isoformat()])
+
+    def test_horarios_livres_do_intervalo_em_uma_consulta(self):
+
+        reservar_horario(self.area, self.morador, self.data, datetime.time(9))
+
+        reservar_horario(self.area, self.morador, self.data, datetime.time(9))
+
+        with self.assertNumQueries(1):
+
+            livres = horarios_livres(self.area, self.data, self.data + datetime.timedelta(days=6))
+
+        self.assertEqual(len(livres), 7)
+
+        self.assertEqual([h['inicio'] for h in livres[self.data.isoformat()]], ['08:00', '10:00'])
+
+        self.client.login(username='morador_academia', password='123')
+
+        self.client.post(reverse('morador_fazer_reserva', args=[self.area.id]), {'data': self.data.isoformat(), 'horario_inicio': '10:00'})
+
+        resposta = self.client.get(reverse('api_horarios_area', args=[self.area.id]), {'inicio': self.data.isoformat(), 'fim': self.data.isoformat()})
+
+        self.assertEqual(resposta.json()['horarios_livres'][self.data.isoformat()], [{'inicio': '08:00', 'fim': '09:00', 'vagas': 2}, {'inicio': '10:00', 'fim': '11:00', 'vagas': 1}])
+
+    def test_editar_horario_da_area_refaz_o_indice(self):
+
+        for _ in range(2):
+
+            reservar_horario(self.area, self.morador, self.data, datetime.time(8), quantidade=2)
+
+        self.assertFalse(DisponibilidadeArea.objects.filter(area=self.area).exists())
+
+        sindico = User.objects.create_user(username='sindico_academia', password='123', tipo_usuario='sindico')
+
+        sindico.condominios.add(self.condominio)
+
+        self.client.login(username='sindico_academia', password='123')
+
+        def editar(**campos):
+
+            dados = {'action': 'editar', 'area_id': self.area.id, 'nome': 'Academia', 'capacidade': 10, 'ativo': 'on',
+
+                     'horario_abertura': '08:00', 'horario_fechamento': '11:00', 'duracao_horario': 60, 'reservas_por_horario': 2}
+
+            dados.update(campos)
+
+            return self.client.post(reverse('sindico_areas_comuns'), dados)
+
+        # Sem o horário das 10h, os dois que sobram estão lotados: o dia inteiro fica bloqueado.
+
+        editar(horario_fechamento='10:00')
+
+        self.assertEqual(DisponibilidadeArea.objects.get(area=self.area).datas_bloqueadas, [self.data.isoformat()])
+
+        editar(horario_abertura='07:00')
+
+        self.assertFalse(DisponibilidadeArea.objects.filter(area=self.area).exists())
+
+        resposta = editar(duracao_horario=-30)
+
+        self.assertIn('A duração do horário deve ficar entre 0 (dia inteiro) e 1440 minutos.', [str(m) for m in get_messages(resposta.wsgi_request)])
+
+        self.area.refresh_from_db()
+
+        self.assertEqual((self.area.horario_abertura, self.area.duracao_horario), (datetime.time(7), 60))
+
+from .reservas import listar_reservas, reservas_na_portaria
+
+class ListagemReservasTests(TestCase):
+
+    def setUp(self):
+
+        self.condominio = Condominio.objects.create(nome='Residencial Listagem Reservas')
+
+        self.morador = Morador.objects.create(condominio=self.condominio, nome='Reservista', bloco='B', apartamento='202')
+
+        self.salao = AreaComum.objects.create(condominio=self.condominio, nome='Salão', capacidade=50, horario_abertura=datetime.time(8), horario_fechamento=datetime.time(22))
+
+        self.churrasqueira = AreaComum.objects.create(condominio=self.condominio, nome='Churrasqueira', capacidade=20, horario_abertura=datetime.time(10), horario_fechamento=datetime.time(22))
+
+        self.hoje = datetime.date(2026, 11, 4)
+
+        inicio = datetime.date(2026, 10, 1)
+
+        for i in range(35):
+
+            Reserva.objects.create(area=self.salao, morador=self.morador, data=inicio + datetime.timedelta(days=i), horario_inicio=datetime.time(8), horario_fim=datetime.time(22), status='APROVADA')
+
+        Reserva.objects.create(area=self.churrasqueira, morador=self.morador, data=self.hoje, horario_inicio=datetime.time(10), horario_fim=datetime.time(22), status='PENDENTE')
+
+    def test_listagem_sindico_paginada_e_filtrada(self):
+
+        sindico = User.objects.create_user(username='sindico_reservas', password='123', tipo_usuario='sindico')
+
+        sindico.condominios.add(self.condominio)
+
+        self.client.login(username='sindico_reservas', password='123')
+
+        primeira = self.client.get(reverse('sindico_reservas'))
+
+        self.assertEqual(len(primeira.context['reservas']), 30)
+
+        segunda = self.client.get(reverse('sindico_reservas'), {'apos': primeira.context['pagina']['proximo']})
+
+        self.assertEqual(len(segunda.context['reservas']), 6)
+
+        filtrada = self.client.get(reverse('sindico_reservas'), {'area': self.churrasqueira.id, 'status': 'PENDENTE'})
+
+        self.assertEqual([r.area_id for r in filtrada.context['reservas']], [self.churrasqueira.id])
+
+        self.assertEqual(listar_reservas(self.condominio, de=datetime.date(2026, 11, 1), ate=datetime.date(2026, 11, 4)).count(), 5)
+
+    def test_projecao_da_portaria_em_uma_consulta(self):
+
+        with self.assertNumQueries(1):
+
+            reservas = list(reservas_na_portaria(self.condominio, self.hoje))
+
+        self.assertEqual([r.data for r in reservas], [datetime.date(2026, 11, 2), datetime.date(2026, 11, 3), datetime.date(2026, 11, 4)])
+
+        self.assertIn('observacoes', reservas[0].get_deferred_fields())
+
+        self.assertEqual([r.data for r in reservas_na_portaria(self.condominio, self.hoje, busca='03/11/2026')], [datetime.date(2026, 11, 3)])
+
+from django.template import Context, Template
+
+from PIL import Image
+
+from .models import Aviso
+
+from .imagens import caminho_derivado
+
+class DerivadosImagemTests(TestCase):
+
+    def setUp(self):
+
+        self.condominio = Condominio.objects.create(nome='Cond Imagens')
+
+        cache.clear()
+
+    def _jpeg_com_exif(self):
+
+        imagem = Image.new('RGB', (2000, 1000), 'blue')
+
+        exif = Image.Exif()
+
+        exif[0x010F] = 'Fabricante'
+
+        exif[0x0112] = 6
+
+        buffer = io.BytesIO()
+
+        imagem.save(buffer, 'JPEG', exif=exif)
+
+        return SimpleUploadedFile('foto.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    @override_settings(IMAGENS_SEGUNDO_PLANO=False, MEDIA_ROOT=tempfile.mkdtemp())
+
+    def test_upload_gera_derivados_sem_exif(self):
+
+        aviso = Aviso.objects.create(condominio=self.condominio, titulo='Obra', conteudo='Aviso', imagem=self._jpeg_com_exif())
+
+        with Image.open(aviso.imagem.path) as original:
+
+            self.assertFalse(original.getexif())
+
+            self.assertEqual(original.size, (1000, 2000))
+
+        for largura in (320, 640, 1280):
+
+            for extensao in ('webp', 'jpg'):
+
+                with Image.open(aviso.imagem.storage.path(caminho_derivado(aviso.imagem.name, largura, extensao))) as derivado:
+
+                    self.assertEqual(derivado.width, min(largura, 1000))
+
+                    self.assertFalse(derivado.getexif())
+
+    @override_settings(IMAGENS_SEGUNDO_PLANO=False, MEDIA_ROOT=tempfile.mkdtemp())
+
+    def test_tag_usa_srcset_e_cai_para_original(self):
+
+        aviso = Aviso.objects.create(condominio=self.condominio, titulo='Obra', conteudo='Aviso', imagem=self._jpeg_com_exif())
+
+        template = Template('{% load imagens %}{% imagem_responsiva aviso.imagem sizes="80px" alt=aviso.titulo data_bs_toggle="modal" %}')
+
+        html = template.render(Context({'aviso': aviso}))
+
+        self.assertIn('type="image/webp"', html)
+
+        self.assertIn('_1280.jpg 1280w', html)
+
+        self.assertIn('data-bs-toggle="modal"', html)
+
+        self.assertIn('loading="lazy"', html)
+
+        sem_derivados = Aviso(condominio=self.condominio, titulo='Antigo', imagem='avisos/antigo.png')
+
+        html = template.render(Context({'aviso': sem_derivados}))
+
+        self.assertNotIn('<picture', html)
+
+        self.assertIn('avisos/antigo.png', html)
+
+from django.contrib.messages import get_messages
+
+from .models import DocumentoCondominio
+
+from .uploads import identificar_formato
+
+@override_settings(IMAGENS_SEGUNDO_PLANO=False, MEDIA_ROOT=tempfile.mkdtemp())
+
+class UploadValidadoTests(TestCase):
+
+    def setUp(self):
+
+        condominio = Condominio.objects.create(nome='Residencial Uploads')
+
+        usuario = User.objects.create_user(username='morador_upload', password='123', tipo_usuario='morador')
+
+        Morador.objects.create(condominio=condominio, nome='Morador Upload', apartamento='10', usuario=usuario)
+
+        self.client.login(username='morador_upload', password='123')
+
+    def _enviar(self, nome, conteudo):
+
+        resposta = self.client.post(reverse('morador_nova_solicitacao'), {
+
+            'tipo': 'MANUTENCAO',
+
+            'descricao': 'Vazamento',
+
+            'arquivo': SimpleUploadedFile(nome, conteudo, content_type='image/jpeg'),
+
+        })
+
+        return [str(m) for m in get_messages(resposta.wsgi_request)]
+
+    def test_recusa_video_renomeado_e_arquivo_grande(self):
+
+        mensagens = self._enviar('video.jpg', b'\x00\x00\x00\x18ftypmp42' + b'\x00' * 4096)
+
+        self.assertIn('O envio de vídeos não é permitido.', mensagens)
+
+        mensagens = self._enviar('grande.png', b'\x89PNG\r\n\x1a\n' + b'\x00' * (6 * 1024 * 1024))
+
+        self.assertIn('O arquivo deve ter no máximo 5MB.', mensagens)
+
+        mensagens = self._enviar('pagina.jpg', b'<html><script>alert(1)</script></html>')
+
+        self.assertTrue(any(m.startswith('Formato de arquivo não permitido') for m in mensagens))
+
+        self.assertFalse(Solicitacao.objects.exists())
+
+    def test_aceita_imagem_valida(self):
+
+        buffer = io.BytesIO()
+
+        Image.new('RGB', (10, 10), 'red').save(buffer, 'PNG')
+
+        self._enviar('foto.png', buffer.getvalue())
+
+        solicitacao = Solicitacao.objects.get()
+
+        self.assertTrue(solicitacao.arquivo.name.endswith('.png'))
+
+        self.assertEqual(identificar_formato(b'%PDF-1.7'), 'pdf')
+
+        self.assertEqual(identificar_formato(b'\x00\x00\x00\x18ftypheic'), 'heic')
+
+    def test_admin_usa_o_limite_do_campo_do_modelo(self):
+
+        condominio = Condominio.objects.get(nome='Residencial Uploads')
+
+        admin_user = User.objects.create_superuser(username='admin_upload', password='123', email='admin@uploads.com')
+
+        self.client.force_login(admin_user)
+
+        def enviar(nome, conteudo):
+
+            return self.client.post(reverse('admin:portaria_documentocondominio_add'), {
+
+                'condominio': condominio.id, 'titulo': nome, 'categoria': 'ATA',
+
+                'arquivo': SimpleUploadedFile(nome, conteudo, content_type='application/pdf'),
+
+            })
+
+        # Mesmo limite da tela do síndico (20MB), e não o padrão de 5MB.
+
+        self.assertEqual(enviar('ata.pdf', b'%PDF-1.7\n' + b'0' * (8 * 1024 * 1024)).status_code, 302)
+
+        self.assertTrue(DocumentoCondominio.objects.filter(titulo='ata.pdf').exists())
+
+        resposta = enviar('video.pdf', b'\x00\x00\x00\x18ftypmp42' + b'\x00' * 4096)
+
+        self.assertEqual(resposta.status_code, 200)
+
+        self.assertIn('O envio de vídeos não é permitido.', resposta.context['adminform'].form.errors['arquivo'])
+
+import json
+
+import math
+
+import re
+
+import uuid
+
+from django.db import connection
+
+from django.test.utils import CaptureQueriesContext
+
+from .models import Encomenda, OrdemServico, Sindico
+
+class SincronizacaoOfflineTests(TestCase):
+
+    def setUp(self):
+
+        self.condominio = Condominio.objects.create(nome='Residencial Offline')
+
+        self.morador = Morador.objects.create(condominio=self.condominio, nome='Destinatário', bloco='A', apartamento='12')
+
+        sindico = User.objects.create_user(username='sindico_offline', password='123', tipo_usuario='sindico')
+
+        Sindico.objects.create(usuario=sindico, nome='Síndico', condominio=self.condominio)
+
+        User.objects.create_user(username='porteiro_offline', password='123', tipo_usuario='porteiro').condominios.add(self.condominio)
+
+        self.client.login(username='porteiro_offline', password='123')
+
+    def _sincronizar(self, dados):
+
+        return self.client.post(reverse('api_sync_offline'), data=json.dumps(dados), content_type='application/json').json()
+
+    def test_reenvio_do_lote_nao_duplica(self):
+
+        dados = {
+
+            'versao': 2,
+
+            'visitantes': [{'uuid': str(uuid.uuid4()), 'nome_completo': 'Visita', 'morador_id': self.morador.id}],
+
+            'encomendas': [
+
+                {'uuid': str(uuid.uuid4()), 'morador_id': self.morador.id, 'volume': 'Caixa'},
+
+                {'uuid': str(uuid.uuid4()), 'morador_id': 999999, 'volume': 'Sem dono'},
+
+            ],
+
+            'solicitacoes': [{'uuid': str(uuid.uuid4()), 'tipo': 'MANUTENCAO', 'descricao': 'Lâmpada queimada', 'morador_id': self.morador.id}],
+
+        }
+
+        primeira = self._sincronizar(dados)
+
+        self.assertEqual((primeira['visitantes_criados'], primeira['encomendas_criadas'], primeira['solicitacoes_criadas']), (1, 1, 1))
+
+        self.assertEqual(sorted(c['status'] for c in primeira['confirmados']), ['criado', 'criado', 'criado', 'erro'])
+
+        self.assertEqual(OrdemServico.objects.filter(solicitacao_origem__condominio=self.condominio).count(), 1)
+
+        self.assertEqual(Notificacao.objects.filter(usuario__username='sindico_offline', tipo='solicitacao').count(), 1)
+
+        segunda = self._sincronizar(dados)
+
+        self.assertEqual(segunda['encomendas_criadas'], 0)
+
+        self.assertEqual(sorted(c['status'] for c in segunda['confirmados']), ['duplicado', 'duplicado', 'duplicado', 'erro'])
+
+        self.assertEqual(Encomenda.objects.count(), 1)
+
+        self.assertEqual(Solicitacao.objects.count(), 1)
+
+    def test_consultas_nao_crescem_com_o_lote(self):
+
+        def lote(n):
+
+            return {'encomendas': [{'uuid': str(uuid.uuid4()), 'morador_id': self.morador.id, 'volume': f'Pacote {i}'} for i in range(n)]}
+
+        with CaptureQueriesContext(connection) as pequeno:
+
+            self._sincronizar(lote(5))
+
+        with CaptureQueriesContext(connection) as grande:
+
+            resposta = self._sincronizar(lote(300))
+
+        self.assertEqual(resposta['encomendas_criadas'], 300)
+
+        # O bulk_create quebra o INSERT conforme o limite de parâmetros do banco (no SQLite, 300 linhas viram vários
+        # INSERTs): o resto das consultas tem de ser igual, e os INSERTs de encomenda, no máximo um por lote efetivo.
+
+        def separar(capturadas):
+
+            # "INSERT OR IGNORE INTO" no SQLite, "INSERT INTO ... ON CONFLICT DO NOTHING" no PostgreSQL.
+
+            eh_insert = [bool(re.match(r'INSERT\b[^"]*INTO "portaria_encomenda"', c['sql'])) for c in capturadas]
+
+            inserts = [c['sql'] for c, insert in zip(capturadas, eh_insert) if insert]
+
+            return inserts, [c['sql'] for c, insert in zip(capturadas, eh_insert) if not insert]
+
+        inserts_pequeno, resto_pequeno = separar(pequeno.captured_queries)
+
+        inserts_grande, resto_grande = separar(grande.captured_queries)
+
+        campos = [campo for campo in Encomenda._meta.concrete_fields if not campo.primary_key]
+
+        lote_efetivo = min(500, connection.ops.bulk_batch_size(campos, [None] * 300))
+
+        self.assertEqual(len(resto_grande), len(resto_pequeno))
+
+        self.assertEqual(len(inserts_pequeno), 1)
+
+        self.assertLessEqual(len(inserts_grande), math.ceil(300 / lote_efetivo))
+
+from django.utils import timezone
+
+class DiretorioOfflineTests(TestCase):
+
+    def setUp(self):
+
+        self.condominio = Condominio.objects.create(nome='Residencial Diretório')
+
+        self.mantido = Morador.objects.create(condominio=self.condominio, nome='Mantido', bloco='A', apartamento='1')
+
+        self.alterado = Morador.objects.create(condominio=self.condominio, nome='Alterado', bloco='A', apartamento='2')
+
+        self.removido = Morador.objects.create(condominio=self.condominio, nome='Removido', bloco='A', apartamento='3')
+
+        User.objects.create_user(username='porteiro_diretorio', password='123', tipo_usuario='porteiro').condominios.add(self.condominio)
+
+        self.client.login(username='porteiro_diretorio', password='123')
+
+    def test_etag_responde_304_ate_o_diretorio_mudar(self):
+
+        primeira = self.client.get(reverse('api_moradores_offline'))
+
+        self.assertTrue(primeira.json()['completo'])
+
+        self.assertEqual(len(primeira.json()['moradores']), 3)
+
+        repetida = self.client.get(reverse('api_moradores_offline'), HTTP_IF_NONE_MATCH=primeira['ETag'])
+
+        self.assertEqual(repetida.status_code, 304)
+
+        self.assertEqual(repetida.content, b'')
+
+        self.alterado.telefone = '11999990000'
+
+        self.alterado.save()
+
+        depois = self.client.get(reverse('api_moradores_offline'), HTTP_IF_NONE_MATCH=primeira['ETag'])
+
+        self.assertEqual(depois.status_code, 200)
+
+        self.assertNotEqual(depois['ETag'], primeira['ETag'])
+
+    def test_since_devolve_apenas_alterados_e_removidos(self):
+
+        ontem = timezone.now() - datetime.timedelta(days=1)
+
+        Morador.objects.filter(condominio=self.condominio).update(atualizado_em=ontem)
+
+        self.alterado.nome = 'Alterado de Novo'
+
+        self.alterado.save()
+
+        removido_id = self.removido.id
+
+        self.removido.delete()
+
+        desde = (timezone.now() - datetime.timedelta(hours=1)).isoformat()
+
+        dados = self.client.get(reverse('api_moradores_offline'), {'since': desde}).json()
+
+        self.assertFalse(dados['completo'])
+
+        self.assertEqual([m['id'] for m in dados['moradores']], [self.alterado.id])
+
+        self.assertEqual(dados['removidos'], [removido_id])
+
+        self.assertTrue(dados['versao'])
+
+from portaria.precache import carregar_manifesto, gravar_manifesto
+
+class PrecacheServiceWorkerTests(TestCase):
+
+    def setUp(self):
+
+        self.pasta = tempfile.mkdtemp()
+
+        os.makedirs(os.path.join(self.pasta, 'css'))
+
+        os.makedirs(os.path.join(self.pasta, 'admin'))
+
+        with open(os.path.join(self.pasta, 'css', 'global.css'), 'w') as f:
+
+            f.write('body { color: #000; }')
+
+        with open(os.path.join(self.pasta, 'admin', 'base.css'), 'w') as f:
+
+            f.write('/* admin */')
+
+        with open(os.path.join(self.pasta, 'sw.js'), 'w') as f:
+
+            f.write('// service worker')
+
+    def test_manifesto_versiona_pelo_conteudo(self):
+
+        with override_settings(STATICFILES_DIRS=[self.pasta]):
+
+            _, primeiro = gravar_manifesto()
+
+            urls = [a['url'] for a in primeiro['arquivos']]
+
+            self.assertIn('/static/css/global.css', urls)
+
+            self.assertFalse([url for url in urls if '/admin/' in url or url.endswith('sw.js')])
+
+            self.assertEqual(carregar_manifesto(), primeiro)
+
+            self.assertEqual(gravar_manifesto()[1]['versao'], primeiro['versao'])
+
+            with open(os.path.join(self.pasta, 'css', 'global.css'), 'w') as f:
+
+                f.write('body { color: #fff; }')
+
+            self.assertNotEqual(gravar_manifesto()[1]['versao'], primeiro['versao'])
+
+    def test_service_worker_servido_na_raiz_com_manifesto(self):
+
+        with override_settings(STATICFILES_DIRS=[self.pasta]):
+
+            _, manifesto = gravar_manifesto()
+
+            resposta = self.client.get(reverse('service_worker'))
+
+            self.assertEqual(resposta.status_code, 200)
+
+            self.assertEqual(resposta['Service-Worker-Allowed'], '/')
+
+            self.assertEqual(resposta['Cache-Control'], 'no-cache')
+
+            self.assertIn(manifesto['versao'], resposta.content.decode())
+
+            self.assertIn('// service worker', resposta.content.decode())
+
+            repetida = self.client.get(reverse('service_worker'), HTTP_IF_NONE_MATCH=resposta['ETag'])
+
+            self.assertEqual(repetida.status_code, 304)
+
+from portaria.estaticos import _versionados
+
+class EstaticosComprimidosTests(TestCase):
+
+    def setUp(self):
+
+        self.origem = tempfile.mkdtemp()
+
+        self.destino = tempfile.mkdtemp()
+
+        os.makedirs(os.path.join(self.origem, 'css'))
+
+        with open(os.path.join(self.origem, 'css', 'global.css'), 'w') as f:
+
+            f.write('.cartao { margin: 0 auto; padding: 1rem; }\n' * 100)
+
+        self.ajustes = override_settings(
+
+            STATICFILES_DIRS=[self.origem], STATIC_ROOT=self.destino, SERVIR_ESTATICOS=True,
+
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+
+        )
+
+        self.ajustes.enable()
+
+        self.addCleanup(self.ajustes.disable)
+
+        self.addCleanup(_versionados.cache_clear)
+
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+        _versionados.cache_clear()
+
+        with open(os.path.join(self.destino, 'staticfiles.json')) as f:
+
+            self.versionado = json.load(f)['paths']['css/global.css']
+
+    def test_collectstatic_gera_hash_e_variantes_comprimidas(self):
+
+        self.assertRegex(self.versionado, r'^css/global\.[0-9a-f]{12}\.css$')
+
+        caminho = os.path.join(self.destino, self.versionado)
+
+        self.assertTrue(os.path.exists(caminho + '.gz'))
+
+        self.assertLess(os.path.getsize(caminho + '.gz'), os.path.getsize(caminho))
+
+        self.assertEqual(Template("{% load static %}{% static 'css/global.css' %}").render(Context()), '/static/' + self.versionado)
+
+    def test_middleware_serve_comprimido_com_cache_imutavel(self):
+
+        resposta = self.client.get('/static/' + self.versionado, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(resposta.status_code, 200)
+
+        self.assertEqual(resposta['Content-Encoding'], 'gzip')
+
+        self.assertEqual(resposta['Content-Type'], 'text/css')
+
+        self.assertIn('immutable', resposta['Cache-Control'])
+
+        self.assertEqual(resposta['Vary'], 'Accept-Encoding')
+
+        sem_hash = self.client.get('/static/css/global.css')
+
+        self.assertNotIn('Content-Encoding', sem_hash)
+
+        self.assertNotIn('immutable', sem_hash['Cache-Control'])
+
+from portaria.midia import pode_acessar_midia
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), MIDIA_ENVIO='')
+
+class MidiaProtegidaTests(TestCase):
+
+    def setUp(self):
+
+        from django.conf import settings
+
+        self.condominio = Condominio.objects.create(nome='Residencial Mídia')
+
+        outro = Condominio.objects.create(nome='Outro Residencial')
+
+        self.dono = User.objects.create_user(username='dono_boleto', password='123', tipo_usuario='morador')
+
+        self.vizinho = User.objects.create_user(username='vizinho_boleto', password='123', tipo_usuario='morador')
+
+        self.sindico = User.objects.create_user(username='sindico_midia', password='123', tipo_usuario='sindico')
+
+        self.estranho = User.objects.create_user(username='sindico_outro', password='123', tipo_usuario='sindico')
+
+        morador = Morador.objects.create(condominio=self.condominio, nome='Dono', bloco='A', apartamento='1', usuario=self.dono)
+
+        Morador.objects.create(condominio=self.condominio, nome='Vizinho', bloco='A', apartamento='2', usuario=self.vizinho)
+
+        Sindico.objects.create(usuario=self.sindico, nome='Síndico', condominio=self.condominio)
+
+        Sindico.objects.create(usuario=self.estranho, nome='Outro', condominio=outro)
+
+        self.nome = 'cobrancas/boletos/boleto_teste.pdf'
+
+        self.conteudo = b'%PDF-1.4 ' + bytes(range(256)) * 8
+
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, 'cobrancas', 'boletos'), exist_ok=True)
+
+        with open(os.path.join(settings.MEDIA_ROOT, self.nome), 'wb') as f:
+
+            f.write(self.conteudo)
+
+        Cobranca.objects.create(condominio=self.condominio, morador=morador, valor=100, data_vencimento=datetime.date.today(), arquivo_boleto=self.nome)
+
+    def test_permissao_por_dono_e_condominio_em_uma_consulta(self):
+
+        with self.assertNumQueries(1):
+
+            self.assertTrue(pode_acessar_midia(self.dono, self.nome))
+
+        self.assertTrue(pode_acessar_midia(self.sindico, self.nome))
+
+        self.assertFalse(pode_acessar_midia(self.vizinho, self.nome))
+
+        self.assertFalse(pode_acessar_midia(self.estranho, self.nome))
+
+        self.client.login(username='vizinho_boleto', password='123')
+
+        self.assertEqual(self.client.get('/media/' + self.nome).status_code, 404)
+
+        self.client.login(username='dono_boleto', password='123')
+
+        resposta = self.client.get('/media/' + self.nome)
+
+        self.assertEqual(resposta.status_code, 200)
+
+        self.assertEqual(b''.join(resposta.streaming_content), self.conteudo)
+
+        self.assertTrue(resposta['Cache-Control'].startswith('private'))
+
+    def test_range_etag_e_x_accel(self):
+
+        self.client.login(username='sindico_midia', password='123')
+
+        parcial = self.client.get('/media/' + self.nome, HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(parcial.status_code, 206)
+
+        self.assertEqual(parcial['Content-Range'], f'bytes 10-19/{len(self.conteudo)}')
+
+        self.assertEqual(b''.join(parcial.streaming_content), self.conteudo[10:20])
+
+        self.assertEqual(self.client.get('/media/' + self.nome, HTTP_RANGE=f'bytes={len(self.conteudo)}-').status_code, 416)
+
+        self.assertEqual(self.client.get('/media/' + self.nome, HTTP_IF_NONE_MATCH=parcial['ETag']).status_code, 304)
+
+        with override_settings(MIDIA_ENVIO='x-accel'):
+
+            acelerada = self.client.get('/media/' + self.nome)
+
+        self.assertEqual(acelerada['X-Accel-Redirect'], '/midia-protegida/' + self.nome)
+
+        self.assertEqual(acelerada.content, b'')
+
+from django.core.files.storage import default_storage
+
+from portaria.models import ConteudoArquivo, DocumentoCondominio, ReferenciaArquivo
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+
+class ArmazenamentoDeduplicadoTests(TestCase):
+
+    def test_mesmo_conteudo_gravado_uma_vez_e_contado(self):
+
+        condominio = Condominio.objects.create(nome='Residencial Blob')
+
+        conteudo = b'%PDF-1.4 regimento interno ' * 200
+
+        docs = [
+
+            DocumentoCondominio.objects.create(condominio=condominio, titulo=f'Regimento {i}', arquivo=SimpleUploadedFile('regimento.pdf', conteudo))
+
+            for i in range(3)
+
+        ]
+
+        self.assertEqual(len({d.arquivo.name for d in docs}), 3)
+
+        self.assertTrue(os.path.samefile(docs[0].arquivo.path, docs[2].arquivo.path))
+
+        blob = ConteudoArquivo.objects.get()
+
+        self.assertEqual(blob.referencias, 3)
+
+        self.assertEqual(blob.tamanho, len(conteudo))
+
+        docs[0].arquivo.delete(save=False)
+
+        self.assertEqual(ConteudoArquivo.objects.get().referencias, 2)
+
+        self.assertFalse(ReferenciaArquivo.objects.filter(nome=docs[0].arquivo.name).exists())
+
+        with docs[1].arquivo.open('rb') as f:
+
+            self.assertEqual(f.read(), conteudo)
+
+        caminho_blob = default_storage.path(f'blobs/{blob.sha256[:2]}/{blob.sha256[2:4]}/{blob.sha256}')
+
+        with self.captureOnCommitCallbacks(execute=True):
+
+            docs[1].arquivo.delete(save=False)
+
+            docs[2].arquivo.delete(save=False)
+
+        self.assertFalse(ConteudoArquivo.objects.exists())
+
+        self.assertFalse(os.path.exists(caminho_blob))
+
+    def test_comando_adota_arquivos_antigos(self):
+
+        raiz = default_storage.path('')
+
+        for pasta in ('avisos', 'documentos'):
+
+            os.makedirs(os.path.join(raiz, pasta), exist_ok=True)
+
+            with open(os.path.join(raiz, pasta, 'circular.pdf'), 'wb') as f:
+
+                f.write(b'%PDF-1.4 circular ' * 100)
+
+        call_command('deduplicar_midia', stdout=io.StringIO())
+
+        self.assertTrue(os.path.samefile(os.path.join(raiz, 'avisos', 'circular.pdf'), os.path.join(raiz, 'documentos', 'circular.pdf')))
+
+        self.assertEqual(ConteudoArquivo.objects.get().referencias, 2)
+
+        call_command('deduplicar_midia', stdout=io.StringIO())
+
+        self.assertEqual(ReferenciaArquivo.objects.count(), 2)
+
+from django.core.files.base import ContentFile
+
+from portaria.limpeza import limpar_midia, percorrer
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+
+class LimparMidiaTests(TestCase):
+
+    def setUp(self):
+
+        self.condominio = Condominio.objects.create(nome='Residencial Faxina')
+
+        self.aviso = Aviso.objects.create(condominio=self.condominio, titulo='Obra', conteudo='Aviso', imagem=SimpleUploadedFile('vivo.jpg', b'imagem viva'))
+
+        self.orfao = default_storage.save('avisos/orfao.jpg', ContentFile(b'imagem apagada'))
+
+        self.derivado_vivo = default_storage.save(f'derivados/{self.aviso.imagem.name[:-4]}_320.jpg', ContentFile(b'mini viva'))
+
+        self.derivado_orfao = default_storage.save('derivados/avisos/orfao_320.jpg', ContentFile(b'mini apagada'))
+
+    def tearDown(self):
+
+        for nome in (self.aviso.imagem.name, self.orfao, self.derivado_vivo, self.derivado_orfao):
+
+            if default_storage.exists(nome):
+
+                default_storage.delete(nome)
+
+    def test_apaga_orfaos_antigos_e_mantem_referenciados(self):
+
+        encontrados = []
+
+        recentes = limpar_midia(default_storage, apagar=True, relatar=lambda nome, motivo, tamanho: encontrados.append(nome))
+
+        self.assertEqual(recentes['orfaos'], 0)
+
+        self.assertTrue(default_storage.exists(self.orfao))
+
+        with self.captureOnCommitCallbacks(execute=True):
+
+            resultado = limpar_midia(default_storage, apagar=True, carencia=0, relatar=lambda nome, motivo, tamanho: encontrados.append((nome, motivo)))
+
+        self.assertEqual(sorted(encontrados), [(self.orfao, 'arquivo'), (self.derivado_orfao, 'derivado')])
+
+        self.assertFalse(default_storage.exists(self.orfao))
+
+        self.assertTrue(default_storage.exists(self.aviso.imagem.name))
+
+        self.assertTrue(default_storage.exists(self.derivado_vivo))
+
+        self.assertFalse(ReferenciaArquivo.objects.filter(nome=self.orfao).exists())
+
+        self.assertEqual(ConteudoArquivo.objects.count(), 2)
+
+        self.assertEqual(resultado['orfaos'], 2)
+
+    def test_checkpoint_retoma_de_onde_parou(self):
+
+        checkpoint = os.path.join(tempfile.mkdtemp(), 'limpar.json')
+
+        todos = [nome for nome, _ in percorrer(default_storage.path(''))]
+
+        parcial = limpar_midia(default_storage, carencia=0, checkpoint=checkpoint, maximo=2)
+
+        self.assertFalse(parcial['concluido'])
+
+        self.assertTrue(os.path.exists(checkpoint))
+
+        self.assertEqual(parcial['ultimo'], todos[1])
+
+        final = limpar_midia(default_storage, carencia=0, checkpoint=checkpoint)
+
+        self.assertTrue(final['concluido'])
+
+        self.assertEqual(final['verificados'], len(todos))
+
+        self.assertEqual(final['orfaos'], 2)
+
+        self.assertFalse(os.path.exists(checkpoint))
+
+        self.assertTrue(default_storage.exists(self.orfao))
+
+from django.http import HttpResponse
+
+from django.test import RequestFactory
+
+from portaria.context_processors import condominio_info
+
+from portaria.contexto import ContextoCondominioMiddleware
+
+from portaria import views as views_portaria, views_sindico
+
+class ContextoCondominioTests(TestCase):
+
+    def setUp(self):
+
+        self.primeiro = Condominio.objects.create(nome='Residencial Primeiro')
+
+        self.segundo = Condominio.objects.create(nome='Residencial Segundo')
+
+        self.usuario = User.objects.create_user(username='sindica_multi', password='x', tipo_usuario='sindico')
+
+        self.usuario.condominios.add(self.primeiro, self.segundo)
+
+        Sindico.objects.create(usuario=self.usuario, nome='Síndica', condominio=self.primeiro)
+
+    def test_resolve_condominio_uma_vez_por_requisicao(self):
+
+        self.client.force_login(self.usuario)
+
+        sessao = self.client.session
+
+        sessao['condominio_ativo_id'] = self.segundo.id
+
+        sessao.save()
+
+        request = RequestFactory().get('/')
+
+        request.session = self.client.session
+
+        def view(request):
+
+            self.assertEqual(request.contexto_condominio.condominio, self.segundo)
+
+            with self.assertNumQueries(1):
+
+                self.assertFalse(views_portaria.is_porteiro(request.user))
+
+                self.assertFalse(views_portaria.is_porteiro(request.user))
+
+            with self.assertNumQueries(0):
+
+                self.assertEqual(request.user.condominio, self.segundo)
+
+                self.assertEqual(str(request.user), 'sindica_multi - Residencial Segundo')
+
+                self.assertEqual(views_sindico.get_condominio_ativo(request), self.segundo)
+
+                self.assertEqual(views_portaria.get_condominio_porteiro(request.user), self.segundo)
+
+                self.assertEqual(condominio_info(request)['condominio_atual'], self.segundo)
+
+            return HttpResponse()
+
+        ContextoCondominioMiddleware(view)(request)
+
+        self.assertEqual(User.objects.get(pk=self.usuario.pk).get_condominio_ativo, self.primeiro)
+
+    def test_troca_de_condominio_vale_na_requisicao_seguinte(self):
+
+        self.client.force_login(self.usuario)
+
+        self.assertEqual(self.client.get(reverse('sindico_painel')).context['condominio_atual'], self.primeiro)
+
+        self.client.get(reverse('trocar_condominio', args=[self.segundo.id]))
+
+        resposta = self.client.get(reverse('sindico_painel'))
+
+        self.assertEqual(resposta.context['condominio_atual'], self.segundo)
+
+        self.assertEqual(resposta.context['condominio'], self.segundo)
+
+import json
+
+import time
+
+from django.db import connection
+
+from django.test.utils import CaptureQueriesContext
+
+from portaria.carga import popular_condominio
+
+ORCAMENTO_VIEWS = os.path.join(os.path.dirname(__file__), 'orcamento_views.json')
+
+# (nome no orçamento, quem acessa, rota)
+VIEWS_ORCADAS = (
+
+    ('portaria_home', 'porteiro', 'home'),
+
+    ('portaria_mensagens', 'porteiro', 'mensagens_portaria'),
+
+    ('sindico_painel', 'sindico', 'sindico_painel'),
+
+    ('sindico_financeiro', 'sindico', 'sindico_financeiro'),
+
+    ('sindico_mensagens', 'sindico', 'sindico_mensagens'),
+
+    ('morador_home', 'morador', 'morador_home'),
+
+    ('morador_cobrancas', 'morador', 'morador_cobrancas'),
+
+    ('morador_mensagens', 'morador', 'morador_mensagens'),
+
+    ('zelador_home', 'zelador', 'zelador_home'),
+
+    ('admin_usuarios', 'admin', 'admin:portaria_customuser_changelist'),
+
+)
+
+class OrcamentoConsultasTests(TestCase):
+
+    # Orçamento de consultas e tempo por view com condomínios de tamanho real. Para aceitar uma mudança intencional:
+    # ATUALIZAR_ORCAMENTO=1 python manage.py test portaria.tests.OrcamentoConsultasTests e commitar o orcamento_views.json.
+    # O tempo só é conferido com MEDIR_TEMPO=1 (máquina dedicada): relógio de parede na suíte comum gera falha intermitente.
+
+    @classmethod
+
+    def setUpTestData(cls):
+
+        cls.grande = popular_condominio('Residencial Grande', unidades=300, visitantes_por_dia=35, dias=90, meses=6)
+
+        cls.pequeno = popular_condominio('Residencial Pequeno', unidades=12, visitantes_por_dia=2, dias=20, meses=1)
+
+        cls.grande['admin'] = cls.pequeno['admin'] = User.objects.create_superuser(username='admin_orcamento', password='x', email='admin@exemplo.com')
+
+    def _usuario(self, condominio, papel):
+
+        return condominio['moradores'][0] if papel == 'morador' else condominio[papel]
+
+    def _medir(self, usuario, rota):
+
+        self.client.force_login(usuario)
+
+        url = reverse(rota)
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        with CaptureQueriesContext(connection) as consultas:
+
+            inicio = time.perf_counter()
+
+            resposta = self.client.get(url)
+
+            duracao = time.perf_counter() - inicio
+
+        self.assertEqual(resposta.status_code, 200)
+
+        return len(consultas), duracao
+
+    def test_views_dentro_do_orcamento(self):
+
+        with open(ORCAMENTO_VIEWS, encoding='utf-8') as arquivo:
+
+            orcamento = json.load(arquivo)
+
+        medidas = {nome: self._medir(self._usuario(self.grande, papel), rota) for nome, papel, rota in VIEWS_ORCADAS}
+
+        if os.getenv('ATUALIZAR_ORCAMENTO'):
+
+            # Tempo com folga de 3x (e mínimo de 0,5 s): a máquina de CI varia; consultas não.
+
+            orcamento = {nome: {'consultas': consultas, 'segundos': max(0.5, round(duracao * 3, 1))} for nome, (consultas, duracao) in medidas.items()}
+
+            with open(ORCAMENTO_VIEWS, 'w', encoding='utf-8') as arquivo:
+
+                json.dump(orcamento, arquivo, indent=2)
+
+                arquivo.write('\n')
+
+        for nome, (consultas, duracao) in medidas.items():
+
+            with self.subTest(view=nome):
+
+                self.assertIn(nome, orcamento, 'View sem orçamento: rode com ATUALIZAR_ORCAMENTO=1.')
+
+                self.assertLessEqual(consultas, orcamento[nome]['consultas'])
+
+                if os.getenv('MEDIR_TEMPO'):
+
+                    self.assertLessEqual(duracao, orcamento[nome]['segundos'])
+
+    def test_consultas_nao_crescem_com_o_condominio(self):
+
+        for nome, papel, rota in VIEWS_ORCADAS:
+
+            if papel == 'admin':
+
+                continue
+
+            with self.subTest(view=nome):
+
+                grande, _ = self._medir(self._usuario(self.grande, papel), rota)
+
+                pequeno, _ = self._medir(self._usuario(self.pequeno, papel), rota)
+
+                self.assertEqual(grande, pequeno)
+
+from django.db.models import Count
+
+from portaria.carga import PREFIXO_CARGA, ROTEIROS, resumir_latencias
+
+from portaria.models import DisponibilidadeArea, Reserva
+
+class GeradorCargaTests(TestCase):
+
+    def test_gera_condominios_com_historico_distribuido(self):
+
+        saida = io.StringIO()
+
+        call_command('gerar_carga', condominios=2, unidades=40, visitantes_por_dia=10, dias=30, meses=3, stdout=saida)
+
+        self.assertIn('linhas/min', saida.getvalue())
+
+        condominios = Condominio.objects.filter(nome__startswith=PREFIXO_CARGA)
+
+        self.assertEqual(condominios.count(), 2)
+
+        for condominio in condominios:
+
+            moradores = Morador.objects.filter(condominio=condominio)
+
+            self.assertGreater(moradores.values('bloco', 'apartamento').distinct().count(), 0)
+
+            self.assertEqual(moradores.values('bloco', 'apartamento').distinct().count(), moradores.count())
+
+            self.assertEqual(Cobranca.objects.filter(condominio=condominio).count(), moradores.count() * 3)
+
+            resumos = ResumoFinanceiroMensal.objects.filter(condominio=condominio)
+
+            self.assertEqual(sum(r.qtd_pendente + r.qtd_em_analise + r.qtd_pago + r.qtd_atrasado + r.qtd_cancelado for r in resumos), moradores.count() * 3)
+
+            chegadas = Visitante.objects.filter(condominio=condominio).dates('horario_chegada', 'day')
+
+            self.assertGreater(len(chegadas), 20)
+
+        dia_inteiro = Reserva.objects.filter(area__duracao_horario=0).values('area', 'data').annotate(n=Count('id')).filter(n__gt=1)
+
+        self.assertFalse(dia_inteiro.exists())
+
+        self.assertTrue(DisponibilidadeArea.objects.exists())
+
+    def test_roteiro_do_teste_de_carga_responde_e_resume_percentis(self):
+
+        gerado = popular_condominio(f'{PREFIXO_CARGA} Roteiro', unidades=30, visitantes_por_dia=5, dias=15, meses=2)
+
+        for papel, rotas in ROTEIROS.items():
+
+            self.client.force_login(gerado['moradores'][0] if papel == 'morador' else gerado[papel])
+
+            for endpoint, rota, params, _ in rotas:
+
+                with self.subTest(endpoint=endpoint):
+
+                    self.assertEqual(self.client.get(reverse(rota), params).status_code, 200)
+
+        resumo = resumir_latencias({'home': [i / 100 for i in range(100, 0, -1)]}, {'home': 2, 'api': 1})
+
+        self.assertEqual([linha['endpoint'] for linha in resumo], ['api', 'home'])
+
+        self.assertEqual((resumo[1]['p50'], resumo[1]['p95'], resumo[1]['p99'], resumo[1]['max']), (0.5, 0.95, 0.99, 1.0))
+
+        self.assertEqual((resumo[0]['requisicoes'], resumo[0]['erros'], resumo[0]['p99']), (0, 1, 0.0))
@@ -0,0 +1,192 @@
+import os
+
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+
+MB = 1024 * 1024
+TAMANHO_CABECALHO = 2048
+MARCAS_HEIC = (b'heic', b'heix', b'hevc', b'hevx', b'mif1', b'msf1')
+
+# Formato identificado pelos magic bytes -> (extensões aceitas, content-type gravado no arquivo)
+FORMATOS = {
+    'jpeg': (('.jpg', '.jpeg', '.jfif'), 'image/jpeg'),
+    'png': (('.png',), 'image/png'),
+    'gif': (('.gif',), 'image/gif'),
+    'webp': (('.webp',), 'image/webp'),
+    'heic': (('.heic', '.heif'), 'image/heic'),
+    'pdf': (('.pdf',), 'application/pdf'),
+    'office_zip': (('.docx', '.xlsx', '.pptx', '.odt', '.ods'), None),
+    'office_ole': (('.doc', '.xls', '.ppt'), None),
+    'texto': (('.csv', '.txt', '.ofx', '.ret', '.rem', '.cnab'), 'text/plain'),
+}
+
+IMAGEM = ('jpeg', 'png', 'gif', 'webp', 'heic')
+DOCUMENTO = IMAGEM + ('pdf', 'office_zip', 'office_ole')
+PLANILHA = ('office_zip', 'office_ole', 'texto')
+EXTRATO = ('texto',)
+
+# Limites por campo de modelo (model_name, campo): tamanho máximo e formatos aceitos. Valem nas telas do app que
+# gravam o campo e nos formulários e inlines do admin, para o mesmo arquivo não ter limites diferentes em cada tela.
+LIMITES_MODELO = {
+    ('condominio', 'logo'): (5 * MB, IMAGEM),
+    ('cobranca', 'arquivo_boleto'): (5 * MB, DOCUMENTO),
+    ('cobranca', 'comprovante'): (5 * MB, DOCUMENTO),
+    ('solicitacao', 'arquivo'): (5 * MB, DOCUMENTO),
+    ('aviso', 'imagem'): (5 * MB, IMAGEM),
+    ('aviso', 'arquivo'): (10 * MB, DOCUMENTO),
+    ('areacomum', 'imagem'): (5 * MB, IMAGEM),
+    ('ocorrencia', 'foto'): (5 * MB, DOCUMENTO),
+    ('documentocondominio', 'arquivo'): (20 * MB, DOCUMENTO),
+    ('feedbackmorador', 'foto'): (5 * MB, IMAGEM),
+    ('importacaomoradores', 'arquivo'): (10 * MB, PLANILHA),
+    ('ordemservico', 'foto_conclusao'): (5 * MB, IMAGEM),
+}
+
+# Limites por (rota, campo) nas telas do app. Campos de modelo reaproveitam LIMITES_MODELO; a rota só restringe mais
+# (o zelador envia apenas fotos) ou cobre campos que não são de modelo. Campos fora da tabela usam LIMITE_PADRAO.
+LIMITES_UPLOAD = {
+    ('morador_cobrancas', 'comprovante'): LIMITES_MODELO['cobranca', 'comprovante'],
+    ('morador_nova_solicitacao', 'arquivo'): LIMITES_MODELO['solicitacao', 'arquivo'],
+    ('morador_ocorrencias', 'foto'): LIMITES_MODELO['ocorrencia', 'foto'],
+    ('morador_feedback', 'foto'): LIMITES_MODELO['feedbackmorador', 'foto'],
+    ('sindico_moradores', 'arquivo'): LIMITES_MODELO['importacaomoradores', 'arquivo'],
+    ('sindico_criar_aviso', 'imagem'): LIMITES_MODELO['aviso', 'imagem'],
+    ('sindico_criar_aviso', 'arquivo'): LIMITES_MODELO['aviso', 'arquivo'],
+    ('sindico_editar_aviso', 'imagem'): LIMITES_MODELO['aviso', 'imagem'],
+    ('sindico_editar_aviso', 'arquivo'): LIMITES_MODELO['aviso', 'arquivo'],
+    ('sindico_areas_comuns', 'imagem'): LIMITES_MODELO['areacomum', 'imagem'],
+    ('sindico_reservas', 'imagem'): LIMITES_MODELO['areacomum', 'imagem'],
+    ('sindico_financeiro', 'arquivo_boleto'): LIMITES_MODELO['cobranca', 'arquivo_boleto'],
+    ('sindico_financeiro', 'boletos'): (5 * MB, IMAGEM + ('pdf',)),
+    ('sindico_conciliacao', 'arquivo'): (10 * MB, EXTRATO),
+    ('sindico_documentos', 'arquivo'): LIMITES_MODELO['documentocondominio', 'arquivo'],
+    ('zelador_os', 'foto'): (5 * MB, IMAGEM),
+    ('zelador_mudar_status_os', 'foto_conclusao'): LIMITES_MODELO['ordemservico', 'foto_conclusao'],
+    ('zelador_ocorrencias', 'foto'): (5 * MB, IMAGEM),
+}
+LIMITE_PADRAO = (5 * MB, DOCUMENTO)
+# Campos do admin fora de LIMITES_MODELO: só a equipe chega lá, então o padrão é permissivo (os magic bytes valem igual).
+LIMITE_ADMIN = (20 * MB, DOCUMENTO + EXTRATO)
+
+
+def _limite_no_admin(rota, campo):
+    # As views do admin carregam o ModelAdmin; campos de inline chegam como "<prefixo>-<n>-<campo>".
+    model_admin = getattr(rota.func, 'model_admin', None)
+    if model_admin is None:
+        return LIMITE_ADMIN
+    nome = campo.rsplit('-', 1)[-1]
+    modelos = [model_admin.model] if nome == campo else [inline.model for inline in model_admin.inlines]
+    for modelo in modelos:
+        limite = LIMITES_MODELO.get((modelo._meta.model_name, nome))
+        if limite:
+            return limite
+    return LIMITE_ADMIN
+
+
+def limite_do_campo(request, campo):
+    rota = getattr(request, 'resolver_match', None)
+    if rota is not None and rota.app_name == 'admin':
+        return _limite_no_admin(rota, campo)
+    return LIMITES_UPLOAD.get((getattr(rota, 'url_name', None), campo), LIMITE_PADRAO)
+
+
+def identificar_formato(cabecalho):
+    if cabecalho.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if cabecalho.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if cabecalho[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if cabecalho[:4] == b'RIFF':
+        return {b'WEBP': 'webp', b'AVI ': 'video'}.get(cabecalho[8:12])
+    if cabecalho[4:8] == b'ftyp':
+        # Contêiner ISO (MP4/MOV/HEIC): só as marcas HEIF são imagem.
+        return 'heic' if cabecalho[8:12] in MARCAS_HEIC else 'video'
+    if cabecalho[4:8] in (b'moov', b'mdat', b'wide', b'free') or cabecalho[:4] in (b'\x1aE\xdf\xa3', b'\x00\x00\x01\xba', b'\x00\x00\x01\xb3'):
+        return 'video'
+    if cabecalho.startswith(b'%PDF-'):
+        return 'pdf'
+    if cabecalho.startswith(b'PK\x03\x04'):
+        return 'office_zip'
+    if cabecalho.startswith(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'):
+        return 'office_ole'
+    if cabecalho and b'\x00' not in cabecalho:
+        return 'texto'
+    return None
+
+
+def _extensoes(formatos):
+    return ', '.join(sorted({ext.lstrip('.').upper() for formato in formatos for ext in FORMATOS[formato][0]}))
+
+
+def validar_cabecalho(cabecalho, nome, formatos):
+    formato = identificar_formato(cabecalho)
+    if formato == 'video':
+        return None, 'O envio de vídeos não é permitido.'
+    extensao = os.path.splitext(nome or '')[1].lower()
+    # O conteúdo precisa bater com a extensão: evita, p.ex., HTML renomeado para .jpg ou imagem renomeada para .html.
+    if formato not in formatos or extensao not in FORMATOS[formato][0]:
+        return None, f'Formato de arquivo não permitido. Envie apenas: {_extensoes(formatos)}.'
+    return formato, None
+
+
+class UploadValidadoHandler(TemporaryFileUploadHandler):
+    # Grava direto em arquivo temporário em blocos pequenos e descarta o upload assim que o tamanho
+    # ou os primeiros bytes violam o limite do campo: nada do arquivo fica em memória.
+    chunk_size = 16 * 1024
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        self.tamanho_maximo, self.formatos = limite_do_campo(self.request, field_name)
+        self.campo = field_name
+        self.recebido = 0
+        self.cabecalho = b''
+        self.formato = None
+        # O arquivo temporário é criado antes de recusar: o parser fecha self.file no SkipFile, e sem isso fecharia o do campo anterior.
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        if content_length and content_length > self.tamanho_maximo:
+            self._rejeitar(self._mensagem_tamanho())
+
+    def _mensagem_tamanho(self):
+        return f'O arquivo deve ter no máximo {self.tamanho_maximo // MB}MB.'
+
+    def _registrar_erro(self, mensagem):
+        if not hasattr(self.request, 'erros_upload'):
+            self.request.erros_upload = {}
+        self.request.erros_upload[self.campo] = mensagem
+
+    def _rejeitar(self, mensagem):
+        self._registrar_erro(mensagem)
+        raise SkipFile(mensagem)
+
+    def _verificar_cabecalho(self):
+        self.formato, erro = validar_cabecalho(self.cabecalho, self.file_name, self.formatos)
+        return erro
+
+    def receive_data_chunk(self, raw_data, start):
+        self.recebido += len(raw_data)
+        if self.recebido > self.tamanho_maximo:
+            self._rejeitar(self._mensagem_tamanho())
+        if self.formato is None and len(self.cabecalho) < TAMANHO_CABECALHO:
+            self.cabecalho += raw_data[:TAMANHO_CABECALHO - len(self.cabecalho)]
+            if len(self.cabecalho) >= TAMANHO_CABECALHO:
+                erro = self._verificar_cabecalho()
+                if erro:
+                    self._rejeitar(erro)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        # Arquivos menores que o cabeçalho só são conferidos aqui; SkipFile não vale mais, então o arquivo é descartado.
+        erro = None if self.formato else self._verificar_cabecalho()
+        if erro:
+            self.file.close()
+            self._registrar_erro(erro)
+            return None
+        arquivo = super().file_complete(file_size)
+        arquivo.content_type = FORMATOS[self.formato][1] or arquivo.content_type
+        return arquivo
+
+
+def erro_upload(request, *campos):
+    # Acessar request.FILES dispara o parser; os arquivos recusados ficam de fora e o motivo fica em erros_upload.
+    request.FILES
+    erros = getattr(request, 'erros_upload', {})
+    return next((erros[campo] for campo in campos if campo in erros), None)
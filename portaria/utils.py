@@ -207,3 +207,116 @@ def disparar_push_individual(usuario, titulo, mensagem, link):
     print("  Thread de push disparada em background.")
 
     print("==========================================\n")
+
+def enviar_push_em_massa(envios):
+
+    vapid_private_key = getattr(settings, 'VAPID_PRIVATE_KEY', None)
+
+    vapid_admin_email = getattr(settings, 'VAPID_ADMIN_EMAIL', None)
+
+    if not vapid_private_key or not vapid_admin_email or not envios:
+
+        return 0
+
+    payloads = {}
+
+    for usuario, titulo, mensagem, link in envios:
+
+        if usuario and getattr(usuario, 'receber_push', False):
+
+            payloads.setdefault(usuario.id, []).append(json.dumps({
+
+                'titulo': titulo,
+
+                'mensagem': mensagem,
+
+                'link': link
+
+            }))
+
+    # Uma consulta para todas as inscrições e uma única limpeza das expiradas no final.
+    inscricoes = PushSubscription.objects.filter(usuario_id__in=list(payloads))
+
+    ids_para_deletar = []
+
+    sucessos = 0
+
+    for inscricao in inscricoes:
+
+        for payload in payloads[inscricao.usuario_id]:
+
+            try:
+
+                webpush(
+
+                    subscription_info={
+
+                        "endpoint": inscricao.endpoint,
+
+                        "keys": {
+
+                            "p256dh": inscricao.p256dh,
+
+                            "auth": inscricao.auth
+
+                        }
+
+                    },
+
+                    data=payload,
+
+                    vapid_private_key=vapid_private_key,
+
+                    vapid_claims={"sub": vapid_admin_email},
+
+                    timeout=5
+
+                )
+
+                sucessos += 1
+
+            except WebPushException as ex:
+
+                if _is_subscription_gone(ex):
+
+                    ids_para_deletar.append(inscricao.id)
+
+                    break
+
+            except Exception as ex:
+
+                error_name = type(ex).__name__
+
+                if 'Timeout' in error_name or 'ConnectionError' in error_name:
+
+                    ids_para_deletar.append(inscricao.id)
+
+                    break
+
+    if ids_para_deletar:
+
+        PushSubscription.objects.filter(id__in=ids_para_deletar).delete()
+
+    print(f"  [📊] Push em massa: {sucessos} sucesso(s), {len(ids_para_deletar)} removida(s)")
+
+    return sucessos
+
+def disparar_push_em_massa(envios):
+
+    envios = list(envios)
+
+    if not envios:
+
+        return
+
+    t = threading.Thread(
+
+        target=enviar_push_em_massa,
+
+        args=(envios,),
+
+        daemon=True
+
+    )
+
+    t.start()
@@ -14,6 +14,10 @@ from django.utils.timezone import localdate
 
 import datetime
 
+import hashlib
+
+from django.conf import settings
+
 from django.db.models import Q, Count
 
 from django.core.paginator import Paginator
@@ -30,41 +34,23 @@ from .models import Visitante, Morador, Encomenda, Solicitacao, Notificacao, Sin
 
 from .utils import enviar_push_notification, disparar_push_individual
 
-try:
-
-    from django.template.loader import get_template
-
-    from xhtml2pdf import pisa
+from .pdf import gerar_pdf_response
 
-except ImportError:
-
-    pisa = None
+from .contexto import contexto_do_usuario
 
 def _gerar_pdf(request, template_name, context, filename):
 
-    response = HttpResponse(content_type='application/pdf')
-
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-    if not pisa:
-
-        return HttpResponse("Erro: Biblioteca xhtml2pdf não instalada. Rode: pip install xhtml2pdf")
+    return gerar_pdf_response(template_name, context, filename)
 
-    template = get_template(template_name)
-
-    html = template.render(context)
-
-    pisa_status = pisa.CreatePDF(html, dest=response)
-
-    if pisa_status.err:
+def is_porteiro(user):
 
-        return HttpResponse(f'Erro ao gerar PDF: {pisa_status.err}')
+    pass
 
-    return response
+    contexto = contexto_do_usuario(user)
 
-def is_porteiro(user):
+    if contexto is not None:
 
-    pass
+        return contexto.eh_porteiro
 
     if user.is_superuser:
 
@@ -530,41 +516,15 @@ def home(request):
 
     solicitacoes_pendentes_count = base_solicitacoes.filter(status='PENDENTE').count()
 
-    base_reservas = Reserva.objects.filter(area__condominio=cond) if cond else Reserva.objects.all()
+    from .reservas import reservas_na_portaria
 
-    reservas_hoje_count = base_reservas.filter(data=hoje, status='APROVADA').count()
+    lista_reservas_semana = reservas_na_portaria(cond, hoje, busca=query)
 
-    inicio_semana = hoje - datetime.timedelta(days=hoje.weekday())
-
-    fim_semana = inicio_semana + datetime.timedelta(days=6)
-
-    lista_reservas_semana = base_reservas.filter(status='APROVADA')
-
-    if query:
-        q_filter = Q(morador__nome__icontains=query) | Q(area__nome__icontains=query)
-        import datetime as dt_module
-        try:
-            parsed_date = dt_module.datetime.strptime(query.strip(), '%d/%m/%Y').date()
-            q_filter |= Q(data=parsed_date)
-        except ValueError:
-            pass
-        try:
-            parsed_date2 = dt_module.datetime.strptime(query.strip(), '%Y-%m-%d').date()
-            q_filter |= Q(data=parsed_date2)
-        except ValueError:
-            pass
-        lista_reservas_semana = lista_reservas_semana.filter(q_filter)
-    else:
-        lista_reservas_semana = lista_reservas_semana.filter(
-            data__gte=inicio_semana,
-            data__lte=fim_semana
-        )
-
-    lista_reservas_semana = lista_reservas_semana.select_related('area', 'morador').order_by('data', 'horario_inicio')
+    reservas_hoje_count = reservas_na_portaria(cond, hoje).filter(data=hoje).count()
 
     lista_encomendas = base_encomendas.filter(entregue=False).select_related('morador').order_by('-data_chegada')
 
-    lista_solicitacoes = base_solicitacoes.select_related('morador').order_by('-data_criacao')[:50]
+    lista_solicitacoes = base_solicitacoes.select_related('morador', 'criado_por').order_by('-data_criacao')[:50]
 
     todos_moradores = Morador.objects.filter(condominio=cond).order_by('bloco', 'apartamento') if cond else Morador.objects.all().order_by('bloco', 'apartamento')
 
@@ -602,6 +562,54 @@ def home(request):
 
 @login_required
 
+def api_reservas_portaria(request):
+
+    if not is_porteiro(request.user):
+
+        return JsonResponse({'erro': 'Acesso negado'}, status=403)
+
+    from .reservas import reservas_na_portaria
+
+    hoje = localdate()
+
+    reservas = reservas_na_portaria(get_condominio_porteiro(request.user), hoje)
+
+    return JsonResponse({
+
+        'hoje': hoje.isoformat(),
+
+        'reservas': [
+
+            {
+
+                'id': r.id,
+
+                'data': r.data.isoformat(),
+
+                'inicio': r.horario_inicio.strftime('%H:%M'),
+
+                'fim': r.horario_fim.strftime('%H:%M'),
+
+                'area': r.area.nome,
+
+                'morador': r.morador.nome,
+
+                'unidade': f'{r.morador.bloco}-{r.morador.apartamento}',
+
+                'acesso_liberado': r.acesso_liberado,
+
+                'nome_liberado': r.nome_liberado,
+
+            }
+
+            for r in reservas
+
+        ],
+
+    })
+
+@login_required
+
 def liberar_acesso_reserva(request, reserva_id):
 
     if not is_porteiro(request.user):
@@ -1303,165 +1311,127 @@ def api_moradores_offline(request):
 
     pass
 
-    cond = get_condominio_porteiro(request.user)
-
-    qs = Morador.objects.all().order_by('bloco', 'apartamento')
-
-    if cond:
-
-        qs = qs.filter(condominio=cond)
-
-    moradores = qs.values('id', 'nome', 'bloco', 'apartamento', 'telefone')
-
-    return JsonResponse({'moradores': list(moradores), 'porteiro': request.user.username})
-
-@csrf_exempt
-
-@login_required
-
-def api_sync_offline(request):
-
-    pass
-
-    if request.method != 'POST':
-
-        return JsonResponse({'error': 'Método não permitido'}, status=405)
-
-    try:
-
-        data = json.loads(request.body)
-
-    except json.JSONDecodeError:
-
-        return JsonResponse({'error': 'JSON inválido'}, status=400)
-
-    resultados = {'visitantes_criados': 0, 'encomendas_criadas': 0, 'solicitacoes_criadas': 0, 'erros': []}
+    from .diretorio import ler_cursor, moradores_do_diretorio, versao_diretorio
 
     cond = get_condominio_porteiro(request.user)
 
-    for i, v in enumerate(data.get('visitantes', [])):
-
-        try:
+    condominio_id = cond.id if cond else None
 
-            morador = None
+    etag, cursor = versao_diretorio(condominio_id)
 
-            if v.get('morador_id'):
+    # Diretório sem alterações desde a última cópia do aparelho: 304 sem corpo.
 
-                morador = Morador.objects.get(id=v['morador_id'])
+    if etag in [valor.strip() for valor in request.headers.get('If-None-Match', '').split(',')]:
 
-            condominio_reg = (morador.condominio if morador and morador.condominio else cond)
+        resposta = HttpResponse(status=304)
 
-            Visitante.objects.create(
-
-                condominio=condominio_reg,
+    else:
 
-                nome_completo=v.get('nome_completo', 'Sem nome'),
+        dados = moradores_do_diretorio(condominio_id, ler_cursor(request.GET.get('since')))
 
-                cpf=v.get('cpf', ''),
+        dados.update({'versao': cursor, 'porteiro': request.user.username})
 
-                data_nascimento=v.get('data_nascimento') or None,
+        resposta = JsonResponse(dados)
 
-                placa_veiculo=v.get('placa_veiculo', ''),
+    resposta['ETag'] = etag
 
-                morador_responsavel=morador,
+    resposta['Cache-Control'] = 'private, no-cache'
 
-                quem_autorizou=v.get('quem_autorizou', ''),
+    return resposta
 
-                observacoes=v.get('observacoes', '') + ' [Registrado offline]',
+@login_required
 
-                registrado_por=request.user
+def midia_protegida(request, caminho):
 
-            )
-
-            resultados['visitantes_criados'] += 1
+    pass
 
-        except Exception as e:
+    from django.http import Http404
 
-            resultados['erros'].append(f'Visitante #{i+1}: {str(e)}')
+    from .midia import CACHE_MIDIA, pode_acessar_midia, servir_arquivo
 
-    for i, e in enumerate(data.get('encomendas', [])):
+    # Sem permissão responde 404, como arquivo inexistente: não revela que o arquivo existe em outro condomínio.
 
-        try:
+    if not pode_acessar_midia(request.user, caminho):
 
-            morador = Morador.objects.get(id=e['morador_id'])
+        raise Http404
 
-            condominio_reg = morador.condominio or cond
+    resposta = servir_arquivo(request, settings.MEDIA_ROOT, caminho, CACHE_MIDIA, acelerar=True)
 
-            Encomenda.objects.create(
+    if resposta is None:
 
-                condominio=condominio_reg,
+        raise Http404
 
-                morador=morador,
+    return resposta
 
-                volume=e.get('volume', 'Sem descrição'),
+def imagem_publica(request, caminho):
 
-                destinatario_alternativo=e.get('destinatario_alternativo', ''),
+    pass
 
-                porteiro_cadastro=request.user
+    from django.http import Http404
 
-            )
+    from .midia import CACHE_IMAGEM_PUBLICA, servir_arquivo
 
-            resultados['encomendas_criadas'] += 1
+    resposta = servir_arquivo(request, settings.BASE_DIR / 'img', caminho, CACHE_IMAGEM_PUBLICA)
 
-        except Exception as ex:
+    if resposta is None:
 
-            resultados['erros'].append(f'Encomenda #{i+1}: {str(ex)}')
+        raise Http404
 
-    for i, s in enumerate(data.get('solicitacoes', [])):
+    return resposta
 
-        try:
+def service_worker(request):
 
-            morador = None
+    pass
 
-            if s.get('morador_id'):
+    from django.utils.cache import get_conditional_response
 
-                morador = Morador.objects.get(id=s['morador_id'])
+    from .precache import script_service_worker
 
-            solicitacao = Solicitacao.objects.create(
+    # Servido na raiz para o SW controlar todas as páginas (em /static/ o escopo ficaria restrito a /static/).
 
-                condominio=(morador.condominio if morador and morador.condominio else cond),
+    conteudo = script_service_worker().encode('utf-8')
 
-                tipo=s.get('tipo', 'OUTRO'),
+    etag = '"{}"'.format(hashlib.sha256(conteudo).hexdigest()[:20])
 
-                descricao=s.get('descricao', '') + ' [Registrado offline]',
+    resposta = get_conditional_response(request, etag=etag) or HttpResponse(conteudo, content_type='application/javascript; charset=utf-8')
 
-                morador=morador,
+    resposta['ETag'] = etag
 
-                criado_por=request.user
+    # O navegador revalida o SW a cada navegação; com no-cache a versão nova do manifesto chega na hora.
 
-            )
+    resposta['Cache-Control'] = 'no-cache'
 
-            solicitacao_cond = solicitacao.condominio
+    resposta['Service-Worker-Allowed'] = '/'
 
-            if solicitacao_cond:
+    return resposta
 
-                sindicos = Sindico.objects.filter(condominio=solicitacao_cond)
+@csrf_exempt
 
-                notificacoes = [
+@login_required
 
-                    Notificacao(
+def api_sync_offline(request):
 
-                        usuario=sind.usuario,
+    pass
 
-                        tipo='solicitacao',
+    if request.method != 'POST':
 
-                        mensagem=f'Porteiro {request.user.get_full_name() or request.user.username}: solicitação #{solicitacao.id} [offline]',
+        return JsonResponse({'error': 'Método não permitido'}, status=405)
 
-                        link='/sindico/solicitacoes/'
+    try:
 
-                    ) for sind in sindicos if sind.usuario
+        data = json.loads(request.body)
 
-                ]
+    except json.JSONDecodeError:
 
-                Notificacao.objects.bulk_create(notificacoes)
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
 
-            resultados['solicitacoes_criadas'] += 1
+    if not isinstance(data, dict):
 
-        except Exception as ex:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
 
-            resultados['erros'].append(f'Solicitação #{i+1}: {str(ex)}')
+    from .sincronizacao import sincronizar_pendencias
 
-    resultados['ok'] = len(resultados['erros']) == 0
+    resultados = sincronizar_pendencias(request.user, get_condominio_porteiro(request.user), data)
 
     resultados['porteiro'] = request.user.username
 
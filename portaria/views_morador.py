@@ -24,6 +24,10 @@ import json
 
 from django.http import JsonResponse
 
+from .uploads import erro_upload
+
+from .contexto import contexto_do_usuario
+
 def get_morador_from_user(user):
 
     pass
@@ -68,6 +72,12 @@ def get_morador_ativo(request):
 
     pass
 
+    contexto = contexto_do_usuario(request.user)
+
+    if contexto is not None:
+
+        return contexto.morador
+
     if request.user.is_authenticated:
 
         try:
@@ -84,6 +94,12 @@ def get_condominio_ativo(request):
 
     pass
 
+    contexto = contexto_do_usuario(request.user)
+
+    if contexto is not None:
+
+        return contexto.condominio
+
     condominio_id = request.session.get('condominio_ativo_id')
 
     if condominio_id and request.user.is_authenticated:
@@ -321,21 +337,15 @@ def minhas_cobrancas(request):
 
             comprovante = request.FILES.get('comprovante')
 
-            if comprovante:
-
-                content_type = getattr(comprovante, 'content_type', '')
-
-                if content_type.startswith('video/') or str(comprovante.name).lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm')):
+            erro = erro_upload(request, 'comprovante')
 
-                    messages.error(request, "O envio de vídeos não é permitido para o comprovante.")
+            if erro:
 
-                    return redirect('morador_cobrancas')
+                messages.error(request, erro)
 
-                if comprovante.size > 5 * 1024 * 1024:
+                return redirect('morador_cobrancas')
 
-                    messages.error(request, 'O comprovante deve ter no máximo 5MB.')
-
-                    return redirect('morador_cobrancas')
+            if comprovante:
 
                 cobranca.comprovante = comprovante
 
@@ -519,21 +529,13 @@ def nova_solicitacao(request):
 
         arquivo = request.FILES.get('arquivo')
 
-        if arquivo:
-
-            content_type = getattr(arquivo, 'content_type', '')
-
-            if content_type.startswith('video/') or str(arquivo.name).lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm')):
-
-                messages.error(request, "O envio de vídeos não é permitido.")
-
-                return redirect('morador_nova_solicitacao')
+        erro = erro_upload(request, 'arquivo')
 
-            if arquivo.size > 5 * 1024 * 1024:
+        if erro:
 
-                messages.error(request, 'O arquivo deve ter no máximo 5MB.')
+            messages.error(request, erro)
 
-                return redirect('morador_nova_solicitacao')
+            return redirect('morador_nova_solicitacao')
 
         if tipo and descricao:
 
@@ -689,37 +691,35 @@ def fazer_reserva(request, area_id):
 
         if data:
 
-            conflito = Reserva.objects.filter(
+            from datetime import date, time
 
-                area=area,
+            from .reservas import reservar_dia, reservar_horario, ReservaIndisponivel
 
-                data=data,
+            try:
 
-                status__in=['PENDENTE', 'APROVADA'],
+                if area.usa_horarios:
 
-            ).exists()
+                    reserva = reservar_horario(
 
-            if conflito:
+                        area, morador, date.fromisoformat(data),
 
-                messages.error(request, 'Esta data já está reservada. Escolha outra data disponível.')
+                        time.fromisoformat(request.POST.get('horario_inicio', '')),
 
-            else:
-
-                reserva = Reserva.objects.create(
+                        quantidade=int(request.POST.get('quantidade') or 1),
 
-                    area=area,
+                        observacoes=observacoes,
 
-                    morador=morador,
+                    )
 
-                    data=data,
+                else:
 
-                    horario_inicio=area.horario_abertura,
+                    reserva = reservar_dia(area, morador, date.fromisoformat(data), observacoes)
 
-                    horario_fim=area.horario_fechamento,
+            except ValueError as e:
 
-                    observacoes=observacoes,
+                messages.error(request, str(e) if isinstance(e, ReservaIndisponivel) else 'Data ou horário inválido.')
 
-                )
+            else:
 
                 notificar_sindicos_do_condominio(
 
@@ -735,7 +735,9 @@ def fazer_reserva(request, area_id):
 
                 )
 
-                messages.success(request, f'Reserva de {area.nome} para {data} solicitada com sucesso!')
+                horario = f' das {reserva.horario_inicio:%H:%M} às {reserva.horario_fim:%H:%M}' if area.usa_horarios else ''
+
+                messages.success(request, f'Reserva de {area.nome} para {reserva.data:%d/%m/%Y}{horario} solicitada com sucesso!')
 
                 return redirect('morador_reservas')
 
@@ -743,22 +745,6 @@ def fazer_reserva(request, area_id):
 
             messages.error(request, 'Selecione uma data.')
 
-    datas_bloqueadas = list(
-
-        Reserva.objects.filter(
-
-            area=area,
-
-            data__gte=timezone.now().date(),
-
-            status__in=['PENDENTE', 'APROVADA'],
-
-        ).values_list('data', flat=True).distinct()
-
-    )
-
-    datas_bloqueadas_str = [d.strftime('%Y-%m-%d') for d in datas_bloqueadas]
-
     reservas_existentes = Reserva.objects.filter(
 
         area=area,
@@ -767,7 +753,7 @@ def fazer_reserva(request, area_id):
 
         status__in=['PENDENTE', 'APROVADA'],
 
-    ).select_related('morador').order_by('data')[:20]
+    ).only('data', 'horario_inicio', 'horario_fim', 'status').order_by('data')[:20]
 
     context = {
 
@@ -777,14 +763,86 @@ def fazer_reserva(request, area_id):
 
         'reservas_existentes': reservas_existentes,
 
-        'datas_bloqueadas_json': datas_bloqueadas_str,
-
     }
 
     return render(request, 'morador/fazer_reserva.html', context)
 
 @morador_required
 
+def api_calendario_area(request, area_id):
+
+    pass
+
+    from datetime import datetime
+
+    from django.http import HttpResponseNotModified
+
+    from django.utils.http import quote_etag
+
+    from .reservas import calendario_mes
+
+    area = get_object_or_404(AreaComum, id=area_id, condominio=request.morador.condominio, ativo=True)
+
+    try:
+
+        mes = datetime.strptime(request.GET.get('mes', ''), '%Y-%m').date()
+
+    except ValueError:
+
+        mes = timezone.now().date()
+
+    calendario = calendario_mes(area, mes)
+
+    etag = quote_etag(f"{area.id}-{calendario['mes']}-{calendario['atualizado_em']}")
+
+    if request.headers.get('If-None-Match') == etag:
+
+        response = HttpResponseNotModified()
+
+    else:
+
+        response = JsonResponse(calendario)
+
+    response['ETag'] = etag
+
+    response['Cache-Control'] = 'private, max-age=60'
+
+    return response
+
+@morador_required
+
+def api_horarios_area(request, area_id):
+
+    pass
+
+    from datetime import date, timedelta
+
+    from .reservas import horarios_livres
+
+    area = get_object_or_404(AreaComum, id=area_id, condominio=request.morador.condominio, ativo=True)
+
+    try:
+
+        inicio = date.fromisoformat(request.GET.get('inicio') or timezone.now().date().isoformat())
+
+        fim = date.fromisoformat(request.GET['fim']) if request.GET.get('fim') else inicio + timedelta(days=6)
+
+    except ValueError:
+
+        return JsonResponse({'erro': 'Datas inválidas. Use AAAA-MM-DD.'}, status=400)
+
+    return JsonResponse({
+
+        'area': area.id,
+
+        'duracao': area.duracao_horario,
+
+        'horarios_livres': horarios_livres(area, inicio, fim),
+
+    })
+
+@morador_required
+
 def minhas_reservas(request):
 
     pass
@@ -995,21 +1053,13 @@ def ocorrencias(request):
 
         foto = request.FILES.get('foto')
 
-        if foto:
-
-            content_type = getattr(foto, 'content_type', '')
-
-            if content_type.startswith('video/') or str(foto.name).lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm')):
+        erro = erro_upload(request, 'foto')
 
-                messages.error(request, "O envio de vídeos não é permitido.")
+        if erro:
 
-                return redirect('morador_ocorrencias')
+            messages.error(request, erro)
 
-            if foto.size > 5 * 1024 * 1024:
-
-                messages.error(request, 'A foto deve ter no máximo 5MB.')
-
-                return redirect('morador_ocorrencias')
+            return redirect('morador_ocorrencias')
 
         if descricao:
 
@@ -1265,21 +1315,13 @@ def feedback_morador(request):
 
         foto = request.FILES.get('foto')
 
-        if foto:
+        erro = erro_upload(request, 'foto')
 
-            content_type = getattr(foto, 'content_type', '')
+        if erro:
 
-            if content_type.startswith('video/') or str(foto.name).lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm')):
+            messages.error(request, erro)
 
-                messages.error(request, "O envio de vídeos não é permitido.")
-
-                return redirect('morador_feedback')
-
-            if foto.size > 5 * 1024 * 1024:
-
-                messages.error(request, 'O arquivo deve ter no máximo 5MB.')
-
-                return redirect('morador_feedback')
+            return redirect('morador_feedback')
 
         if tipo and assunto and descricao:
 
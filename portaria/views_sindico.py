@@ -2,7 +2,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 
 from django.urls import reverse
 
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
 
 from django.contrib.auth.decorators import login_required
 
@@ -12,6 +12,8 @@ from django.contrib import messages
 
 from django.utils import timezone
 
+from django.utils.dateparse import parse_time
+
 from django.db import transaction
 
 from django.db.models import Sum, Q, Count
@@ -22,10 +24,16 @@ from pywebpush import webpush, WebPushException
 
 from django.conf import settings
 
-from .models import Condominio, Sindico, Porteiro, Morador, Visitante, Encomenda, Solicitacao, Aviso, Notificacao, AreaComum, Reserva, Cobranca, Mensagem, Ocorrencia, PushSubscription, FeedbackMorador
+from .models import Condominio, Sindico, Porteiro, Morador, Visitante, Encomenda, Solicitacao, Aviso, Notificacao, AreaComum, Reserva, Cobranca, Mensagem, Ocorrencia, PushSubscription, FeedbackMorador, ImportacaoMoradores
 
 from .utils import disparar_push_individual
 
+from .uploads import erro_upload
+
+from .contexto import contexto_do_usuario
+
+MINUTOS_DIA = 24 * 60
+
 User = get_user_model()
 
 def is_sindico(user):
@@ -48,6 +56,12 @@ def get_condominio_ativo(request):
 
     pass
 
+    contexto = contexto_do_usuario(request.user)
+
+    if contexto is not None:
+
+        return contexto.condominio
+
     condominio_id = request.session.get('condominio_ativo_id')
 
     if condominio_id and request.user.is_authenticated:
@@ -84,6 +98,10 @@ def sindico_context(request, extra=None, active_page=''):
 
         context_data['unread_mensagens_count'] = unread_msgs
 
+        from .financeiro import contar_cobrancas_em_analise
+
+        context_data['cobrancas_em_analise_count'] = contar_cobrancas_em_analise(condominio.id)
+
     if extra:
 
         context_data.update(extra)
@@ -150,6 +168,10 @@ def painel_sindico(request):
 
     sindico = getattr(request.user, 'sindico', None)
 
+    from .financeiro import indicadores_financeiros
+
+    financeiro = indicadores_financeiros(condominio)
+
     stats = {
 
         'moradores': Morador.objects.filter(condominio=condominio).count(),
@@ -160,17 +182,11 @@ def painel_sindico(request):
 
         ).count(),
 
-        'cobrancas_pagas': Cobranca.objects.filter(
+        'cobrancas_pagas': financeiro['totais']['qtd_pago'],
 
-            condominio=condominio, status='PAGO'
+        'cobrancas_pendentes': financeiro['totais']['qtd_pendente'] + financeiro['totais']['qtd_em_analise'],
 
-        ).count(),
-
-        'cobrancas_pendentes': Cobranca.objects.filter(
-
-            condominio=condominio, status__in=['PENDENTE', 'ATRASADO']
-
-        ).count(),
+        'cobrancas_atrasadas': financeiro['totais']['qtd_atrasado'],
 
     }
 
@@ -178,11 +194,13 @@ def painel_sindico(request):
 
         'stats': stats,
 
+        'financeiro': financeiro,
+
         'ultimas_solicitacoes': Solicitacao.objects.filter(
 
             condominio=condominio
 
-        ).order_by('-data_criacao')[:5],
+        ).select_related('morador').order_by('-data_criacao')[:5],
 
     }, active_page='painel')
 
@@ -212,201 +230,27 @@ def moradores_sindico(request):
 
             arquivo = request.FILES.get('arquivo')
 
-            if not arquivo:
-
-                messages.error(request, "Nenhum arquivo selecionado.")
-
-                return redirect('sindico_moradores')
-
-            content_type = getattr(arquivo, 'content_type', '')
+            erro = erro_upload(request, 'arquivo')
 
-            if content_type.startswith('video/') or str(arquivo.name).lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm')):
+            if erro:
 
-                messages.error(request, "O envio de vídeos não é permitido. Envie apenas planilhas (.xlsx, .xls, .csv).")
+                messages.error(request, erro)
 
                 return redirect('sindico_moradores')
 
-            nome_arquivo = arquivo.name.lower()
-
-            rows = []
-
-            try:
-
-                if nome_arquivo.endswith('.xlsx'):
-
-                    import openpyxl
-
-                    wb = openpyxl.load_workbook(arquivo, read_only=True)
-
-                    ws = wb.active
-
-                    for i, row in enumerate(ws.iter_rows(values_only=True)):
-
-                        if i == 0:                   
-
-                            continue
-
-                        if row and any(row):
-
-                            rows.append([str(c).strip() if c else '' for c in row])
-
-                    wb.close()
-
-                elif nome_arquivo.endswith('.xls'):
-
-                    import xlrd
-
-                    wb = xlrd.open_workbook(file_contents=arquivo.read())
-
-                    ws = wb.sheet_by_index(0)
-
-                    for i in range(1, ws.nrows):                   
-
-                        row = [str(ws.cell_value(i, j)).strip() for j in range(ws.ncols)]
-
-                        if any(row):
-
-                            rows.append(row)
-
-                elif nome_arquivo.endswith('.csv'):
-
-                    import csv, io
-
-                    content = arquivo.read().decode('utf-8-sig')
-
-                    reader = csv.reader(io.StringIO(content), delimiter=';')
-
-                    for i, row in enumerate(reader):
-
-                        if i == 0:
-
-                            if len(row) == 1 and ',' in row[0]:
-
-                                content = arquivo.read().decode('utf-8-sig') if hasattr(arquivo, 'read') else content
-
-                                reader = csv.reader(io.StringIO(content), delimiter=',')
-
-                                continue
-
-                            continue
-
-                        if any(row):
-
-                            rows.append([c.strip() for c in row])
-
-                else:
-
-                    messages.error(request, "Formato não suportado. Use .xlsx, .xls ou .csv")
-
-                    return redirect('sindico_moradores')
-
-            except Exception as e:
+            if not arquivo:
 
-                messages.error(request, f"Erro ao ler o arquivo: {e}")
+                messages.error(request, "Nenhum arquivo selecionado.")
 
                 return redirect('sindico_moradores')
 
-            total = 0
-
-            erros_lista = []
-
-            for index, row in enumerate(rows, start=1):
-
-                try:
-
-                    with transaction.atomic():
-
-                        nome = row[0] if len(row) > 0 else ''
-
-                        apartamento = row[1] if len(row) > 1 else ''
-
-                        bloco = row[2] if len(row) > 2 else ''
-
-                        telefone = row[3] if len(row) > 3 else ''
-
-                        email = row[4] if len(row) > 4 else ''
-
-                        cpf = row[5] if len(row) > 5 else ''
-
-                        nome = nome.strip()
-
-                        apartamento = apartamento.strip()
-
-                        if not nome or not apartamento:
-
-                            raise ValueError(f"Linha {index}: Nome e apartamento são obrigatórios.")
-
-                        base_username = f"{nome.split()[0].lower()}.{apartamento}"
-
-                        if bloco:
-
-                            base_username += f".{bloco.lower()}"
-
-                        username = base_username
-
-                        counter = 1
-
-                        while User.objects.filter(username=username).exists():
-
-                            username = f"{base_username}{counter}"
-
-                            counter += 1
-
-                        if cpf and len(cpf) > 14:
-
-                            raise ValueError(f"Linha {index}: CPF longo demais.")
-
-                        user_obj = User.objects.create_user(
-
-                            username=username,
-
-                            password='mudar123',
-
-                            first_name=nome.split()[0] if nome else '',
+            from .importacao import criar_importacao, iniciar_importacao
 
-                            email=email,
+            importacao = criar_importacao(condominio, arquivo, request.user)
 
-                            tipo_usuario='morador'
+            iniciar_importacao(importacao)
 
-                        )
-
-                        user_obj.condominios.add(condominio)
-
-                        Morador.objects.create(
-
-                            condominio=condominio,
-
-                            nome=nome,
-
-                            bloco=bloco,
-
-                            apartamento=apartamento,
-
-                            telefone=telefone,
-
-                            email=email,
-
-                            cpf=cpf,
-
-                            usuario=user_obj
-
-                        )
-
-                        total += 1
-
-                except Exception as e:
-
-                    erros_lista.append(str(e) if "Linha " in str(e) else f"Linha {index} ({nome or 'Desconhecido'}): {str(e)}")
-
-            if total > 0:
-
-                messages.success(request, f"{total} morador(es) importado(s) com sucesso!")
-
-            if erros_lista:
-
-                for erro_msg in erros_lista:
-
-                    messages.warning(request, erro_msg)
+            messages.info(request, f"Importação de '{importacao.nome_original}' iniciada. Acompanhe o progresso abaixo.")
 
             return redirect('sindico_moradores')
 
@@ -536,12 +380,76 @@ def moradores_sindico(request):
 
         'query_busca': query_busca,
 
+        'importacao_recente': condominio.importacoes_moradores.first(),
+
     }, active_page='moradores')
 
     return render(request, 'sindico/moradores.html', ctx)
 
 @login_required
 
+def importacao_moradores_progresso(request, importacao_id):
+
+    if not is_sindico(request.user):
+
+        return JsonResponse({'erro': 'Acesso negado'}, status=403)
+
+    condominio = get_condominio_ativo(request)
+
+    importacao = get_object_or_404(ImportacaoMoradores, id=importacao_id, condominio=condominio)
+
+    return JsonResponse({
+
+        'id': importacao.id,
+
+        'status': importacao.status,
+
+        'status_display': importacao.get_status_display(),
+
+        'em_andamento': importacao.em_andamento,
+
+        'percentual': importacao.percentual,
+
+        'total_estimado': importacao.total_estimado,
+
+        'processadas': importacao.processadas,
+
+        'criados': importacao.criados,
+
+        'ignorados': importacao.ignorados,
+
+        'falhas': importacao.falhas,
+
+        'mensagem_erro': importacao.mensagem_erro,
+
+    })
+
+@login_required
+
+def importacao_moradores_falhas(request, importacao_id):
+
+    if not is_sindico(request.user):
+
+        return redirect('home')
+
+    condominio = get_condominio_ativo(request)
+
+    importacao = get_object_or_404(ImportacaoMoradores, id=importacao_id, condominio=condominio)
+
+    from .importacao import gerar_csv_falhas
+
+    response = HttpResponse(content_type='text/csv; charset=utf-8')
+
+    response['Content-Disposition'] = f'attachment; filename="falhas_importacao_{importacao.id}.csv"'
+
+    response.write('\ufeff')
+
+    gerar_csv_falhas(importacao, response)
+
+    return response
+
+@login_required
+
 def sindico_morador_editar(request, id):
 
     if not is_sindico(request.user) or request.method != 'POST':
@@ -856,17 +764,13 @@ def criar_aviso_sindico(request):
 
         arquivo = request.FILES.get('arquivo')
 
-        for f in [imagem, arquivo]:
-
-            if f:
-
-                content_type = getattr(f, 'content_type', '')
+        erro = erro_upload(request, 'imagem', 'arquivo')
 
-                if content_type.startswith('video/') or str(f.name).lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm')):
+        if erro:
 
-                    messages.error(request, "O envio de vídeos não é permitido. Envie apenas imagens ou documentos.")
+            messages.error(request, erro)
 
-                    return redirect('sindico_avisos')
+            return redirect('sindico_avisos')
 
         if titulo and conteudo:
 
@@ -958,29 +862,29 @@ def editar_aviso_sindico(request, aviso_id):
 
         imagem = request.FILES.get('imagem')
 
-        if imagem:
+        erro = erro_upload(request, 'imagem')
 
-            content_type = getattr(imagem, 'content_type', '')
+        if erro:
 
-            if content_type.startswith('video/') or str(imagem.name).lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm')):
+            messages.error(request, erro)
 
-                messages.error(request, "O envio de vídeos não é permitido.")
+            return redirect('sindico_avisos')
 
-                return redirect('sindico_avisos')
+        if imagem:
 
             aviso.imagem = imagem
 
         arquivo = request.FILES.get('arquivo')
 
-        if arquivo:
+        erro = erro_upload(request, 'arquivo')
 
-            content_type = getattr(arquivo, 'content_type', '')
+        if erro:
 
-            if content_type.startswith('video/') or str(arquivo.name).lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm')):
+            messages.error(request, erro)
 
-                messages.error(request, "O envio de vídeos não é permitido.")
+            return redirect('sindico_avisos')
 
-                return redirect('sindico_avisos')
+        if arquivo:
 
             aviso.arquivo = arquivo
 
@@ -1226,17 +1130,23 @@ def areas_comuns_sindico(request):
 
                 horario_fechamento = request.POST.get('horario_fechamento') or '22:00'
 
-                imagem = request.FILES.get('imagem')
+                duracao_horario = int(request.POST.get('duracao_horario') or 0)
 
-                if imagem:
+                if not 0 <= duracao_horario <= MINUTOS_DIA:
 
-                    content_type = getattr(imagem, 'content_type', '')
+                    messages.error(request, 'A duração do horário deve ficar entre 0 (dia inteiro) e 1440 minutos.')
 
-                    if content_type.startswith('video/') or str(imagem.name).lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm')):
+                    return redirect('sindico_areas_comuns')
+
+                imagem = request.FILES.get('imagem')
 
-                        messages.error(request, "O envio de vídeos não é permitido.")
+                erro = erro_upload(request, 'imagem')
 
-                        return redirect('sindico_areas_comuns')
+                if erro:
+
+                    messages.error(request, erro)
+
+                    return redirect('sindico_areas_comuns')
 
                 if nome:
 
@@ -1254,6 +1164,10 @@ def areas_comuns_sindico(request):
 
                         horario_fechamento=horario_fechamento,
 
+                        duracao_horario=duracao_horario,
+
+                        reservas_por_horario=max(int(request.POST.get('reservas_por_horario') or 1), 1),
+
                     )
 
                     if imagem:
@@ -1280,28 +1194,50 @@ def areas_comuns_sindico(request):
 
                 area.capacidade = int(request.POST.get('capacidade') or area.capacidade or 0)
 
-                area.horario_abertura = request.POST.get('horario_abertura') or area.horario_abertura
+                duracao_horario = int(request.POST.get('duracao_horario') or 0)
+
+                if not 0 <= duracao_horario <= MINUTOS_DIA:
+
+                    messages.error(request, 'A duração do horário deve ficar entre 0 (dia inteiro) e 1440 minutos.')
 
-                area.horario_fechamento = request.POST.get('horario_fechamento') or area.horario_fechamento
+                    return redirect('sindico_areas_comuns')
+
+                # Os horários de uma área por horário dependem da abertura e do fechamento: qualquer mudança refaz o índice.
+
+                regra_anterior = (area.horario_abertura, area.horario_fechamento, area.duracao_horario, area.reservas_por_horario)
+
+                area.horario_abertura = parse_time(request.POST.get('horario_abertura') or '') or area.horario_abertura
+
+                area.horario_fechamento = parse_time(request.POST.get('horario_fechamento') or '') or area.horario_fechamento
 
                 area.ativo = request.POST.get('ativo') == 'on'
 
+                area.duracao_horario = duracao_horario
+
+                area.reservas_por_horario = max(int(request.POST.get('reservas_por_horario') or 1), 1)
+
                 imagem_nova = request.FILES.get('imagem')
 
-                if imagem_nova:
+                erro = erro_upload(request, 'imagem')
 
-                    content_type = getattr(imagem_nova, 'content_type', '')
+                if erro:
 
-                    if content_type.startswith('video/') or str(imagem_nova.name).lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm')):
+                    messages.error(request, erro)
 
-                        messages.error(request, "O envio de vídeos não é permitido.")
+                    return redirect('sindico_areas_comuns')
 
-                        return redirect('sindico_areas_comuns')
+                if imagem_nova:
 
                     area.imagem = imagem_nova
 
                 area.save()
 
+                if regra_anterior != (area.horario_abertura, area.horario_fechamento, area.duracao_horario, area.reservas_por_horario):
+
+                    from .reservas import reconstruir_disponibilidade
+
+                    reconstruir_disponibilidade([area.id])
+
                 messages.success(request, f'Área "{area.nome}" atualizada!')
 
             return redirect('sindico_areas_comuns')
@@ -1386,15 +1322,13 @@ def reservas_sindico(request):
 
             imagem = request.FILES.get('imagem')
 
-            if imagem:
-
-                content_type = getattr(imagem, 'content_type', '')
+            erro = erro_upload(request, 'imagem')
 
-                if content_type.startswith('video/') or str(imagem.name).lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm')):
+            if erro:
 
-                    messages.error(request, "O envio de vídeos não é permitido.")
+                messages.error(request, erro)
 
-                    return redirect('sindico_reservas')
+                return redirect('sindico_reservas')
 
             if nome:
 
@@ -1432,24 +1366,66 @@ def reservas_sindico(request):
 
         return redirect('sindico_reservas')
 
-    reservas_list = Reserva.objects.filter(
+    from datetime import date
 
-        area__condominio=condominio
+    from .paginacao import paginar_por_chave
 
-    ).select_related('area', 'morador')
+    from .reservas import listar_reservas
 
-    status = request.GET.get('status')
+    status = request.GET.get('status', '').strip()
 
-    if status:
+    area_filtro = request.GET.get('area', '').strip()
 
-        reservas_list = reservas_list.filter(status=status)
+    data_inicio = request.GET.get('data_inicio', '').strip()
+
+    data_fim = request.GET.get('data_fim', '').strip()
+
+    try:
+
+        data_inicio = date.fromisoformat(data_inicio) if data_inicio else None
+
+        data_fim = date.fromisoformat(data_fim) if data_fim else None
+
+    except ValueError:
+
+        data_inicio = data_fim = None
+
+    reservas_list = listar_reservas(
+
+        condominio,
+
+        status=status or None,
+
+        area_id=int(area_filtro) if area_filtro.isdigit() else None,
+
+        de=data_inicio,
+
+        ate=data_fim,
+
+    )
+
+    pagina = paginar_por_chave(reservas_list, 'data', apos=request.GET.get('apos'), antes=request.GET.get('antes'))
+
+    filtros = request.GET.copy()
+
+    filtros.pop('apos', None)
+
+    filtros.pop('antes', None)
 
     context = sindico_context(request, {
 
-        'reservas': reservas_list,
+        'reservas': pagina['itens'],
+
+        'pagina': pagina,
+
+        'filtros_qs': filtros.urlencode(),
 
         'status_filtro': status,
 
+        'area_filtro': area_filtro,
+
+        'areas': AreaComum.objects.filter(condominio=condominio).only('id', 'nome'),
+
     }, active_page='reservas')
 
     return render(request, 'sindico/reservas.html', context)
@@ -1610,15 +1586,13 @@ def financeiro_sindico(request):
 
             chave_pix = request.POST.get('chave_pix', '').strip()
 
-            if arquivo_boleto:
-
-                content_type = getattr(arquivo_boleto, 'content_type', '')
+            erro = erro_upload(request, 'arquivo_boleto')
 
-                if content_type.startswith('video/') or str(arquivo_boleto.name).lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm')):
+            if erro:
 
-                    messages.error(request, "O envio de vídeos não é permitido.")
+                messages.error(request, erro)
 
-                    return redirect('sindico_financeiro')
+                return redirect('sindico_financeiro')
 
             if morador_id and descricao and valor and data_vencimento:
 
@@ -1668,6 +1642,80 @@ def financeiro_sindico(request):
 
                 messages.error(request, 'Preencha todos os campos obrigatórios da cobrança.')
 
+        elif action == 'gerar_lote':
+
+            from datetime import date
+
+            from .faturamento import gerar_cobrancas_mes, ler_tabela_unidades, mapear_boletos, ler_valor
+
+            modo = request.POST.get('modo', 'fixo')
+
+            descricao = request.POST.get('descricao', '').strip() or 'Taxa Condominial'
+
+            try:
+
+                competencia = date.fromisoformat(request.POST.get('competencia', '') + '-01')
+
+                data_vencimento = date.fromisoformat(request.POST.get('data_vencimento', ''))
+
+            except ValueError:
+
+                messages.error(request, 'Informe a competência (mês/ano) e a data de vencimento.')
+
+                return redirect('sindico_financeiro')
+
+            erro = erro_upload(request, 'boletos')
+
+            if erro:
+
+                messages.error(request, erro)
+
+                return redirect('sindico_financeiro')
+
+            try:
+
+                valor_txt = request.POST.get('valor', '').strip()
+
+                resultado = gerar_cobrancas_mes(
+
+                    condominio,
+
+                    competencia=competencia,
+
+                    descricao=descricao,
+
+                    data_vencimento=data_vencimento,
+
+                    modo=modo,
+
+                    valor=ler_valor(valor_txt, 'Valor') if valor_txt else None,
+
+                    tabela=ler_tabela_unidades(request.POST.get('tabela', '')),
+
+                    bloco=request.POST.get('bloco', '').strip() or None,
+
+                    chave_pix=request.POST.get('chave_pix', '').strip(),
+
+                    boletos=mapear_boletos(request.FILES.getlist('boletos')),
+
+                )
+
+            except ValueError as e:
+
+                messages.error(request, f'Não foi possível gerar as cobranças: {e}')
+
+                return redirect('sindico_financeiro')
+
+            messages.success(request, f"{resultado['criadas']} cobrança(s) de {competencia:%m/%Y} gerada(s), totalizando R$ {resultado['total']:.2f}.")
+
+            if resultado['ja_faturadas']:
+
+                messages.info(request, f"{resultado['ja_faturadas']} unidade(s) já tinham cobrança nesta competência e foram mantidas.")
+
+            if resultado['sem_valor']:
+
+                messages.warning(request, f"{resultado['sem_valor']} unidade(s) ficaram de fora por não constarem na tabela.")
+
         elif action == 'marcar_pago' or action == 'aprovar_pagamento':
 
             cobranca_id = request.POST.get('cobranca_id')
@@ -1698,47 +1746,87 @@ def financeiro_sindico(request):
 
         return redirect('sindico_financeiro')
 
-    cobrancas = Cobranca.objects.filter(condominio=condominio).select_related('morador').order_by('-data_vencimento')
+    from datetime import date
+
+    from .financeiro import contagem_por_status
+
+    from .paginacao import paginar_por_chave
 
-    busca_nome = request.GET.get('busca_nome')
-    status = request.GET.get('status')
-    data_inicio = request.GET.get('data_inicio')
-    data_fim = request.GET.get('data_fim')
+    cobrancas = Cobranca.objects.filter(condominio=condominio).select_related('morador')
+
+    busca_nome = request.GET.get('busca_nome', '').strip()
+
+    status = request.GET.get('status', '').strip()
+
+    bloco = request.GET.get('bloco', '').strip()
+
+    apartamento = request.GET.get('apartamento', '').strip()
+
+    data_inicio = request.GET.get('data_inicio', '').strip()
+
+    data_fim = request.GET.get('data_fim', '').strip()
+
+    try:
+
+        data_inicio = date.fromisoformat(data_inicio) if data_inicio else None
+
+        data_fim = date.fromisoformat(data_fim) if data_fim else None
+
+    except ValueError:
+
+        data_inicio = data_fim = None
 
     if busca_nome:
+
         cobrancas = cobrancas.filter(
+
             Q(morador__nome__icontains=busca_nome) |
+
             Q(morador__apartamento__icontains=busca_nome) |
+
             Q(morador__bloco__icontains=busca_nome)
+
         )
+
     if status:
+
         cobrancas = cobrancas.filter(status=status)
+
+    if bloco:
+
+        cobrancas = cobrancas.filter(morador__bloco=bloco)
+
+    if apartamento:
+
+        cobrancas = cobrancas.filter(morador__apartamento=apartamento)
+
     if data_inicio:
+
         cobrancas = cobrancas.filter(data_vencimento__gte=data_inicio)
+
     if data_fim:
-        cobrancas = cobrancas.filter(data_vencimento__lte=data_fim)
 
-    moradores = Morador.objects.filter(condominio=condominio).order_by('bloco', 'apartamento')
+        cobrancas = cobrancas.filter(data_vencimento__lte=data_fim)
 
-    blocos_unicos = Morador.objects.filter(condominio=condominio).exclude(bloco='').values_list('bloco', flat=True).distinct().order_by('bloco')
+    pagina = paginar_por_chave(cobrancas, 'data_vencimento', apos=request.GET.get('apos'), antes=request.GET.get('antes'))
 
-    hoje = timezone.now().date()
+    filtros = request.GET.copy()
 
-    Cobranca.objects.filter(
+    filtros.pop('apos', None)
 
-        condominio=condominio, 
+    filtros.pop('antes', None)
 
-        status='PENDENTE', 
+    blocos_unicos = Morador.objects.filter(condominio=condominio).exclude(bloco='').values_list('bloco', flat=True).distinct().order_by('bloco')
 
-        data_vencimento__lt=hoje
+    context = sindico_context(request, {
 
-    ).update(status='ATRASADO')
+        'cobrancas': pagina['itens'],
 
-    context = sindico_context(request, {
+        'pagina': pagina,
 
-        'cobrancas': cobrancas,
+        'filtros_qs': filtros.urlencode(),
 
-        'moradores': moradores,
+        'contagem_status': contagem_por_status(condominio, data_inicio, data_fim),
 
         'blocos_unicos': blocos_unicos,
 
@@ -1748,6 +1836,122 @@ def financeiro_sindico(request):
 
 @login_required
 
+def conciliacao_sindico(request):
+
+    pass
+
+    if not is_sindico(request.user):
+
+        return redirect('home')
+
+    condominio = get_condominio_ativo(request)
+
+    if not condominio or request.method != 'POST':
+
+        return redirect('sindico_financeiro')
+
+    import re
+
+    import uuid
+
+    from django.core.files.storage import default_storage
+
+    from .conciliacao import ler_arquivo_retorno, conciliar, baixar_conciliados, envios_push, ArquivoRetornoInvalido
+
+    from .utils import disparar_push_em_massa
+
+    # O arquivo fica guardado entre a prévia e a confirmação; a confirmação refaz a conciliação sobre o estado atual.
+
+    token = request.POST.get('token', '')
+
+    if token:
+
+        if not re.fullmatch(r'[0-9a-f]{32}', token):
+
+            return redirect('sindico_financeiro')
+
+        caminho = f'conciliacoes/{condominio.id}/{token}'
+
+        if not default_storage.exists(caminho):
+
+            messages.error(request, 'A prévia expirou. Envie o arquivo novamente.')
+
+            return redirect('sindico_financeiro')
+
+    else:
+
+        arquivo = request.FILES.get('arquivo')
+
+        erro = erro_upload(request, 'arquivo')
+
+        if erro:
+
+            messages.error(request, erro)
+
+            return redirect('sindico_financeiro')
+
+        if not arquivo:
+
+            messages.error(request, 'Selecione o extrato OFX ou o arquivo de retorno CNAB.')
+
+            return redirect('sindico_financeiro')
+
+        token = uuid.uuid4().hex
+
+        caminho = default_storage.save(f'conciliacoes/{condominio.id}/{token}', arquivo)
+
+    with default_storage.open(caminho, 'rb') as f:
+
+        conteudo = f.read()
+
+    try:
+
+        formato, lancamentos = ler_arquivo_retorno(conteudo)
+
+    except ArquivoRetornoInvalido as e:
+
+        default_storage.delete(caminho)
+
+        messages.error(request, str(e))
+
+        return redirect('sindico_financeiro')
+
+    resultado = conciliar(condominio, lancamentos)
+
+    if not request.POST.get('confirmar'):
+
+        context = sindico_context(request, {
+
+            'formato': formato,
+
+            'total_lancamentos': len(lancamentos),
+
+            'resultado': resultado,
+
+            'token': token,
+
+        }, active_page='financeiro')
+
+        return render(request, 'sindico/conciliacao.html', context)
+
+    baixadas = baixar_conciliados(condominio, resultado['conciliados'])
+
+    default_storage.delete(caminho)
+
+    disparar_push_em_massa(envios_push(baixadas))
+
+    total = sum(c.valor for c in baixadas)
+
+    messages.success(request, f'{len(baixadas)} cobrança(s) baixada(s) pela conciliação, totalizando R$ {total:.2f}.')
+
+    if resultado['nao_conciliados']:
+
+        messages.warning(request, f"{len(resultado['nao_conciliados'])} crédito(s) do arquivo ficaram sem cobrança correspondente.")
+
+    return redirect('sindico_financeiro')
+
+@login_required
+
 def mensagens_sindico(request):
 
     pass
@@ -1815,9 +2019,9 @@ def mensagens_sindico(request):
 
         Q(remetente=usuario) | Q(destinatario=usuario)
 
-    ).select_related('remetente', 'destinatario').order_by('-data_envio')
+    ).select_related('condominio', 'remetente__morador', 'destinatario__morador').order_by('-data_envio')
 
-    destinatarios_possiveis = User.objects.filter(condominios__in=usuario.condominios.all()).exclude(id=usuario.id).distinct()
+    destinatarios_possiveis = User.objects.filter(condominios__in=usuario.condominios.all()).exclude(id=usuario.id).distinct().select_related('morador').prefetch_related('condominios')
 
     conversas = {}
 
@@ -2136,33 +2340,13 @@ def gerar_advertencia_pdf(request, ocorrencia_id):
 
     }
 
-    from django.http import HttpResponse
-
-    from django.template.loader import get_template
-
-    try:
-
-        from xhtml2pdf import pisa
+    from .pdf import gerar_pdf_response
 
-    except ImportError:
+    response = gerar_pdf_response('sindico/pdf_advertencia.html', context, f"advertencia_ocorrencia_{ocorrencia.id}.pdf", inline=True)
 
-        return HttpResponse("Erro: Biblioteca xhtml2pdf não instalada. Rode: pip install xhtml2pdf")
+    if response['Content-Type'] != 'application/pdf':
 
-    template = get_template('sindico/pdf_advertencia.html')
-
-    html = template.render(context)
-
-    response = HttpResponse(content_type='application/pdf')
-
-    filename = f"advertencia_ocorrencia_{ocorrencia.id}.pdf"
-
-    response['Content-Disposition'] = f'inline; filename="{filename}"'
-
-    pisa_status = pisa.CreatePDF(html, dest=response)
-
-    if pisa_status.err:
-
-        return HttpResponse(f'Erro ao gerar PDF: {pisa_status.err}')
+        return response
 
     if not (ocorrencia_id > 1000000) and not ocorrencia.advertencia_emitida:
 
@@ -2212,6 +2396,14 @@ def documentos_sindico(request):
 
         arquivo = request.FILES.get('arquivo')
 
+        erro = erro_upload(request, 'arquivo')
+
+        if erro:
+
+            messages.error(request, erro)
+
+            return redirect('sindico_documentos')
+
         if titulo and arquivo:
 
             DocumentoCondominio.objects.create(
@@ -9,6 +9,7 @@ from portaria.models_zelador import (
     ChecklistZelador, AgendaZelador, 
     LivroOcorrenciaZelador, PrestadorServicoZelador, EstoqueZelador
 )
+from portaria.uploads import erro_upload
 
 def is_zelador(user):
     return user.is_authenticated and getattr(user, 'tipo_usuario', '') == 'zelador'
@@ -96,10 +97,11 @@ def ordens_servico_zelador(request):
             os = OrdemServico(
                 condominio=cond, titulo=titulo, descricao=descricao, zelador=request.user
             )
+            erro = erro_upload(request, 'foto')
+            if erro:
+                messages.error(request, erro)
+                return redirect('zelador_os')
             if foto:
-                if foto.size > 5242880:
-                    messages.error(request, 'A foto excede o limite de 5MB.')
-                    return redirect('zelador_os')
                 os.foto_conclusao = foto
             os.save()
             messages.success(request, 'Ordem de serviço aberta.')
@@ -130,10 +132,11 @@ def mudar_status_os(request, pk):
                 os.feedback_texto = feedback
             
             foto = request.FILES.get('foto_conclusao')
+            erro = erro_upload(request, 'foto_conclusao')
+            if erro:
+                messages.error(request, erro)
+                return redirect('zelador_os')
             if foto:
-                if foto.size > 5242880:
-                    messages.error(request, 'A foto excede o limite de 5MB.')
-                    return redirect('zelador_os')
                 os.foto_conclusao = foto
         os.save()
 
@@ -187,10 +190,11 @@ def livro_ocorrencias_zelador(request):
                 condominio=cond, titulo=titulo, descricao=descricao, 
                 gravidade=gravidade, zelador=request.user
             )
+            erro = erro_upload(request, 'foto')
+            if erro:
+                messages.error(request, erro)
+                return redirect('zelador_ocorrencias')
             if foto:
-                if foto.size > 5242880:
-                    messages.error(request, 'A foto excede o limite de 5MB.')
-                    return redirect('zelador_ocorrencias')
                 ocorrencia.foto = foto
             ocorrencia.save()
 
@@ -100,6 +100,8 @@ MIDDLEWARE = [
 
     'django.middleware.security.SecurityMiddleware',
 
+    'portaria.estaticos.EstaticosMiddleware',
+
     'django.contrib.sessions.middleware.SessionMiddleware',
 
     'django.middleware.common.CommonMiddleware',
@@ -108,6 +110,8 @@ MIDDLEWARE = [
 
     'django.contrib.auth.middleware.AuthenticationMiddleware',
 
+    'portaria.contexto.ContextoCondominioMiddleware',
+
     'django.contrib.messages.middleware.MessageMiddleware',
 
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -210,13 +214,51 @@ STATICFILES_DIRS = [
 
 ]
 
+# Uploads deduplicados por SHA-256 (um blob por conteúdo em media/blobs/); collectstatic gera nomes com hash de conteúdo e variantes .gz/.br
+
+STORAGES = {
+
+    'default': {'BACKEND': 'portaria.armazenamento.ArmazenamentoDeduplicado'},
+
+    'staticfiles': {'BACKEND': 'portaria.estaticos.ArmazenamentoEstatico'},
+
+}
+
+# Serve o STATIC_ROOT pela aplicação com cache imutável (desligue se o servidor web já servir /static/)
+
+SERVIR_ESTATICOS = os.getenv('SERVIR_ESTATICOS', str(not DEBUG)) == 'True'
+
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-DATA_UPLOAD_MAX_MEMORY_SIZE = 52428800
+# Entrega dos arquivos de /media/ após a checagem de permissão: '' (a própria aplicação, com Range/ETag),
+
+# 'x-accel' (nginx, location interna em MIDIA_PREFIXO_INTERNO) ou 'x-sendfile' (Apache mod_xsendfile)
+
+MIDIA_ENVIO = os.getenv('MIDIA_ENVIO', '')
+
+MIDIA_PREFIXO_INTERNO = os.getenv('MIDIA_PREFIXO_INTERNO', '/midia-protegida/')
+
+# Uploads vão direto para arquivo temporário, validados em blocos (limites por campo em portaria/uploads.py)
+
+FILE_UPLOAD_HANDLERS = ['portaria.uploads.UploadValidadoHandler']
+
+DATA_UPLOAD_MAX_MEMORY_SIZE = 2621440
+
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440
+
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', '2'))
+
+PDF_FILA_MAXIMA = int(os.getenv('PDF_FILA_MAXIMA', '4'))
+
+PDF_TIMEOUT = int(os.getenv('PDF_TIMEOUT', '60'))
+
+PDF_MEMORIA_MB = int(os.getenv('PDF_MEMORIA_MB', '512'))
+
+IMPORTACAO_SEGUNDO_PLANO = os.getenv('IMPORTACAO_SEGUNDO_PLANO', 'True') == 'True'
 
-FILE_UPLOAD_MAX_MEMORY_SIZE = 52428800
+IMAGENS_SEGUNDO_PLANO = os.getenv('IMAGENS_SEGUNDO_PLANO', 'True') == 'True'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -54,13 +54,21 @@ from portaria.views import (
 
     api_sync_offline,
 
+    service_worker,
+
+    midia_protegida,
+
+    imagem_publica,
+
     CustomPasswordResetView,
 
     salvar_inscricao_push,
 
     remover_subscricao,
 
-    liberar_acesso_reserva
+    liberar_acesso_reserva,
+
+    api_reservas_portaria
 
 )
 
@@ -82,6 +90,10 @@ from portaria.views_morador import (
 
     fazer_reserva,
 
+    api_calendario_area,
+
+    api_horarios_area,
+
     minhas_reservas,
 
     cancelar_reserva,
@@ -120,6 +132,10 @@ from portaria.views_sindico import (
 
     sindico_morador_excluir,
 
+    importacao_moradores_progresso,
+
+    importacao_moradores_falhas,
+
     solicitacoes_sindico,
 
     responder_solicitacao_sindico,
@@ -148,6 +164,8 @@ from portaria.views_sindico import (
 
     financeiro_sindico,
 
+    conciliacao_sindico,
+
     buscar_moradores_ajax,
 
     mensagens_sindico,
@@ -250,6 +268,8 @@ urlpatterns = [
 
     path('liberar_acesso_reserva/<int:reserva_id>/', liberar_acesso_reserva, name='liberar_acesso_reserva'),
 
+    path('api/reservas-portaria/', api_reservas_portaria, name='api_reservas_portaria'),
+
     path('mensagens/', mensagens_portaria, name='mensagens_portaria'),
 
     path('api/stats/', api_stats, name='api_stats'),
@@ -258,6 +278,8 @@ urlpatterns = [
 
     path('api/sync-offline/', api_sync_offline, name='api_sync_offline'),
 
+    path('sw.js', service_worker, name='service_worker'),
+
     path('exportar_relatorio/', exportar_relatorio, name='exportar_relatorio'),
 
     path('morador/', portal_home, name='morador_home'),
@@ -282,6 +304,10 @@ urlpatterns = [
 
     path('morador/reservas/nova/<int:area_id>/', fazer_reserva, name='morador_fazer_reserva'),
 
+    path('api/areas/<int:area_id>/calendario/', api_calendario_area, name='api_calendario_area'),
+
+    path('api/areas/<int:area_id>/horarios/', api_horarios_area, name='api_horarios_area'),
+
     path('morador/reservas/<int:reserva_id>/cancelar/', cancelar_reserva, name='morador_cancelar_reserva'),
 
     path('morador/ocorrencias/', ocorrencias, name='morador_ocorrencias'),
@@ -318,6 +344,10 @@ urlpatterns = [
 
     path('sindico/moradores/<int:morador_id>/resetar-senha/', resetar_senha_morador, name='sindico_resetar_senha'),
 
+    path('sindico/moradores/importacoes/<int:importacao_id>/progresso/', importacao_moradores_progresso, name='sindico_importacao_progresso'),
+
+    path('sindico/moradores/importacoes/<int:importacao_id>/falhas.csv', importacao_moradores_falhas, name='sindico_importacao_falhas'),
+
     path('sindico/solicitacoes/', solicitacoes_sindico, name='sindico_solicitacoes'),
 
     path('sindico/solicitacoes/responder/<int:solicitacao_id>/', responder_solicitacao_sindico, name='sindico_responder_solicitacao'),
@@ -342,6 +372,8 @@ urlpatterns = [
 
     path('sindico/financeiro/', financeiro_sindico, name='sindico_financeiro'),
 
+    path('sindico/financeiro/conciliacao/', conciliacao_sindico, name='sindico_conciliacao'),
+
     path('sindico/api/buscar-moradores/', buscar_moradores_ajax, name='buscar_moradores_ajax'),
 
     path('sindico/mensagens/', mensagens_sindico, name='sindico_mensagens'),
@@ -373,12 +405,10 @@ urlpatterns = [
 
 from django.urls import re_path
 
-from django.views.static import serve as static_serve
-
 urlpatterns += [
 
-    re_path(r'^media/(?P<path>.*)$', static_serve, {'document_root': settings.MEDIA_ROOT}),
+    re_path(r'^media/(?P<caminho>.+)$', midia_protegida, name='midia_protegida'),
 
-    re_path(r'^img/(?P<path>.*)$', static_serve, {'document_root': settings.BASE_DIR / 'img'}),
+    re_path(r'^img/(?P<caminho>.+)$', imagem_publica, name='imagem_publica'),
 
 ]
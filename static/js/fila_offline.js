@@ -0,0 +1,169 @@
+// Fila offline da portaria (IndexedDB) compartilhada entre a página (offline.js) e o service worker (sw.js):
+// os dois enviam a mesma fila, então a gravação e o envio ficam num só lugar.
+self.FilaOffline = (function () {
+    const DB_NAME = 'portaria_offline';
+    const DB_VERSION = 2;
+    const FILAS = ['visitantes_pendentes', 'encomendas_pendentes', 'solicitacoes_pendentes'];
+    // Item "em envio" há mais que isso é de um envio que morreu no meio (aba ou SW encerrados): volta para a fila.
+    const RESERVA_EXPIRA_MS = 2 * 60 * 1000;
+
+    // Cada registro recebe um UUID ao ser salvo: o servidor usa como chave única, então reenviar o lote não duplica nada.
+    function novoUuid() {
+        if (self.crypto && crypto.randomUUID) return crypto.randomUUID();
+        const b = crypto.getRandomValues(new Uint8Array(16));
+        b[6] = (b[6] & 0x0f) | 0x40;
+        b[8] = (b[8] & 0x3f) | 0x80;
+        const h = Array.from(b, x => x.toString(16).padStart(2, '0')).join('');
+        return `${h.slice(0, 8)}-${h.slice(8, 12)}-${h.slice(12, 16)}-${h.slice(16, 20)}-${h.slice(20)}`;
+    }
+
+    function abrir() {
+        return new Promise((resolve, reject) => {
+            const request = indexedDB.open(DB_NAME, DB_VERSION);
+
+            request.onupgradeneeded = function (e) {
+                const db = e.target.result;
+                if (!db.objectStoreNames.contains('moradores')) {
+                    db.createObjectStore('moradores', { keyPath: 'id' });
+                }
+                FILAS.forEach(nome => {
+                    if (!db.objectStoreNames.contains(nome)) {
+                        db.createObjectStore(nome, { keyPath: 'tempId', autoIncrement: true });
+                    }
+                });
+            };
+
+            request.onsuccess = e => resolve(e.target.result);
+            request.onerror = e => reject(e.target.error);
+        });
+    }
+
+    function emEnvio(item, agora) {
+        return typeof item.sincronizando === 'number' && agora - item.sincronizando < RESERVA_EXPIRA_MS;
+    }
+
+    // Marca os itens livres como "em envio" numa única transação: página e SW nunca mandam o mesmo item ao mesmo tempo.
+    function reservar(db) {
+        return new Promise((resolve, reject) => {
+            const agora = Date.now();
+            const lotes = {};
+            const tx = db.transaction(FILAS, 'readwrite');
+            FILAS.forEach(nome => {
+                lotes[nome] = [];
+                const store = tx.objectStore(nome);
+                store.getAll().onsuccess = function (e) {
+                    e.target.result.forEach(item => {
+                        if (emEnvio(item, agora)) return;
+                        item.sincronizando = agora;
+                        if (!item.uuid) item.uuid = novoUuid();
+                        store.put(item);
+                        lotes[nome].push(item);
+                    });
+                };
+            });
+            tx.oncomplete = () => resolve(lotes);
+            tx.onerror = () => reject(tx.error);
+        });
+    }
+
+    function liberar(db, lotes, confirmados, erros) {
+        return new Promise((resolve, reject) => {
+            const tx = db.transaction(FILAS, 'readwrite');
+            FILAS.forEach(nome => {
+                const store = tx.objectStore(nome);
+                lotes[nome].forEach(item => {
+                    if (confirmados.has(item.uuid)) {
+                        store.delete(item.tempId);
+                    } else {
+                        item.sincronizando = false;
+                        if (item.uuid in erros) item.erro = erros[item.uuid];
+                        store.put(item);
+                    }
+                });
+            });
+            tx.oncomplete = () => resolve();
+            tx.onerror = () => reject(tx.error);
+        });
+    }
+
+    function payload(lotes) {
+        return {
+            versao: 2,
+            visitantes: lotes.visitantes_pendentes.map(v => ({
+                uuid: v.uuid,
+                nome_completo: v.nome_completo,
+                cpf: v.cpf || '',
+                data_nascimento: v.data_nascimento || null,
+                placa_veiculo: v.placa_veiculo || '',
+                morador_id: v.morador_id || null,
+                quem_autorizou: v.quem_autorizou || '',
+                observacoes: v.observacoes || ''
+            })),
+            encomendas: lotes.encomendas_pendentes.map(e => ({
+                uuid: e.uuid,
+                morador_id: e.morador_id,
+                volume: e.volume,
+                destinatario_alternativo: e.destinatario_alternativo || ''
+            })),
+            solicitacoes: lotes.solicitacoes_pendentes.map(s => ({
+                uuid: s.uuid,
+                tipo: s.tipo,
+                descricao: s.descricao,
+                morador_id: s.morador_id || null
+            }))
+        };
+    }
+
+    // Envia a fila para /api/sync-offline/. Resolve com o resultado do servidor (null se não havia nada)
+    // e rejeita em falha de rede/HTTP, devolvendo os itens à fila para a próxima tentativa.
+    function enviarPendentes(db, cabecalhos) {
+        return reservar(db).then(lotes => {
+            const total = FILAS.reduce((soma, nome) => soma + lotes[nome].length, 0);
+            if (!total) return null;
+
+            return fetch('/api/sync-offline/', {
+                method: 'POST',
+                credentials: 'same-origin',
+                headers: Object.assign({ 'Content-Type': 'application/json' }, cabecalhos || {}),
+                body: JSON.stringify(payload(lotes))
+            })
+                .then(r => {
+                    if (!r.ok) throw new Error(`Erro HTTP: ${r.status}`);
+                    return r.json();
+                })
+                .then(result => {
+                    // Só sai da fila o que o servidor confirmou (criado agora ou já existente);
+                    // itens recusados voltam para a fila com o motivo do erro.
+                    const confirmados = new Set();
+                    const erros = {};
+                    (result.confirmados || []).forEach(c => {
+                        if (c.status === 'erro') erros[c.uuid] = c.erro;
+                        else confirmados.add(c.uuid);
+                    });
+                    return liberar(db, lotes, confirmados, erros).then(() => result);
+                })
+                .catch(err => liberar(db, lotes, new Set(), {}).then(() => { throw err; }));
+        });
+    }
+
+    function contarPendentes(db) {
+        return new Promise((resolve) => {
+            let total = 0;
+            const tx = db.transaction(FILAS, 'readonly');
+            FILAS.forEach(nome => {
+                const req = tx.objectStore(nome).count();
+                req.onsuccess = () => { total += req.result; };
+            });
+            tx.oncomplete = () => resolve(total);
+            tx.onerror = () => resolve(0);
+        });
+    }
+
+    return {
+        TAG_SYNC: 'sincronizar-pendentes',
+        novoUuid: novoUuid,
+        abrir: abrir,
+        enviarPendentes: enviarPendentes,
+        contarPendentes: contarPendentes
+    };
+})();
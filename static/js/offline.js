@@ -1,60 +1,72 @@
 
 
 const OfflineEngine = (function () {
-    const DB_NAME = 'portaria_offline';
-    const DB_VERSION = 2;
     let db = null;
     let isSincronizando = false;
 
-
     function init() {
-        return new Promise((resolve, reject) => {
-            const request = indexedDB.open(DB_NAME, DB_VERSION);
-
-            request.onupgradeneeded = function (e) {
-                const db = e.target.result;
-                if (!db.objectStoreNames.contains('moradores')) {
-                    db.createObjectStore('moradores', { keyPath: 'id' });
-                }
-                if (!db.objectStoreNames.contains('visitantes_pendentes')) {
-                    db.createObjectStore('visitantes_pendentes', { keyPath: 'tempId', autoIncrement: true });
-                }
-                if (!db.objectStoreNames.contains('encomendas_pendentes')) {
-                    db.createObjectStore('encomendas_pendentes', { keyPath: 'tempId', autoIncrement: true });
-                }
-                if (!db.objectStoreNames.contains('solicitacoes_pendentes')) {
-                    db.createObjectStore('solicitacoes_pendentes', { keyPath: 'tempId', autoIncrement: true });
-                }
-            };
-
-            request.onsuccess = function (e) {
-                db = e.target.result;
-                console.log('✅ IndexedDB pronto');
-                resolve(db);
-            };
-
-            request.onerror = function (e) {
-                console.error('❌ Erro ao abrir IndexedDB:', e);
-                reject(e);
-            };
+        return FilaOffline.abrir().then(banco => {
+            db = banco;
+            return db;
         });
     }
 
+    // Pede ao service worker um Background Sync: a fila é enviada assim que houver rede, mesmo com a aba fechada.
+    function agendarSincronizacao() {
+        if (!('serviceWorker' in navigator)) return Promise.resolve(false);
+        return navigator.serviceWorker.ready
+            .then(reg => reg.sync ? reg.sync.register(FilaOffline.TAG_SYNC).then(() => true) : false)
+            .catch(() => false);
+    }
+
     
     
     
+    function contarMoradoresEmCache() {
+        return new Promise((resolve) => {
+            const request = db.transaction('moradores', 'readonly').objectStore('moradores').count();
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => resolve(0);
+        });
+    }
+
     function cacheMoradores() {
-        return fetch('/api/moradores-offline/')
-            .then(r => r.json())
-            .then(data => {
-                const tx = db.transaction('moradores', 'readwrite');
-                const store = tx.objectStore('moradores');
-                store.clear();
-                data.moradores.forEach(m => store.put(m));
-                console.log(`✅ ${data.moradores.length} moradores em cache`);
-                
-                localStorage.setItem('porteiro_username', data.porteiro);
-                return data.moradores;
+        // Sincronização incremental: com cópia local, pede só o que mudou desde a última versão
+        // e manda o ETag para receber 304 quando nada mudou.
+        return contarMoradoresEmCache().then(total => {
+            const versao = total ? localStorage.getItem('moradores_versao') : null;
+            const etag = total ? localStorage.getItem('moradores_etag') : null;
+            const url = '/api/moradores-offline/' + (versao ? '?since=' + encodeURIComponent(versao) : '');
+            return fetch(url, { headers: etag ? { 'If-None-Match': etag } : {} });
+        })
+            .then(r => {
+                if (r.status === 304) {
+                    console.log('✅ Cache de moradores já está atualizado');
+                    return null;
+                }
+                if (!r.ok) throw new Error('HTTP ' + r.status);
+                const etag = r.headers.get('ETag');
+                return r.json().then(data => ({ data, etag }));
+            })
+            .then(resposta => {
+                if (!resposta) return getMoradores();
+                const { data, etag } = resposta;
+                return new Promise((resolve, reject) => {
+                    const tx = db.transaction('moradores', 'readwrite');
+                    const store = tx.objectStore('moradores');
+                    if (data.completo) store.clear();
+                    data.moradores.forEach(m => store.put(m));
+                    (data.removidos || []).forEach(id => store.delete(id));
+                    tx.oncomplete = () => {
+                        // Versão só é gravada depois do commit local: se a gravação falhar, a próxima busca repete o delta.
+                        localStorage.setItem('moradores_versao', data.versao || '');
+                        if (etag) localStorage.setItem('moradores_etag', etag);
+                        localStorage.setItem('porteiro_username', data.porteiro);
+                        console.log(`✅ ${data.moradores.length} morador(es) atualizados, ${(data.removidos || []).length} removido(s) do cache`);
+                        resolve(getMoradores());
+                    };
+                    tx.onerror = () => reject(tx.error);
+                });
             })
             .catch(err => {
                 console.warn('⚠️ Não foi possível atualizar cache de moradores:', err);
@@ -76,36 +88,48 @@ const OfflineEngine = (function () {
     
     function salvarVisitante(dados) {
         return new Promise((resolve, reject) => {
+            dados.uuid = FilaOffline.novoUuid();
             dados.timestamp = new Date().toISOString();
             dados.porteiro = localStorage.getItem('porteiro_username') || 'desconhecido';
             const tx = db.transaction('visitantes_pendentes', 'readwrite');
             const store = tx.objectStore('visitantes_pendentes');
             const request = store.add(dados);
-            request.onsuccess = () => resolve(request.result);
+            request.onsuccess = () => {
+                agendarSincronizacao();
+                resolve(request.result);
+            };
             request.onerror = () => reject(request.error);
         });
     }
 
     function salvarEncomenda(dados) {
         return new Promise((resolve, reject) => {
+            dados.uuid = FilaOffline.novoUuid();
             dados.timestamp = new Date().toISOString();
             dados.porteiro = localStorage.getItem('porteiro_username') || 'desconhecido';
             const tx = db.transaction('encomendas_pendentes', 'readwrite');
             const store = tx.objectStore('encomendas_pendentes');
             const request = store.add(dados);
-            request.onsuccess = () => resolve(request.result);
+            request.onsuccess = () => {
+                agendarSincronizacao();
+                resolve(request.result);
+            };
             request.onerror = () => reject(request.error);
         });
     }
 
     function salvarSolicitacao(dados) {
         return new Promise((resolve, reject) => {
+            dados.uuid = FilaOffline.novoUuid();
             dados.timestamp = new Date().toISOString();
             dados.porteiro = localStorage.getItem('porteiro_username') || 'desconhecido';
             const tx = db.transaction('solicitacoes_pendentes', 'readwrite');
             const store = tx.objectStore('solicitacoes_pendentes');
             const request = store.add(dados);
-            request.onsuccess = () => resolve(request.result);
+            request.onsuccess = () => {
+                agendarSincronizacao();
+                resolve(request.result);
+            };
             request.onerror = () => reject(request.error);
         });
     }
@@ -114,22 +138,7 @@ const OfflineEngine = (function () {
     
     
     function contarPendentes() {
-        return new Promise((resolve) => {
-            let total = 0;
-            const tx = db.transaction(['visitantes_pendentes', 'encomendas_pendentes', 'solicitacoes_pendentes'], 'readonly');
-
-            const req1 = tx.objectStore('visitantes_pendentes').count();
-            req1.onsuccess = () => { total += req1.result; };
-
-            const req2 = tx.objectStore('encomendas_pendentes').count();
-            req2.onsuccess = () => { total += req2.result; };
-
-            const req3 = tx.objectStore('solicitacoes_pendentes').count();
-            req3.onsuccess = () => { total += req3.result; };
-
-            tx.oncomplete = () => resolve(total);
-            tx.onerror = () => resolve(0);
-        });
+        return FilaOffline.contarPendentes(db);
     }
 
     
@@ -148,161 +157,53 @@ const OfflineEngine = (function () {
 
         isSincronizando = true;
 
-        return new Promise((resolve) => {
-            const tx = db.transaction(['visitantes_pendentes', 'encomendas_pendentes', 'solicitacoes_pendentes'], 'readwrite');
-            const visitantes = [];
-            const encomendas = [];
-            const solicitacoes = [];
-
-            const storeV = tx.objectStore('visitantes_pendentes');
-            storeV.getAll().onsuccess = function (e) {
-                e.target.result.forEach(v => {
-                    if (!v.sincronizando) {
-                        v.sincronizando = true;
-                        storeV.put(v);
-                        visitantes.push(v);
-                    }
-                });
-            };
-
-            const storeE = tx.objectStore('encomendas_pendentes');
-            storeE.getAll().onsuccess = function (e) {
-                e.target.result.forEach(enc => {
-                    if (!enc.sincronizando) {
-                        enc.sincronizando = true;
-                        storeE.put(enc);
-                        encomendas.push(enc);
+        const csrftoken = document.querySelector('[name=csrfmiddlewaretoken]') ? document.querySelector('[name=csrfmiddlewaretoken]').value : (function(){
+            let cookieValue = null;
+            if (document.cookie && document.cookie !== '') {
+                const cookies = document.cookie.split(';');
+                for (let i = 0; i < cookies.length; i++) {
+                    const cookie = cookies[i].trim();
+                    if (cookie.substring(0, 10) === ('csrftoken=')) {
+                        cookieValue = decodeURIComponent(cookie.substring(10));
+                        break;
                     }
-                });
-            };
-
-            const storeS = tx.objectStore('solicitacoes_pendentes');
-            storeS.getAll().onsuccess = function (e) {
-                e.target.result.forEach(sol => {
-                    if (!sol.sincronizando) {
-                        sol.sincronizando = true;
-                        storeS.put(sol);
-                        solicitacoes.push(sol);
-                    }
-                });
-            };
-
-            tx.oncomplete = function () {
-                if (visitantes.length === 0 && encomendas.length === 0 && solicitacoes.length === 0) {
+                }
+            }
+            return cookieValue;
+        })();
+
+        return FilaOffline.enviarPendentes(db, { 'X-CSRFToken': csrftoken })
+            .then(result => {
+                isSincronizando = false;
+                atualizarBadgePendentes();
+                if (!result) {
                     console.log('✅ Nada para sincronizar');
-                    isSincronizando = false;
-                    atualizarBadgePendentes();
-                    resolve(true);
-                    return;
+                    return true;
                 }
+                console.log('✅ Sync resultado:', result);
+                mostrarResultado(result);
+                return true;
+            })
+            .catch(err => {
+                console.error('❌ Erro no sync:', err);
+                isSincronizando = false;
+                mostrarNotificacao('❌ Erro ao sincronizar. Tentaremos novamente em breve.', 'danger');
+                agendarSincronizacao();
+                return false;
+            });
+    }
 
-                console.log(`🔄 Sincronizando: ${visitantes.length} visitantes, ${encomendas.length} encomendas, ${solicitacoes.length} solicitações...`);
-
-                const csrftoken = document.querySelector('[name=csrfmiddlewaretoken]') ? document.querySelector('[name=csrfmiddlewaretoken]').value : (function(){
-                    let cookieValue = null;
-                    if (document.cookie && document.cookie !== '') {
-                        const cookies = document.cookie.split(';');
-                        for (let i = 0; i < cookies.length; i++) {
-                            const cookie = cookies[i].trim();
-                            if (cookie.substring(0, 10) === ('csrftoken=')) {
-                                cookieValue = decodeURIComponent(cookie.substring(10));
-                                break;
-                            }
-                        }
-                    }
-                    return cookieValue;
-                })();
-
-                fetch('/api/sync-offline/', {
-                    method: 'POST',
-                    headers: { 
-                        'Content-Type': 'application/json',
-                        'X-CSRFToken': csrftoken
-                    },
-                    body: JSON.stringify({
-                        visitantes: visitantes.map(v => ({
-                            nome_completo: v.nome_completo,
-                            cpf: v.cpf || '',
-                            data_nascimento: v.data_nascimento || null,
-                            placa_veiculo: v.placa_veiculo || '',
-                            morador_id: v.morador_id || null,
-                            quem_autorizou: v.quem_autorizou || '',
-                            observacoes: v.observacoes || ''
-                        })),
-                        encomendas: encomendas.map(e => ({
-                            morador_id: e.morador_id,
-                            volume: e.volume,
-                            destinatario_alternativo: e.destinatario_alternativo || ''
-                        })),
-                        solicitacoes: solicitacoes.map(s => ({
-                            tipo: s.tipo,
-                            descricao: s.descricao,
-                            morador_id: s.morador_id || null
-                        }))
-                    })
-                })
-                    .then(r => {
-                        if (!r.ok) {
-                            throw new Error(`Erro HTTP: ${r.status}`);
-                        }
-                        return r.json();
-                    })
-                    .then(result => {
-                        console.log('✅ Sync resultado:', result);
-
-                        
-                        const clearTx = db.transaction(['visitantes_pendentes', 'encomendas_pendentes', 'solicitacoes_pendentes'], 'readwrite');
-                        
-                        visitantes.forEach(v => clearTx.objectStore('visitantes_pendentes').delete(v.tempId));
-                        encomendas.forEach(e => clearTx.objectStore('encomendas_pendentes').delete(e.tempId));
-                        solicitacoes.forEach(s => clearTx.objectStore('solicitacoes_pendentes').delete(s.tempId));
-
-                        clearTx.oncomplete = () => {
-                            isSincronizando = false;
-                            atualizarBadgePendentes();
-                            const partes = [];
-                            if (result.visitantes_criados) partes.push(`${result.visitantes_criados} visitante(s)`);
-                            if (result.encomendas_criadas) partes.push(`${result.encomendas_criadas} encomenda(s)`);
-                            if (result.solicitacoes_criadas) partes.push(`${result.solicitacoes_criadas} solicitação(ões)`);
-                            mostrarNotificacao(`✅ Sincronizado! ${partes.join(', ')} registrados por ${result.porteiro}.`, 'success');
-                            resolve(true);
-                        };
-                        clearTx.onerror = () => {
-                            isSincronizando = false;
-                            resolve(false);
-                        };
-                    })
-                    .catch(err => {
-                        console.error('❌ Erro no sync:', err);
-                        
-                        
-                        const revertTx = db.transaction(['visitantes_pendentes', 'encomendas_pendentes', 'solicitacoes_pendentes'], 'readwrite');
-                        
-                        visitantes.forEach(v => {
-                            v.sincronizando = false;
-                            revertTx.objectStore('visitantes_pendentes').put(v);
-                        });
-                        encomendas.forEach(e => {
-                            e.sincronizando = false;
-                            revertTx.objectStore('encomendas_pendentes').put(e);
-                        });
-                        solicitacoes.forEach(s => {
-                            s.sincronizando = false;
-                            revertTx.objectStore('solicitacoes_pendentes').put(s);
-                        });
-
-                        revertTx.oncomplete = () => {
-                            isSincronizando = false;
-                            mostrarNotificacao('❌ Erro ao sincronizar. Tentaremos novamente em breve.', 'danger');
-                            resolve(false);
-                        };
-                        revertTx.onerror = () => {
-                            isSincronizando = false;
-                            resolve(false);
-                        };
-                    });
-            };
-        });
+    function mostrarResultado(result) {
+        const partes = [];
+        if (result.visitantes_criados) partes.push(`${result.visitantes_criados} visitante(s)`);
+        if (result.encomendas_criadas) partes.push(`${result.encomendas_criadas} encomenda(s)`);
+        if (result.solicitacoes_criadas) partes.push(`${result.solicitacoes_criadas} solicitação(ões)`);
+        if (result.erros && result.erros.length) {
+            mostrarNotificacao(`⚠️ ${result.erros.length} registro(s) não sincronizado(s): ${result.erros.join('; ')}`, 'warning');
+        }
+        if (partes.length) {
+            mostrarNotificacao(`✅ Sincronizado! ${partes.join(', ')} registrados por ${result.porteiro}.`, 'success');
+        }
     }
 
     
@@ -503,6 +404,15 @@ const OfflineEngine = (function () {
             }, 2000);
         });
 
+        // O service worker avisa quando esvaziou a fila em segundo plano (Background/Periodic Sync).
+        if ('serviceWorker' in navigator) {
+            navigator.serviceWorker.addEventListener('message', e => {
+                if (!e.data || e.data.tipo !== 'fila-sincronizada') return;
+                atualizarBadgePendentes();
+                mostrarResultado(e.data.resultado);
+            });
+        }
+
         window.addEventListener('offline', () => {
             console.log('🔴 Conexão perdida!');
             atualizarStatusConexao();
@@ -530,6 +440,7 @@ const OfflineEngine = (function () {
         salvarSolicitacao: salvarSolicitacao,
         contarPendentes: contarPendentes,
         sincronizar: sincronizar,
+        agendarSincronizacao: agendarSincronizacao,
         interceptarFormularios: interceptarFormularios,
         iniciarMonitor: iniciarMonitor,
         atualizarBadgePendentes: atualizarBadgePendentes
@@ -544,6 +455,19 @@ document.addEventListener('DOMContentLoaded', function () {
     const isPortaria = document.querySelector('.brand-text');
     if (!isPortaria) return;
 
+    // O SW é servido na raiz (/sw.js) para controlar as páginas da portaria, não só /static/.
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register('/sw.js', { scope: '/' }).then(reg => {
+            // Periodic Sync (PWA instalado): esvazia a fila de tempos em tempos mesmo sem a aba aberta.
+            if (!reg.periodicSync || !navigator.permissions) return;
+            return navigator.permissions.query({ name: 'periodic-background-sync' }).then(status => {
+                if (status.state === 'granted') {
+                    return reg.periodicSync.register(FilaOffline.TAG_SYNC, { minInterval: 15 * 60 * 1000 });
+                }
+            });
+        }).catch(err => console.warn('⚠️ Service worker não registrado:', err));
+    }
+
     OfflineEngine.init().then(() => {
         OfflineEngine.iniciarMonitor();
         OfflineEngine.interceptarFormularios();
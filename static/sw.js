@@ -1,24 +1,87 @@
-const CACHE_NAME = 'splash-rc-v3'; 
-const ASSETS_TO_CACHE = [
+// Servido por /sw.js (view service_worker), que embute o manifesto gerado por `manage.py gerar_manifesto_precache`
+// em self.PRECACHE_MANIFESTO. A fila offline da portaria vem do mesmo módulo usado pela página.
+importScripts('/static/js/fila_offline.js');
+
+const MANIFESTO = self.PRECACHE_MANIFESTO || { versao: '0', arquivos: [] };
+const CACHE_PRECACHE = 'precache-' + MANIFESTO.versao;
+const CACHE_ESTATICOS = 'estaticos-v1';
+const CACHE_PAGINAS = 'paginas-v1';
+const CACHES_ATUAIS = [CACHE_PRECACHE, CACHE_ESTATICOS, CACHE_PAGINAS];
+const CHAVE_REVISOES = '/__precache-revisoes__';
+
+// Caches de runtime têm teto de entradas: o armazenamento do aparelho não cresce sem limite.
+const LIMITE_ESTATICOS = 60;
+const LIMITE_PAGINAS = 10;
+// Rede lenta na guarita: passado esse tempo, a página em cache é mostrada enquanto a rede não responde.
+const TIMEOUT_PAGINA_MS = 3000;
+
+const RECURSOS_CDN = [
     'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css',
     'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.1/font/bootstrap-icons.css',
     'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js',
 ];
+const ORIGENS_CDN = ['https://cdn.jsdelivr.net'];
+// Telas que abrem offline (a portaria registra visitantes/encomendas nelas sem rede).
+const PAGINAS_OFFLINE = ['/'];
+const ROTAS_SEM_CACHE = ['/login', '/logout', '/admin', '/recuperar-senha', '/password_reset', '/reset', '/api/', '/media/', '/sw.js'];
+
+
+function limitarCache(cache, limite) {
+    // cache.keys() vem em ordem de gravação: sai primeiro o que foi gravado há mais tempo.
+    return cache.keys().then(chaves => Promise.all(
+        chaves.slice(0, Math.max(0, chaves.length - limite)).map(chave => cache.delete(chave))
+    ));
+}
+
+function guardar(nome, request, response, limite) {
+    return caches.open(nome)
+        .then(cache => cache.put(request, response).then(() => limitarCache(cache, limite)))
+        .catch(err => console.warn('Falha ao gravar no cache:', request.url, err));
+}
+
+// Arquivos com a mesma revisão do precache anterior são copiados de lá: só o que mudou é baixado de novo.
+function revisoesAnteriores() {
+    return caches.keys().then(nomes => Promise.all(
+        nomes.filter(nome => nome.startsWith('precache-') && nome !== CACHE_PRECACHE).map(nome =>
+            caches.open(nome)
+                .then(cache => cache.match(CHAVE_REVISOES))
+                .then(resp => resp ? resp.json() : {})
+                .then(revisoes => ({ nome, revisoes }))
+        )
+    ));
+}
+
+function precacheArquivo(cache, anteriores, url, revisao) {
+    const anterior = anteriores.find(a => a.revisoes[url] === revisao);
+    const copia = anterior
+        ? caches.open(anterior.nome).then(c => c.match(url))
+        : Promise.resolve(null);
+    return copia.then(resp => {
+        if (resp) return cache.put(url, resp);
+        return fetch(url, { cache: 'reload' }).then(resp => {
+            if (!resp.ok) throw new TypeError('Falha ao baixar ' + url);
+            return cache.put(url, resp);
+        });
+    });
+}
+
+function instalarPrecache() {
+    return Promise.all([caches.open(CACHE_PRECACHE), revisoesAnteriores()]).then(([cache, anteriores]) => {
+        const revisoes = {};
+        MANIFESTO.arquivos.forEach(a => { revisoes[a.url] = a.revisao; });
+        const proprios = MANIFESTO.arquivos.map(a => precacheArquivo(cache, anteriores, a.url, a.revisao));
+        // URLs do CDN já são versionadas; uma falha nelas não impede a instalação.
+        const cdn = RECURSOS_CDN.map(url => precacheArquivo(cache, anteriores, url, url)
+            .then(() => { revisoes[url] = url; })
+            .catch(() => console.warn('Arquivo ignorado no cache offline:', url)));
+        return Promise.all(proprios.concat(cdn))
+            .then(() => cache.put(CHAVE_REVISOES, new Response(JSON.stringify(revisoes), { headers: { 'Content-Type': 'application/json' } })));
+    });
+}
 
 
 self.addEventListener('install', event => {
-    event.waitUntil(
-        caches.open(CACHE_NAME).then(cache => {
-            return Promise.all(
-                ASSETS_TO_CACHE.map(url => {
-                    return fetch(url).then(response => {
-                        if (!response.ok) throw new TypeError('Falha ao baixar ' + url);
-                        return cache.put(url, response);
-                    }).catch(err => console.warn('Arquivo ignorado no cache offline:', url));
-                })
-            );
-        }).then(() => self.skipWaiting())
-    );
+    event.waitUntil(instalarPrecache().then(() => self.skipWaiting()));
 });
 
 
@@ -26,7 +89,7 @@ self.addEventListener('activate', event => {
     event.waitUntil(
         caches.keys().then(keys =>
             Promise.all(keys
-                .filter(key => key !== CACHE_NAME)
+                .filter(key => !CACHES_ATUAIS.includes(key))
                 .map(key => caches.delete(key))
             )
         ).then(() => self.clients.claim())
@@ -34,24 +97,106 @@ self.addEventListener('activate', event => {
 });
 
 
+function ehEstatico(url) {
+    return (url.origin === location.origin && url.pathname.startsWith('/static/')) || ORIGENS_CDN.includes(url.origin);
+}
+
+// Precache é versionado pelo manifesto: serve direto. O resto usa stale-while-revalidate (responde do cache e atualiza em segundo plano).
+function staleWhileRevalidate(event, request) {
+    return caches.open(CACHE_PRECACHE).then(cache => cache.match(request)).then(precache => {
+        if (precache) return precache;
+        return caches.open(CACHE_ESTATICOS).then(cache => cache.match(request)).then(cacheado => {
+            const rede = fetch(request).then(response => {
+                if (response.ok || response.type === 'opaque') {
+                    event.waitUntil(guardar(CACHE_ESTATICOS, request, response.clone(), LIMITE_ESTATICOS));
+                }
+                return response;
+            });
+            if (cacheado) {
+                event.waitUntil(rede.catch(() => null));
+                return cacheado;
+            }
+            return rede;
+        });
+    });
+}
+
+function paginaRedePrimeiro(event, request) {
+    return new Promise(resolve => {
+        let respondido = false;
+        const responder = response => {
+            if (respondido || !response) return;
+            respondido = true;
+            resolve(response);
+        };
+        const cacheado = caches.open(CACHE_PAGINAS).then(cache => cache.match(request));
+        const prazo = setTimeout(() => cacheado.then(responder), TIMEOUT_PAGINA_MS);
+        fetch(request)
+            .then(response => {
+                clearTimeout(prazo);
+                if (response.ok && !response.redirected) {
+                    event.waitUntil(guardar(CACHE_PAGINAS, request, response.clone(), LIMITE_PAGINAS));
+                }
+                responder(response);
+            })
+            .catch(() => {
+                clearTimeout(prazo);
+                cacheado.then(response => responder(response || Response.error()));
+            });
+    });
+}
+
+
 self.addEventListener('fetch', event => {
-    const bypassRoutes = ['/login', '/logout', '/admin', '/password_reset', '/reset', '/api/', '/sindico/', '/morador/', '/portaria/'];
-    if (bypassRoutes.some(route => event.request.url.includes(route))) {
-        event.respondWith(fetch(event.request)); 
+    const request = event.request;
+    const url = new URL(request.url);
+    const mesmaOrigem = url.origin === location.origin;
+
+    // Páginas em cache são do usuário logado: o logout apaga tudo antes de outra pessoa usar o aparelho.
+    if (mesmaOrigem && url.pathname.startsWith('/logout')) {
+        event.waitUntil(caches.delete(CACHE_PAGINAS));
+    }
+
+    if (request.method !== 'GET') return;
+    if (mesmaOrigem && ROTAS_SEM_CACHE.some(rota => url.pathname.startsWith(rota))) return;
+
+    if (request.mode === 'navigate') {
+        if (mesmaOrigem && PAGINAS_OFFLINE.includes(url.pathname)) {
+            event.respondWith(paginaRedePrimeiro(event, request));
+        }
         return;
     }
 
-    if (event.request.method !== 'GET') return;
+    if (ehEstatico(url)) {
+        event.respondWith(staleWhileRevalidate(event, request));
+    }
+});
 
-    event.respondWith(
-        fetch(event.request)
-            .then(response => {
-                const clone = response.clone();
-                caches.open(CACHE_NAME).then(cache => cache.put(event.request, clone));
-                return response;
+
+// Background Sync / Periodic Sync: envia a fila offline da portaria mesmo com a aba fechada.
+// Se o envio falhar, a promise rejeita e o navegador agenda uma nova tentativa.
+function esvaziarFila() {
+    return FilaOffline.abrir().then(db =>
+        FilaOffline.enviarPendentes(db)
+            .then(resultado => {
+                db.close();
+                if (!resultado) return;
+                return self.clients.matchAll({ type: 'window' }).then(janelas =>
+                    janelas.forEach(janela => janela.postMessage({ tipo: 'fila-sincronizada', resultado }))
+                );
+            }, err => {
+                db.close();
+                throw err;
             })
-            .catch(() => caches.match(event.request))
     );
+}
+
+self.addEventListener('sync', event => {
+    if (event.tag === FilaOffline.TAG_SYNC) event.waitUntil(esvaziarFila());
+});
+
+self.addEventListener('periodicsync', event => {
+    if (event.tag === FilaOffline.TAG_SYNC) event.waitUntil(esvaziarFila());
 });
 
 